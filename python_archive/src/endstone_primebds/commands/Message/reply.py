@@ -32,18 +32,16 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
         target = self.server.get_player(last_messaged)
         if target:
             config = load_config()
+            rank = self.chat_states.get(player).rank
             if config["modules"]["server_messages"]["enhanced_whispers"]:
-                sender.send_message(f"{config['modules']['server_messages']['whisper_prefix']}§7To {target.name}: §o{args[0]}")
-                target.send_message(f"{config['modules']['server_messages']['whisper_prefix']}§7From {sender.name}: §o{args[0]}")
+                sender.send_message(self.chat_formats.render("whisper_to", rank, player=sender.name, target=target.name, message=args[0]))
+                target.send_message(self.chat_formats.render("whisper_from", rank, player=sender.name, target=target.name, message=args[0]))
             else:
                 sender.send_message(f"You whisper to {target.name}: {args[0]}")
                 target.send_message(f"{player.name_tag} §7§o{player.name} whispers to you: {args[0]}")
 
-            for pl in self.server.online_players:  
-                otheruser = self.db.get_online_user(pl.xuid)
-                if otheruser:
-                    if otheruser.enabled_ss == 1 and pl.has_permission("primebds.command.socialspy"):
-                        pl.send_message(f"{config['modules']['server_messages']['social_spy_prefix']}§8[§r{player.name} §7-> §r{target.name}§8] §7{args[0]}")
+            spy_message = self.chat_formats.render("social_spy", rank, player=player.name, target=target.name, message=args[0])
+            self.subscriptions.send("enabled_ss", spy_message)
 
         else:
             sender.send_message(f"§c{last_messaged} is not online")
@@ -1,6 +1,5 @@
 from endstone import Player
 from endstone.command import CommandSender
-from endstone_primebds.utils.config_util import load_config
 from endstone_primebds.utils.command_util import create_command
 
 from typing import TYPE_CHECKING
@@ -40,8 +39,8 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
             self.db.update_user_data(sender.name, "enabled_sc", new_status)
             sender.send_message(f"§6Staff Chat has been {f'§aEnabled' if new_status == 1 else f'§cDisabled'}")
         else:
-            config = load_config()
-            message = f"{config['modules']['server_messages']['staff_chat_prefix']}{sender.name}: {args[0]}"
-            self.server.broadcast(message, "primebds.command.staffchat")
+            message = self.chat_formats.render("staff_chat", self.chat_states.get(sender).rank, player=sender.name, message=args[0])
+            self.subscriptions.send("enabled_sc", message)
+            self.server.command_sender.send_message(message)
 
     return True
@@ -1,4 +1,5 @@
 import time
+from datetime import datetime, timezone
 from endstone import Player
 from endstone.command import CommandSender
 from endstone_primebds.utils.command_util import create_command
@@ -92,6 +93,14 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
 
     # Paginate session history
     for session in paginated_sessions:
+        if 'day' in session:
+            # Compacted sessions are bucketed by UTC day, so the bucket is labelled in UTC too
+            day_str = datetime.fromtimestamp(session['day'], timezone.utc).strftime('%Y-%m-%d')
+            sender.send_message(
+                f"§7- §a{day_str} UTC §7({session['session_count']} sessions) §f({format_time(session['duration'])})"
+            )
+            continue
+
         start_str = TimezoneUtils.convert_to_timezone(session['start_time'], 'EST')
         end_str = TimezoneUtils.convert_to_timezone(session['end_time'], 'EST')
         duration_text = f"§f({format_time(session['duration'])})"
@@ -9,7 +9,6 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from endstone_primebds.primebds import PrimeBDS
 
-import endstone_primebds.utils.internal_permissions_util as perms_util
 config = load_config()
 rank_meta_nametags = config["modules"]["server_messages"]["rank_meta_nametags"] 
 
@@ -52,10 +51,8 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
     for target in targets:
         if new_nick.lower() == "clear":
             if rank_meta_nametags:
-                user = self.db.get_online_user(target.xuid)
-                prefix = perms_util.get_prefix(user.internal_rank, perms_util.PERMISSIONS)
-                suffix = perms_util.get_suffix(user.internal_rank, perms_util.PERMISSIONS)
-                target.name_tag = prefix+target.name+suffix
+                rank = self.chat_states.get(target).rank
+                target.name_tag = self.chat_formats.render("nametag", rank, player=target.name)
             else:
                 target.name_tag = target.name 
         else:
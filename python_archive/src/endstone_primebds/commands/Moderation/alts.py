@@ -51,14 +51,16 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
         target_status = f"{ColorFormat.GREEN}Online"
 
     alts = self.db.get_alts(ip, device_id, target_xuid)
+    linked = self.db.get_linked_alts(target_xuid)
 
-    if not alts:
+    if not alts and not linked:
         sender.send_message(
             f"§6No alternate accounts found for §e{player_name}"
         )
         return True
 
     alt_lines = []
+    shown = set()
     for alt in alts:
         if not alt: 
             continue
@@ -78,6 +80,15 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
         
         if tags: 
             alt_lines.append(f"{name or 'Unknown'} §7[{' & '.join(tags)} match§7]")
+            shown.add(alt.get("xuid"))
+
+    for alt in linked:
+        if alt["xuid"] in shown:
+            continue
+        if alt["via"]:
+            alt_lines.append(f"{alt['name'] or 'Unknown'} §7[Linked via §f{alt['via']}§7]")
+        else:
+            alt_lines.append(f"{alt['name'] or 'Unknown'} §7[Previously linked§7]")
 
     if not alt_lines:
         sender.send_message(
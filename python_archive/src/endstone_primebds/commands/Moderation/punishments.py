@@ -84,14 +84,12 @@ def remove_punishment_by_id(self: "PrimeBDS", sender: CommandSender, target_name
     """Removes a specific punishment by ID using a menu."""
 
     # Retrieve punishment history
-    
-    history = self.db.print_punishment_history(target_name)
-    punish_log = self.db.get_punishment_logs(target_name)
-
-    if not history:
+    if not self.db.has_punishment_history(target_name):
         sender.send_message(f"No more punishments found for §e{target_name}.")
         return False
 
+    punish_log = self.db.get_punishment_logs(target_name)
+
     # Create action form with punishments listed as buttons
     form = ActionFormData()
     form.title("Punishment Removal")
@@ -1,7 +1,7 @@
 from endstone import Player
 from endstone.command import CommandSender
 from endstone_primebds.utils.command_util import create_command
-from endstone.level import Location
+from endstone_primebds.utils.location_util import decode_location
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -36,21 +36,14 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
         sender.send_message(f"§cNo logout record found for {target_name}")
         return True
 
-    logout_log = user.last_logout_pos
-
-    try:
-        parts = logout_log.split(",")
-        x = float(parts[0])
-        y = float(parts[1])
-        z = float(parts[2])
-        dim = parts[3] if len(parts) > 3 else "Overworld"
-    except (ValueError, AttributeError, IndexError):
+    location = decode_location(user.last_logout_pos, self.server)
+    if location is None:
         sender.send_message(f"§cLogout location data missing or incomplete for {target_name}")
         return True
 
     try:
-        sender.teleport(Location(self.server.level.get_dimension(dim), x, y, z, sender.location.pitch, sender.location.yaw))
-        sender.send_message(f"Teleported to §e{target_name}§r's last logout location at §e({x:.1f}, {y:.1f}, {z:.1f} / {dim})")
+        sender.teleport(location)
+        sender.send_message(f"Teleported to §e{target_name}§r's last logout location at §e({location.x:.1f}, {location.y:.1f}, {location.z:.1f} / {location.dimension.name})")
     except Exception as e:
         sender.send_message(f"§cFailed to teleport to {target_name}'s logout location")
         print(e)
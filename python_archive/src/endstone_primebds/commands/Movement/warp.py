@@ -8,6 +8,8 @@ from time import time
 from endstone_primebds.utils.form_wrapper_util import (
     ActionFormData,
     ActionFormResponse,
+    ModalFormData,
+    ModalFormResponse
 )
 
 from typing import TYPE_CHECKING
@@ -48,7 +50,7 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
     warp_name = ""
 
     if sub == "list":
-        warps = self.serverdb.get_all_warps(self.server)
+        warps = self.serverdb.list_warps()
         if not warps:
             sender.send_message("§cThere are no warps set")
             return True
@@ -88,6 +90,9 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
     if not warp or not warp.get("pos"):
         warp_name = sub if not warp else warp.get("displayname") or sub
         sender.send_message(f"§cWarp §e{warp_name} §cdoes not exist")
+        suggestions = self.serverdb.suggest_warps(sub)
+        if suggestions:
+            sender.send_message(f"§7Did you mean: §e{'§7, §e'.join(suggestions)}")
         return True
 
     warp_name = warp.get("displayname") or warp["name"]
@@ -154,17 +159,16 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
     return True
 
 def open_warp_menu(self: "PrimeBDS", player: Player):
-    warps = self.serverdb.get_all_warps(self.server)
+    warps = self.serverdb.list_warps()
     categories: dict[str, list[str]] = {}
     uncategorized: list[str] = []
 
     for name, warp in warps.items():
-        display = warp.get("displayname") or name 
         cat = warp.get("category")
         if cat:
-            categories.setdefault(cat, []).append(display)
+            categories.setdefault(cat, []).append(name)
         else:
-            uncategorized.append(display)
+            uncategorized.append(name)
 
     buttons = list(categories.keys())
 
@@ -175,68 +179,95 @@ def open_warp_menu(self: "PrimeBDS", player: Player):
     form.title("Select Warp Category")
     for button in buttons:
         form.button(f"§b{button}")
+    form.button("§eSearch")
     form.button("Close")
 
     def submit(player: Player, result: ActionFormResponse):
-        if not result or result.selection is None or result.selection >= len(buttons):
+        if not result or result.selection is None or result.selection > len(buttons):
+            return True
+
+        if result.selection == len(buttons):
+            open_warp_search(self, player)
             return True
 
         selected_cat = buttons[result.selection]
-        warp_names = categories.get(selected_cat, []) + uncategorized
+        open_warp_list(self, player, f"Warps: {selected_cat}", categories.get(selected_cat, []) + uncategorized, warps)
+
+    form.show(player).then(lambda player=player, result=ActionFormResponse: submit(player, result))
+
+def open_warp_search(self: "PrimeBDS", player: Player):
+    form = ModalFormData()
+    form.title("Search Warps")
+    form.text_field("Warp name, display name or alias", "spawn, shop, ...")
 
+    def submit(player: Player, result: ModalFormResponse):
+        if not result or result.canceled:
+            open_warp_menu(self, player)
+            return True
+
+        query = str(result.formValues[0] or "")
+        warp_names = self.serverdb.suggest_warps(query, limit=10)
         if not warp_names:
-            player.send_message("§cNo warps available")
+            player.send_message(f"§cNo warps match §e{query}")
             open_warp_menu(self, player)
             return True
 
-        warp_form = ActionFormData()
-        warp_form.title(f"Warps: {selected_cat}")
-        for w in warp_names:
-            warp_form.button(f"§r{w}")
-        warp_form.button("Back")
+        open_warp_list(self, player, f"Warps: {query}", warp_names, self.serverdb.list_warps())
 
-        def warp_submit(player: Player, warp_result: ActionFormResponse):
-            if not warp_result or warp_result.selection is None or warp_result.selection >= len(warp_names):
-                open_warp_menu(self, player)
-                return True
+    form.show(player).then(lambda player=player, result=ModalFormResponse: submit(player, result))
 
-            selected_warp_name = warp_names[warp_result.selection]
-            warp_data = self.serverdb.get_warp_fuzzy(selected_warp_name, self.server)
-            if not warp_data or not warp_data.get("pos"):
-                player.send_message(f"§cWarp §e{selected_warp_name} §cdoes not exist")
-                open_warp_menu(self, player)
-                return True
-            
-            warp_name = warp_data.get("displayname") or warp_data.get("name")
-            
-            eco = get_eco_link(self)
-            warp_cost = warp_data.get("cost", 0)
-            if eco and warp_cost > 0:
-                cost_form = ActionFormData()
-                cost_form.title(f"Warp to {warp_name}")
-                cost_form.body(f"This warp costs §e{warp_cost} coins.§r\n\nDo you want to continue?")
-                cost_form.button("§aYes")
-                cost_form.button("§cNo")
-
-                def cost_submit(player: Player, cost_result: ActionFormResponse):
-                    if not cost_result or cost_result.selection != 0:
-                        player.send_message("§cWarp cancelled")
-                        return True
-
-                    bal = eco.api_get_player_money(player.name)
-                    if bal >= warp_cost:
-                        proceed_with_warp(self, player, warp_data, warp_name, warp_cost)
-                    else:
-                        player.send_message("§cWarp cancelled due to lack of funds")
-
-                cost_form.show(player).then(lambda player=player, result=ActionFormResponse: cost_submit(player, result))
-                return True 
-
-            proceed_with_warp(self, player, warp_data, warp_name)
-
-        warp_form.show(player).then(lambda player=player, result=ActionFormResponse: warp_submit(player, result))
+def open_warp_list(self: "PrimeBDS", player: Player, title: str, warp_names: list[str], warps: dict[str, dict]):
+    if not warp_names:
+        player.send_message("§cNo warps available")
+        open_warp_menu(self, player)
+        return True
 
-    form.show(player).then(lambda player=player, result=ActionFormResponse: submit(player, result))
+    warp_form = ActionFormData()
+    warp_form.title(title)
+    for w in warp_names:
+        warp_form.button(f"§r{warps.get(w, {}).get('displayname') or w}")
+    warp_form.button("Back")
+
+    def warp_submit(player: Player, warp_result: ActionFormResponse):
+        if not warp_result or warp_result.selection is None or warp_result.selection >= len(warp_names):
+            open_warp_menu(self, player)
+            return True
+
+        selected_warp_name = warp_names[warp_result.selection]
+        warp_data = self.serverdb.get_warp(selected_warp_name, self.server)
+        if not warp_data or not warp_data.get("pos"):
+            player.send_message(f"§cWarp §e{selected_warp_name} §cdoes not exist")
+            open_warp_menu(self, player)
+            return True
+        
+        warp_name = warp_data.get("displayname") or warp_data.get("name")
+        
+        eco = get_eco_link(self)
+        warp_cost = warp_data.get("cost", 0)
+        if eco and warp_cost > 0:
+            cost_form = ActionFormData()
+            cost_form.title(f"Warp to {warp_name}")
+            cost_form.body(f"This warp costs §e{warp_cost} coins.§r\n\nDo you want to continue?")
+            cost_form.button("§aYes")
+            cost_form.button("§cNo")
+
+            def cost_submit(player: Player, cost_result: ActionFormResponse):
+                if not cost_result or cost_result.selection != 0:
+                    player.send_message("§cWarp cancelled")
+                    return True
+
+                bal = eco.api_get_player_money(player.name)
+                if bal >= warp_cost:
+                    proceed_with_warp(self, player, warp_data, warp_name, warp_cost)
+                else:
+                    player.send_message("§cWarp cancelled due to lack of funds")
+
+            cost_form.show(player).then(lambda player=player, result=ActionFormResponse: cost_submit(player, result))
+            return True 
+
+        proceed_with_warp(self, player, warp_data, warp_name)
+
+    warp_form.show(player).then(lambda player=player, result=ActionFormResponse: warp_submit(player, result))
 
 def proceed_with_warp(self: "PrimeBDS", player: Player, warp_data: dict, warp_name: str, warp_cost: int = 0):
     if not isinstance(warp_data, dict):
@@ -49,7 +49,7 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
     sub = args[0].lower()
 
     if sub == "list":
-        warps = self.serverdb.get_all_warps(self.server)
+        warps = self.serverdb.list_warps()
         if not warps:
             sender.send_message("§cThere are no warps set")
             return True
@@ -232,7 +232,7 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
     return False
 
 def open_warps_menu(self: "PrimeBDS", player):
-    warps = self.serverdb.get_all_warps(self.server)
+    warps = self.serverdb.list_warps()
 
     if not warps:
         player.send_message("§cNo warps exist")
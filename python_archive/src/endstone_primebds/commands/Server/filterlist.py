@@ -43,79 +43,51 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
         except Exception as e:
             return [f"§cFailed to read permissions.json: {e}"]
 
-    def get_default():
-        return [
-            p['name']
-            for p in self.db.get_all_users()
-            if p.get('internal_rank', '').lower() == "default"
-        ]
-
     def get_online():
         return [pl.name for pl in self.server.online_players]
 
-    def get_offline():
-        online = {pl.name for pl in self.server.online_players}
-        return [p['name'] for p in self.db.get_all_users() if p['name'] not in online]
-
-    def get_muted():
-        """Return a list of currently muted player names (expired mutes auto-removed)."""
-        muted_players = []
-
-        for user in self.db.get_all_users():
-            name = user['name']
-            xuid = user['xuid']
-            mod_log = self.db.get_offline_mod_log(name)
-
-            if mod_log and mod_log.is_muted:
-                is_still_muted = self.db.check_and_update_mute(xuid, name)
-                if is_still_muted:
-                    muted_players.append(name)
-
-        return muted_players
-
-    def get_banned():
-        """Return a list of all banned player names with labels for type."""
-        banned_players = []
-
-        for user in self.db.get_all_users():
-            name = user['name']
-            mod_log = self.db.get_offline_mod_log(name)
+    def page_of(names: list[str]) -> tuple[int, list[str]]:
+        start_idx = (page - 1) * MAX_PER_PAGE
+        return len(names), names[start_idx:start_idx + MAX_PER_PAGE]
 
-            if mod_log and getattr(mod_log, "is_banned", False):
-                banned_players.append(f"{name} §7(User Banned)")
+    def page_of_players(exclude_names: list[str] = ()) -> tuple[int, list[str]]:
+        """Count and fetch only the requested page; the database does the filtering."""
+        total = self.db.count_players(filter_type, exclude_names)
+        if not 1 <= page <= ceil(total / MAX_PER_PAGE):
+            return total, []
+        return total, self.db.get_player_page(filter_type, MAX_PER_PAGE, (page - 1) * MAX_PER_PAGE, exclude_names)
 
+    def page_of_banned() -> tuple[int, list[str]]:
+        """User bans first, then name bans, paged across both."""
+        user_total = self.db.count_players("banned")
         try:
-            server_bans = self.serverdb.get_all_bans()
-            for entry in server_bans:
-                banned_name = entry.get("name") if isinstance(entry, dict) else str(entry)
-                if banned_name:
-                    banned_players.append(f"{banned_name} §7(Name Banned)")
+            name_total = self.serverdb.count_name_bans()
         except Exception as e:
             self.logger.warn(f"Failed to fetch server bans: {e}")
-
-        return banned_players
-
-    def get_ipbanned():
-        """Return a list of currently IP-banned player names."""
-        ipbanned_players = []
-
-        for user in self.db.get_all_users():
-            name = user['name']
-            mod_log = self.db.get_offline_mod_log(name)
-
-            if mod_log and getattr(mod_log, "is_ip_banned", False):
-                ipbanned_players.append(name)
-
-        return ipbanned_players
+            name_total = 0
+
+        total = user_total + name_total
+        if not 1 <= page <= ceil(total / MAX_PER_PAGE):
+            return total, []
+
+        offset = (page - 1) * MAX_PER_PAGE
+        results = []
+        if offset < user_total:
+            names = self.db.get_player_page("banned", MAX_PER_PAGE, offset, ())
+            results += [f"{name} §7(User Banned)" for name in names]
+        if len(results) < MAX_PER_PAGE and name_total:
+            names = self.serverdb.get_name_ban_page(MAX_PER_PAGE - len(results), max(0, offset - user_total))
+            results += [f"{name} §7(Name Banned)" for name in names]
+        return total, results
 
     filters = {
-        "ops": get_ops,
-        "default": get_default,
-        "online": get_online,
-        "offline": get_offline,
-        "muted": get_muted,
-        "banned": get_banned,
-        "ipbanned": get_ipbanned
+        "ops": lambda: page_of(get_ops()),
+        "default": page_of_players,
+        "online": lambda: page_of(get_online()),
+        "offline": lambda: page_of_players(get_online()),
+        "muted": page_of_players,
+        "banned": page_of_banned,
+        "ipbanned": page_of_players
     }
 
     if filter_type not in filters:
@@ -123,8 +95,7 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
         
         return False
 
-    all_results = filters[filter_type]()
-    total = len(all_results)
+    total, results = filters[filter_type]()
 
     if total == 0:
         sender.send_message(f"§7No {filter_type} players found")
@@ -137,10 +108,6 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
         
         return False
 
-    start_idx = (page - 1) * MAX_PER_PAGE
-    end_idx = start_idx + MAX_PER_PAGE
-    results = all_results[start_idx:end_idx]
-
     header = f"§r{filter_type.capitalize()} Players §7(Page {page}/{total_pages}):"
     body = "\n".join(f"§7- §e{name}" for name in results)
     sender.send_message(header + "\n" + body)
@@ -2,8 +2,11 @@ import re
 from endstone import Player
 from endstone.command import CommandSender
 
+from endstone_primebds.handlers.preprocesses import PREPROCESS_STATS
+from endstone_primebds.utils.cache_util import cache_stats
 from endstone_primebds.utils.command_util import create_command
 from endstone_primebds.utils.config_util import load_config, save_config, reload_config, save_cmd_config, load_cmd_config
+from endstone_primebds.utils.logging_util import webhook_stats
 from endstone_primebds.utils.form_wrapper_util import ModalFormData, ModalFormResponse, ActionFormData, ActionFormResponse
 
 from typing import TYPE_CHECKING
@@ -13,7 +16,7 @@ if TYPE_CHECKING:
 command, permission = create_command(
     "primebds",
     "An all-in-one primebds manager!",
-    ["/primebds (config|command|info|reloadconfig)[primebds_subaction: primebds_subaction]"],
+    ["/primebds (config|command|info|reloadconfig|database|queryplan|caches|preprocess)[primebds_subaction: primebds_subaction]"],
     ["primebds.command.primebds"]
 )
 
@@ -41,11 +44,111 @@ def handler(self: "PrimeBDS", sender: CommandSender, args: list[str]) -> bool:
     elif args[0].lower() == "reloadconfig":
         reload_config()
         sender.send_message(f"§dPrimeBDS config reloaded!")
+    elif args[0].lower() == "database":
+        send_database_stats(self, sender)
+    elif args[0].lower() == "queryplan":
+        send_query_plan_report(self, sender)
+    elif args[0].lower() == "caches":
+        send_cache_stats(sender)
+    elif args[0].lower() == "preprocess":
+        send_preprocess_stats(sender)
     elif args[0].lower() == "info":
         sender.send_message(f"§dPrimeBDS\n§d{self.description}\n\n§dIf this plugin has helped you at all, consider leaving a star:\n§e@ https://github.com/PrimeStrat/primebds\n\n§dConfused on how something works?\nVisit the wiki:\n§e@ https://github.com/PrimeStrat/primebds/wiki")
 
     return True
 
+def send_database_stats(self: "PrimeBDS", sender: CommandSender):
+    lines = ["§dPrimeBDS Database"]
+    for label, db in (("users", self.db), ("sessions", self.sldb), ("server", self.serverdb)):
+        pool = db.read_pool.stats()
+        lines.append(
+            f"§e{label}§7: readers §f{pool['open']}/{pool['size']} §7(in use §f{pool['in_use']}§7, peak §f{pool['peak_in_use']}§7) "
+            f"checkouts §f{pool['checkouts']} §7waits §f{pool['waits']}"
+        )
+    queued = self.db.write_behind_stats
+    lines.append(
+        f"§euser writes§7: queued §f{queued['queued']} §7coalesced §f{queued['coalesced']} "
+        f"§7flushes §f{queued['flushes']} §7rows §f{queued['rows_flushed']}"
+    )
+    back = self.serverdb.last_location_stats
+    lines.append(
+        f"§e/back locations§7: queued §f{back['queued']} §7coalesced §f{back['coalesced']} "
+        f"§7flushes §f{back['flushes']} §7rows §f{back['rows_flushed']}"
+    )
+    chat = self.chat_states.stats
+    lines.append(f"§echat states§7: players §f{len(self.chat_states)} §7hits §f{chat['hits']} §7builds §f{chat['builds']}")
+    subscribers = self.subscriptions.counts()
+    lines.append(
+        f"§esubscribers§7: social spy §f{subscribers['enabled_ss']} §7mod spy §f{subscribers['enabled_ms']} "
+        f"§7alt spy §f{subscribers['enabled_as']} §7staff chat §f{subscribers['enabled_sc']}"
+    )
+    webhooks = webhook_stats()
+    lines.append(
+        f"§ediscord webhooks§7: sent §f{webhooks.get('sent', 0)} §7posts §f{webhooks.get('posts', 0)} "
+        f"§7pending §f{webhooks['pending']} §7dropped §f{webhooks.get('dropped', 0)} "
+        f"§7rate limited §f{webhooks.get('rate_limited', 0)} §7failed §f{webhooks.get('failed', 0)}"
+    )
+    index = self.moderation.size()
+    lines.append(
+        f"§emoderation index§7: entries §f{index['entries']} §7hosts §f{index['hosts']} "
+        f"§7name bans §f{index['name_bans']} §7lookups §f{self.moderation.stats['lookups']}"
+    )
+    expired = self.expiry.stats
+    lines.append(
+        f"§eexpiry§7: pending §f{self.expiry.pending()} §7fired mutes §f{expired['mute']} §7bans §f{expired['ban']} "
+        f"§7ip bans §f{expired['ip_ban']} §7alt links §f{expired['alt']}"
+    )
+    executor = self.db_executor.stats
+    lines.append(
+        f"§eexecutor§7: pending §f{self.db_executor.pending()} §7completed §f{executor['completed']} "
+        f"§7failed §f{executor['failed']} §7callbacks §f{executor['callbacks']}"
+    )
+    warps = self.serverdb.warps.stats
+    lines.append(
+        f"§ewarp index§7: lookups §f{warps['lookups']} §7exact §f{warps['exact']} §7prefix §f{warps['prefix']} "
+        f"§7scored §f{warps['scored']} §7misses §f{warps['misses']}"
+    )
+    changes = [db.change_stats for db in (self.db, self.sldb, self.serverdb)]
+    lines.append(
+        f"§echange feed§7: published §f{sum(c['published'] for c in changes)} "
+        f"§7foreign writes §f{sum(c['foreign_writes'] for c in changes)} §7applied §f{sum(c['applied'] for c in changes)}"
+    )
+    sender.send_message("\n".join(lines))
+
+def send_cache_stats(sender: CommandSender):
+    lines = ["§dPrimeBDS Caches"]
+    for name, stats in cache_stats().items():
+        lines.append(
+            f"§e{name}§7: §f{stats['size']}/{stats['max_size']} §7hits §f{stats['hits']} §7misses §f{stats['misses']} "
+            f"§7({stats['hit_rate']:.0%}) evictions §f{stats['evictions']} §7expired §f{stats['expirations']}"
+        )
+    sender.send_message("\n".join(lines))
+
+def send_preprocess_stats(sender: CommandSender):
+    lines = ["§dPrimeBDS Command Preprocess"]
+    if not PREPROCESS_STATS:
+        lines.append("§7No commands intercepted yet")
+    for cmd, stats in sorted(PREPROCESS_STATS.items(), key=lambda item: item[1]["seconds"], reverse=True):
+        average = stats["seconds"] / stats["calls"] * 1000 if stats["calls"] else 0.0
+        lines.append(
+            f"§e/{cmd}§7: calls §f{stats['calls']} §7cancelled §f{stats['cancelled']} "
+            f"§7total §f{stats['seconds'] * 1000:.1f}ms §7avg §f{average:.2f}ms"
+        )
+    sender.send_message("\n".join(lines))
+
+def send_query_plan_report(self: "PrimeBDS", sender: CommandSender):
+    lines = ["§dPrimeBDS Query Plans"]
+    for label, db in (("users", self.db), ("sessions", self.sldb), ("server", self.serverdb)):
+        scans = db.find_table_scans()
+        if not scans:
+            lines.append(f"§e{label}§7: §ano full table scans")
+            continue
+        lines.append(f"§e{label}§7: §c{len(scans)} statement(s) scan a full table")
+        for query, steps in scans:
+            shown = query if len(query) <= 120 else query[:117] + "..."
+            lines.append(f"§7- §f{shown} §8[{', '.join(steps)}]")
+    sender.send_message("\n".join(lines))
+
 def command_form(self: "PrimeBDS", sender: Player):
     form = ActionFormData()
     form.title("Command GUI")
@@ -31,7 +31,8 @@ def preload_settings():
         }),
         "back": OrderedDict({
             "save_unnatural_teleports": True,
-            "save_death_locations": True
+            "save_death_locations": True,
+            "flush_seconds": 5
         }),
         "broadcast": OrderedDict({
             "prefix": "§l§8[§c!§8] §r§e",
@@ -67,7 +68,8 @@ def preload_settings():
             "connection_logs": OrderedDict({
                 "enabled": False,
                 "webhook": ""
-            })
+            }),
+            "queue_size": 500
         }),
         "spectator_check": OrderedDict({
             "check_gamemode": True,
@@ -98,7 +100,13 @@ def preload_settings():
             "chat_prefix": "§r: ",
             "whisper_prefix": "§8[§bWhisper§8]§r ",
             "social_spy_prefix": "§8[§bSocial Spy§8]§r ",
-            "staff_chat_prefix": "§8[§bStaff Chat§8]§r "
+            "staff_chat_prefix": "§8[§bStaff Chat§8]§r ",
+            "chat_format": "{rank_prefix}{player}{rank_suffix}{chat_prefix}§r{message}",
+            "nametag_format": "{rank_prefix}{player}{rank_suffix}",
+            "whisper_to_format": "{whisper_prefix}§7To {target}: §o{message}",
+            "whisper_from_format": "{whisper_prefix}§7From {player}: §o{message}",
+            "social_spy_format": "{social_spy_prefix}§8[§r{player} §7-> §r{target}§8] §7{message}",
+            "staff_chat_format": "{staff_chat_prefix}§e{player}§7: §6{message}"
         }),
         "message_of_the_day": OrderedDict({
             "message_of_the_day_command": "§cUnset",
@@ -137,6 +145,17 @@ def preload_settings():
                     "disable_sprint_hits": True
                 })
             })
+        }),
+        "database": OrderedDict({
+            "read_pool_size": 4,
+            "write_behind_flush_seconds": 2,
+            "write_behind_max_pending": 64,
+            "session_rollup_after_days": 30,
+            "session_compaction_batch_size": 200,
+            "session_compaction_interval_seconds": 5,
+            "cache_max_entries": 1024,
+            "cache_ttl_seconds": 60,
+            "change_poll_seconds": 1
         })
     })
 
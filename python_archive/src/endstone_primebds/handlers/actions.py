@@ -13,14 +13,14 @@ def handle_teleport_event(self: "PrimeBDS", ev: PlayerTeleportEvent):
     config = load_config()
     teleports = config["modules"]["back"]["save_unnatural_teleports"]
     if teleports:
-        self.serverdb.set_last_warp(ev.from_location, ev.player.xuid, ev.player.name)
+        self.serverdb.queue_last_warp(ev.from_location, ev.player.xuid, ev.player.name)
     return
 
 def handle_death_event(self: "PrimeBDS", ev: PlayerDeathEvent):
     config = load_config()
     deaths = config["modules"]["back"]["save_death_locations"]
     if deaths:
-        self.serverdb.set_last_warp(ev.player.location, ev.player.xuid, ev.player.name)
+        self.serverdb.queue_last_warp(ev.player.location, ev.player.xuid, ev.player.name)
     return
 
 def handle_interact_event(self: "PrimeBDS", ev: PlayerInteractActorEvent):
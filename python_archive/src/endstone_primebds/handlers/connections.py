@@ -9,9 +9,9 @@ from datetime import datetime
 
 from endstone_primebds.utils.config_util import load_config
 from endstone_primebds.utils.mod_util import format_time_remaining, ban_message
+from endstone_primebds.utils.location_util import encode_location
 from endstone_primebds.utils.logging_util import log, discordRelay
 
-import endstone_primebds.utils.internal_permissions_util as perms_util
 
 if TYPE_CHECKING:
     from endstone_primebds.primebds import PrimeBDS
@@ -26,15 +26,16 @@ def handle_login_event(self: "PrimeBDS", ev: PlayerLoginEvent):
     player_xuid = ev.player.xuid
     player_ip = str(ev.player.address)
 
-    mod_log = self.db.get_mod_log(player_xuid)
-    is_ip_banned = self.db.check_ip_ban(player_ip)
+    # Pure lookups against the in-memory moderation index
+    xuid_ban = self.moderation.get_ban(player_xuid)
+    ip_ban_log = self.moderation.get_ip_ban(player_ip)
 
     # Handle Name Ban
     if self.serverdb.check_nameban(ev.player.name):
         name_ban_log = self.serverdb.get_ban_info(ev.player.name)
         banned_time = datetime.fromtimestamp(name_ban_log.banned_time)
         if now >= banned_time:
-            self.serverdb.remove_name(player_ip)
+            self.serverdb.remove_name(ev.player.name)
         else:  
             formatted_expiration = format_time_remaining(name_ban_log.banned_time)
             message = ban_message(self.server.level.name, formatted_expiration, name_ban_log.ban_reason)
@@ -42,27 +43,25 @@ def handle_login_event(self: "PrimeBDS", ev: PlayerLoginEvent):
             ev.is_cancelled = True 
     
     # Handle IP Ban
-    if is_ip_banned:
-        ip_ban_log = self.db.get_ip_ban_log(player_ip) if hasattr(self.db, 'get_ip_ban_log') else mod_log
-        if ip_ban_log:
-            banned_time = datetime.fromtimestamp(ip_ban_log.banned_time)
-            if now >= banned_time:
-                self.db.remove_ban(player_ip)
-            else:
-                formatted_expiration = format_time_remaining(ip_ban_log.banned_time)
-                message = ban_message(self.server.level.name, formatted_expiration, "IP Ban - " + (ip_ban_log.ban_reason or "No reason"))
-                ev.kick_message = message
-                ev.is_cancelled = True 
+    if ip_ban_log:
+        banned_time = datetime.fromtimestamp(ip_ban_log.banned_time)
+        if now >= banned_time:
+            self.db.remove_ip_ban(player_ip)
+        else:
+            formatted_expiration = format_time_remaining(ip_ban_log.banned_time)
+            message = ban_message(self.server.level.name, formatted_expiration, "IP Ban - " + (ip_ban_log.ban_reason or "No reason"))
+            ev.kick_message = message
+            ev.is_cancelled = True 
 
     # Handle XUID Ban
-    elif mod_log:
-        if mod_log.is_banned:  # Only proceed if the player is banned
-            banned_time = datetime.fromtimestamp(mod_log.banned_time)
+    elif xuid_ban:
+        if xuid_ban.is_banned:  # Only proceed if the player is banned
+            banned_time = datetime.fromtimestamp(xuid_ban.banned_time)
             if now >= banned_time:  # Ban has expired
-                self.db.remove_ban(player_xuid)
+                self.db.remove_ban(xuid_ban.name)
             else:  # Ban is still active
-                formatted_expiration = format_time_remaining(mod_log.banned_time)
-                message = ban_message(self.server.level.name, formatted_expiration, mod_log.ban_reason)
+                formatted_expiration = format_time_remaining(xuid_ban.banned_time)
+                message = ban_message(self.server.level.name, formatted_expiration, xuid_ban.ban_reason)
                 ev.kick_message = message
                 ev.is_cancelled = True 
 
@@ -85,38 +84,44 @@ def handle_join_event(self: "PrimeBDS", ev: PlayerJoinEvent):
 
     # Update Saved Data
     self.db.save_user(ev.player)
-    self.db.update_user_data(ev.player.name, "is_afk", 0)
-    self.db.update_user_data(ev.player.name, 'last_join', int(time.time()))
-    self.db.check_alts(ev.player.xuid, ev.player.name, str(ev.player.address), ev.player.device_id)
+    self.db.queue_user_update(ev.player.xuid, {'is_afk': 0, 'last_join': int(time.time())})
     self.server.scheduler.run_task(self, self.reload_custom_perms(ev.player), 1)
 
     user = self.db.get_online_user(ev.player.xuid)
+    player_name = ev.player.name
 
     # Ban System: ENHANCEMENT
     mod_log = self.db.get_mod_log(ev.player.xuid)
+    report_alts = bool(mod_log) and not mod_log.is_banned
     if mod_log:
         if mod_log.is_banned:
             ev.join_message = "" 
         else:
-            # Handle Alt Detection
-            alts = self.db.get_alts(str(ev.player.address), ev.player.device_id, ev.player.xuid)
-            if len(alts) > 0:
-                alt_names = ", ".join(alt["name"] for alt in alts)
-                message = f"{ColorFormat.GOLD}Alt Detected: {ColorFormat.YELLOW}{ev.player.name} {ColorFormat.GRAY}-> {ColorFormat.DARK_GRAY}[{ColorFormat.GRAY}{alt_names}{ColorFormat.DARK_GRAY}]"
-                log(self, message, "mod", toggles=["enabled_as"])
-
             # Handle Activity
-            self.sldb.start_session(ev.player.xuid, ev.player.name, int(time.time()))
+            self.sldb.start_session_async(ev.player.xuid, player_name, int(time.time()))
+
+    # Handle Alt Detection
+    def on_alts(alts: list[dict]):
+        if report_alts and len(alts) > 0:
+            alt_names = ", ".join(alt["name"] for alt in alts)
+            message = f"{ColorFormat.GOLD}Alt Detected: {ColorFormat.YELLOW}{player_name} {ColorFormat.GRAY}-> {ColorFormat.DARK_GRAY}[{ColorFormat.GRAY}{alt_names}{ColorFormat.DARK_GRAY}]"
+            log(self, message, "mod", toggles=["enabled_as"])
+
+    self.db.check_alts_async(ev.player.xuid, player_name, str(ev.player.address), ev.player.device_id, callback=on_alts)
 
-    warning = self.db.get_latest_active_warning(ev.player.xuid, ev.player.name)
-    if warning:
-        reason = warning.get("warn_reason", "Negative Behavior")
-        ev.player.send_message(f"{ColorFormat.GOLD}Reminder: You were recently warned for {ColorFormat.YELLOW}{reason}")
+    def on_warning(warning):
+        player = self.server.get_player(player_name)
+        if warning and player:
+            reason = warning.get("warn_reason", "Negative Behavior")
+            player.send_message(f"{ColorFormat.GOLD}Reminder: You were recently warned for {ColorFormat.YELLOW}{reason}")
+
+    self.db.get_latest_active_warning_async(ev.player.xuid, player_name, callback=on_warning)
 
     if rank_meta_nametags:
-        prefix = perms_util.get_prefix(user.internal_rank, perms_util.PERMISSIONS)
-        suffix = perms_util.get_suffix(user.internal_rank, perms_util.PERMISSIONS)
-        ev.player.name_tag = prefix+ev.player.name+suffix
+        ev.player.name_tag = self.chat_formats.render("nametag", user.internal_rank, player=ev.player.name)
+
+    self.chat_states.build(ev.player)
+    self.subscriptions.add(ev.player)
 
     discordRelay(f"**{ev.player.name}** has joined the server ***({len(self.server.online_players)}/{self.server.max_players})***", "connections")
     return
@@ -131,9 +136,16 @@ def handle_leave_event(self: "PrimeBDS", ev: PlayerQuitEvent):
         ev.quit_message = f"{leave_message.replace('{player}', ev.player.name)}"
 
     # Update Data On Leave
-    self.db.update_user_data(ev.player.name, 'xp', ev.player.total_exp)
-    self.db.update_user_data(ev.player.name, 'last_leave', int(time.time()))
-    self.db.update_user_data(ev.player.name, "is_afk", 0)
+    self.db.queue_user_update(ev.player.xuid, {
+        'xp': ev.player.total_exp,
+        'last_leave': int(time.time()),
+        'is_afk': 0
+    })
+
+    # Persist the player's /back location now instead of waiting for the flush timer, then drop it from memory
+    self.serverdb.flush_last_warps_async([ev.player.xuid], forget=True)
+    self.chat_states.discard(ev.player.xuid)
+    self.subscriptions.remove(ev.player.xuid)
 
     # Ban System: ENHANCEMENT
     mod_log = self.db.get_mod_log(ev.player.xuid)
@@ -142,15 +154,14 @@ def handle_leave_event(self: "PrimeBDS", ev: PlayerQuitEvent):
             ev.quit_message = ""  # Remove join message
         else:
             # User Log
-            self.sldb.end_session(ev.player.xuid, int(time.time()))
-            rounded_x = round(ev.player.location.x)
-            rounded_y = round(ev.player.location.y)
-            rounded_z = round(ev.player.location.z)
-            self.db.update_user_data(ev.player.name, 'last_logout_pos', f"{rounded_x},{rounded_y},{rounded_z}")
-            self.db.update_user_data(ev.player.name, 'last_logout_dim', ev.player.dimension.name)
+            self.sldb.end_session_async(ev.player.xuid, int(time.time()))
+            self.db.queue_user_update(ev.player.xuid, {
+                'last_logout_pos': encode_location(ev.player.location),
+                'last_logout_dim': ev.player.dimension.name
+            })
 
     discordRelay(f"**{ev.player.name}** has left the server ***({len(self.server.online_players)-1}/{self.server.max_players})***", "connections")
     return
 
 def handle_kick_event(self: "PrimeBDS", ev: PlayerKickEvent):
-    self.sldb.end_session(ev.player.xuid, int(time.time()))
\ No newline at end of file
+    self.sldb.end_session_async(ev.player.xuid, int(time.time()))
\ No newline at end of file
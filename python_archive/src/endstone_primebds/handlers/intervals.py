@@ -40,8 +40,8 @@ def check_afk(self: "PrimeBDS"):
 
     for player in self.server.online_players:
         try:
-            row = self.db.execute("SELECT is_afk FROM users WHERE xuid = ?", (player.xuid,)).fetchone()
-            is_afk = bool(row[0]) if row else False
+            user = self.db.get_online_user(player.xuid)
+            is_afk = bool(user.is_afk) if user else False
 
             if player.xuid not in self.afk_cache:
                 self.afk_cache[player.xuid] = {"pos": player.location, "idle_time": 0}
@@ -1,9 +1,10 @@
 import shlex
-from endstone import ColorFormat
+import time
+from endstone import ColorFormat, Player
 from endstone.event import PlayerCommandEvent, ServerCommandEvent
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Optional
 
-from endstone_primebds.utils.config_util import load_config
+from endstone_primebds.utils.config_util import load_config, config_generation
 from endstone_primebds.utils.logging_util import log, discordRelay
 from endstone_primebds.utils.target_selector_util import get_matching_actors
 
@@ -28,138 +29,187 @@ PARSE_COMMANDS = (
     | {"teleport", "tp", "stop"}
 )
 
+# Player command -> handler, filled in by @preprocessor below. MODERATION_COMMANDS
+# without an entry only get the exempt-target check.
+PREPROCESSORS: dict[str, Callable[..., Optional[bool]]] = {}
+
+# Calls, cancellations and time spent per intercepted player command
+PREPROCESS_STATS: dict[str, dict] = {}
+
+# (config generation, whether commands are relayed to Discord); re-read only when config.json changes
+_command_logs: tuple[int, bool] = (-1, False)
+
+def preprocessor(*commands: str):
+    """Register the function as the preprocess handler for the given player commands."""
+    def register(func: Callable[..., Optional[bool]]):
+        for name in commands:
+            PREPROCESSORS[name] = func
+        return func
+    return register
+
+def command_head(command: str) -> str:
+    """The lowercased command name without its slash, found without tokenizing the arguments."""
+    parts = command.split(None, 1)
+    return parts[0].lstrip("/").lower() if parts else ""
+
+def command_logs_enabled() -> bool:
+    """Whether player commands go to the command log webhook, checked once per config generation."""
+    global _command_logs
+    generation = config_generation()
+    if _command_logs[0] != generation:
+        command_logs = load_config()["modules"]["discord_webhook"]["command_logs"]
+        _command_logs = (generation, bool(command_logs["enabled"] and command_logs["webhook"]))
+    return _command_logs[1]
+
 def handle_command_preprocess(self: "PrimeBDS", event: PlayerCommandEvent):
     command = event.command
     player = event.player
 
+    if command_logs_enabled():
+        discordRelay(f"**{player.name}** ran: {command}", "cmd")
+
+    # Most commands are not ours to rewrite; only those pay for quote-aware parsing
+    cmd = command_head(command)
+    if cmd not in PARSE_COMMANDS:
+        return
+
+    config = load_config()
+    started = time.perf_counter()
     try:
         args = shlex.split(command)
     except ValueError as e:
         player.send_message(f"{ColorFormat.RED}Invalid command syntax: {e}")
         return True
-    
-    config = load_config()
-    if config["modules"]["discord_webhook"]["command_logs"]["enabled"]:
-        discordRelay(f"**{player.name}** ran: {command}", "cmd")
-    
-    cmd = args[0].lstrip("/").lower() if args else ""
-    if cmd not in PARSE_COMMANDS:
-        return 
-    
-    modules = config.get("modules", {})
-    perms_manager = modules.get("permissions_manager", {})
-    minecraft_enabled = perms_manager.get("minecraft", True)
-    endstone_enabled = perms_manager.get("endstone", True)
-
-    if cmd in MSG_CMDS and command.count("@e") >= 5:
-        if player.xuid not in self.crasher_patch_applied:
-            for perm in [
-                "minecraft.command.me", "minecraft.command.tellraw", "minecraft.command.tell",
-                "minecraft.command.w", "minecraft.command.msg"
-            ]:
-                event.player.add_attachment(self, perm, False)
-
-            self.crasher_patch_applied.add(player.xuid)
 
+    if cmd in MODERATION_COMMANDS and is_exempt_target(self, player, cmd, args):
         event.is_cancelled = True
+        result = True
+    else:
+        handler = PREPROCESSORS.get(cmd)
+        result = handler(self, event, cmd, args, config) if handler else None
 
-        if config["modules"]["me_crasher_patch"]["enabled"]:
-            if config["modules"]["me_crasher_patch"]["ban"]:
-                self.server.dispatch_command(
-                    self.server.command_sender,
-                    f"tempban {player.name} 7 day Crasher Exploit"
-                )
-            else:
-                log(self, f"{ColorFormat.GOLD}Player {ColorFormat.YELLOW}{player.name} {ColorFormat.GOLD}was kicked due to {ColorFormat.YELLOW}Crasher Exploit", "mod")
-                player.kick("Disconnected")
+    stats = PREPROCESS_STATS.setdefault(cmd, {"calls": 0, "cancelled": 0, "seconds": 0.0})
+    stats["calls"] += 1
+    stats["cancelled"] += bool(event.is_cancelled)
+    stats["seconds"] += time.perf_counter() - started
+    return result
+
+def is_exempt_target(self: "PrimeBDS", player: Player, cmd: str, args: list[str]) -> bool:
+    if len(args) < 2 or "@" in args[1]:
         return False
 
-    is_exempt = False
-    if cmd in MODERATION_COMMANDS and len(args) >= 2 and "@" not in args[1]:
-        target = self.db.get_offline_user(args[1])
-        if target:
-            if (
-                (cmd == "warn" and perms_util.check_perms(self, target, "primebds.exempt.warn")) or
-                (cmd == "kick" and perms_util.check_perms(self, target, "primebds.exempt.kick")) or
-                (cmd in {"mute", "tempmute"} and perms_util.check_perms(self, target, "primebds.exempt.mute")) or
-                (cmd in {"permban", "tempban", "ipban", "ban", "ban-ip"} and perms_util.check_perms(self, target, "primebds.exempt.ban"))
-            ):
-                player.send_message(f"{ColorFormat.GOLD}Player {ColorFormat.YELLOW}{target.name} {ColorFormat.GOLD}is exempt from {ColorFormat.YELLOW}{cmd}")
-                is_exempt = True
-    if is_exempt:
-        event.is_cancelled = True
+    target = self.db.get_offline_user(args[1])
+    if target and (
+        (cmd == "warn" and perms_util.check_perms(self, target, "primebds.exempt.warn")) or
+        (cmd == "kick" and perms_util.check_perms(self, target, "primebds.exempt.kick")) or
+        (cmd in {"mute", "tempmute"} and perms_util.check_perms(self, target, "primebds.exempt.mute")) or
+        (cmd in {"permban", "tempban", "ipban", "ban", "ban-ip"} and perms_util.check_perms(self, target, "primebds.exempt.ban"))
+    ):
+        player.send_message(f"{ColorFormat.GOLD}Player {ColorFormat.YELLOW}{target.name} {ColorFormat.GOLD}is exempt from {ColorFormat.YELLOW}{cmd}")
         return True
+    return False
 
-    if (cmd == "teleport" or cmd == "tp") and minecraft_enabled and player.has_permission("minecraft.command.teleport") and not player.is_op: # Bypass TP exception
-        self.server.dispatch_command(self.server.command_sender, f"execute as \"{player.name}\" at \"{player.name}\" run {command}")
+def manager_enabled(config: dict, name: str) -> bool:
+    return config.get("modules", {}).get("permissions_manager", {}).get(name, True)
+
+@preprocessor("teleport", "tp")
+def preprocess_teleport(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    player = event.player
+    if manager_enabled(config, "minecraft") and player.has_permission("minecraft.command.teleport") and not player.is_op: # Bypass TP exception
+        self.server.dispatch_command(self.server.command_sender, f"execute as \"{player.name}\" at \"{player.name}\" run {event.command}")
         event.is_cancelled = True
         return False
-    elif cmd == "kick":
-        selector = args[1].strip('"')
-        reason = " ".join(args[2:]) 
-        matched = get_matching_actors(self, selector, player)
 
-        if not matched:
-            return True
+@preprocessor("kick")
+def preprocess_kick(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    if len(args) < 2:
+        return
+    player = event.player
+    selector = args[1].strip('"')
+    reason = " ".join(args[2:]) 
+    matched = get_matching_actors(self, selector, player)
+
+    if not matched:
+        return True
 
-        for pl in matched:
-            target = self.db.get_online_user(pl.xuid)
+    for pl in matched:
+        target = self.db.get_online_user(pl.xuid)
 
-            if perms_util.check_perms(self, target, "primebds.exempt.kick"):
-                player.send_message(f"{ColorFormat.GOLD}Player {ColorFormat.YELLOW}{target.name} {ColorFormat.GOLD}is exempt from {ColorFormat.YELLOW}{cmd}")
-                continue
+        if perms_util.check_perms(self, target, "primebds.exempt.kick"):
+            player.send_message(f"{ColorFormat.GOLD}Player {ColorFormat.YELLOW}{target.name} {ColorFormat.GOLD}is exempt from {ColorFormat.YELLOW}{cmd}")
+            continue
 
-            try:
-                pl.kick(reason)
-                player.send_message(f"{ColorFormat.GOLD}Player {ColorFormat.YELLOW}{target.name} {ColorFormat.GOLD}was kicked for {ColorFormat.YELLOW}\"{reason}\"")
-            except Exception as e:
-                player.send_error_message(f"Failed to kick {target.name}: {e}")
+        try:
+            pl.kick(reason)
+            player.send_message(f"{ColorFormat.GOLD}Player {ColorFormat.YELLOW}{target.name} {ColorFormat.GOLD}was kicked for {ColorFormat.YELLOW}\"{reason}\"")
+        except Exception as e:
+            player.send_error_message(f"Failed to kick {target.name}: {e}")
 
-        event.is_cancelled = True
-        return False
-    elif cmd == "stop":
-        for player in self.server.online_players:
-            player.kick(config["modules"]["join_leave_messages"]["shutdown"])
-        return False
-    elif cmd == "banlist" and endstone_enabled:
-        if len(args) < 2:
+    event.is_cancelled = True
+    return False
+
+@preprocessor("stop")
+def preprocess_stop(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    for player in self.server.online_players:
+        player.kick(config["modules"]["join_leave_messages"]["shutdown"])
+    return False
+
+@preprocessor("banlist")
+def preprocess_banlist(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    if not manager_enabled(config, "endstone"):
+        return
+    player = event.player
+    if len(args) < 2:
+        player.perform_command(f'flist banned')
+        player.perform_command(f'flist ipbanned')
+    else:
+        if args[1] == "players":
             player.perform_command(f'flist banned')
-            player.perform_command(f'flist ipbanned')
         else:
-            if args[1] == "players":
-                player.perform_command(f'flist banned')
-            else:
-                player.perform_command(f'flist ipbanned')
-        event.is_cancelled = True
-        return False
-    elif cmd == "ban" and len(args) > 1 and endstone_enabled:
-        player.perform_command(f'permban \"{args[1]}\"')
+            player.perform_command(f'flist ipbanned')
+    event.is_cancelled = True
+    return False
+
+@preprocessor("ban")
+def preprocess_ban(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    if len(args) > 1 and manager_enabled(config, "endstone"):
+        event.player.perform_command(f'permban \"{args[1]}\"')
         event.is_cancelled = True
         return False
-    elif cmd == "ban-ip" and len(args) > 1 and endstone_enabled:
+
+@preprocessor("ban-ip")
+def preprocess_ban_ip(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    if len(args) > 1 and manager_enabled(config, "endstone"):
         if len(args) > 2:
-            player.perform_command(f'ipban \"{args[1]}\" ip \"{args[2]}\"')
+            event.player.perform_command(f'ipban \"{args[1]}\" ip \"{args[2]}\"')
         else:
-            player.perform_command(f'ipban \"{args[1]}\" ip')
+            event.player.perform_command(f'ipban \"{args[1]}\" ip')
         event.is_cancelled = True
         return False
-    elif cmd in {"unban", "pardon", "unban-ip", "pardon-ip"} and len(args) > 1 and endstone_enabled:
+
+@preprocessor("unban", "pardon", "unban-ip", "pardon-ip")
+def preprocess_unban(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    if len(args) > 1 and manager_enabled(config, "endstone"):
         if cmd in {"unban-ip", "pardon-ip"}:
-            player.perform_command(f'removeban ip \"{args[1]}\"')
+            event.player.perform_command(f'removeban ip \"{args[1]}\"')
             event.is_cancelled = True
             return False
-        player.perform_command(f'removeban \"{args[1]}\"')
-        event.is_cancelled = True
-        return False
-    elif cmd == "op" and len(args) > 1:
-        self.server.dispatch_command(self.server.command_sender, f"rank set \"{args[1]}\" operator")
+        event.player.perform_command(f'removeban \"{args[1]}\"')
         event.is_cancelled = True
         return False
-    elif cmd == "deop" and len(args) > 1:
-        self.server.dispatch_command(self.server.command_sender, f"rank set \"{args[1]}\" default")
+
+@preprocessor("op", "deop")
+def preprocess_op(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    if len(args) > 1:
+        rank = "operator" if cmd == "op" else "default"
+        self.server.dispatch_command(self.server.command_sender, f"rank set \"{args[1]}\" {rank}")
         event.is_cancelled = True
         return False
-    elif cmd in {"allowlist", "whitelist"} and len(args) > 1:
+
+@preprocessor("allowlist", "whitelist")
+def preprocess_allowlist(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    if len(args) > 1:
+        player = event.player
         sub = args[1]
         if sub in {"add", "remove"} and len(args) > 2:
             player.perform_command(f'alist {sub} \"{args[2]}\"')
@@ -169,54 +219,83 @@ def handle_command_preprocess(self: "PrimeBDS", event: PlayerCommandEvent):
             player.send_message("Mojang has this feature disabled")
         event.is_cancelled = True
         return False
-    elif cmd == "transfer" and len(args) > 2:
+
+@preprocessor("transfer")
+def preprocess_transfer(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    if len(args) > 2:
         port = args[3] if len(args) >= 4 else 19132
-        player.perform_command(f"send \"{args[1]}\" {args[2]} {port}")
+        event.player.perform_command(f"send \"{args[1]}\" {args[2]} {port}")
         event.is_cancelled = True
         return False
 
-    if cmd in MSG_CMDS and len(args) > 1:
-        mod_log = self.db.get_mod_log(player.xuid)
-        if mod_log:
-            if mod_log.is_muted == 1:
-                self.db.check_and_update_mute(player.xuid, player.name)
-                event.is_cancelled = True
-                return True
-        target = args[1]
-        if "@" in target:
-            player.send_message(f"{ColorFormat.RED}Target selectors are invalid for this command")
+@preprocessor(*MSG_CMDS)
+def preprocess_message(self: "PrimeBDS", event: PlayerCommandEvent, cmd: str, args: list[str], config: dict):
+    player = event.player
+    if event.command.count("@e") >= 5:
+        if player.xuid not in self.crasher_patch_applied:
+            for perm in [
+                "minecraft.command.me", "minecraft.command.tellraw", "minecraft.command.tell",
+                "minecraft.command.w", "minecraft.command.msg"
+            ]:
+                event.player.add_attachment(self, perm, False)
+
+            self.crasher_patch_applied.add(player.xuid)
+
+        event.is_cancelled = True
+
+        if config["modules"]["me_crasher_patch"]["enabled"]:
+            if config["modules"]["me_crasher_patch"]["ban"]:
+                self.server.dispatch_command(
+                    self.server.command_sender,
+                    f"tempban {player.name} 7 day Crasher Exploit"
+                )
+            else:
+                log(self, f"{ColorFormat.GOLD}Player {ColorFormat.YELLOW}{player.name} {ColorFormat.GOLD}was kicked due to {ColorFormat.YELLOW}Crasher Exploit", "mod")
+                player.kick("Disconnected")
+        return False
+
+    if len(args) < 2:
+        return
+
+    mod_log = self.db.get_mod_log(player.xuid)
+    if mod_log:
+        if mod_log.is_muted == 1:
+            self.db.check_and_update_mute(player.xuid, player.name)
             event.is_cancelled = True
             return True
-        
-        if cmd == "me":
+    target = args[1]
+    if "@" in target:
+        player.send_message(f"{ColorFormat.RED}Target selectors are invalid for this command")
+        event.is_cancelled = True
+        return True
+    
+    if cmd == "me":
+        return True
+    
+    self.db.update_user_data(player.name, 'last_messaged', target)
+    target_user = self.db.get_offline_user(target)
+    if target_user is not None:
+        if target_user.enabled_mt == 0 and not player.has_permission("primebds.exempt.msgtoggle"):
+            player.send_message(f"{ColorFormat.RED}This player has private messages disabled")
+            event.is_cancelled = True
             return True
-        
-        self.db.update_user_data(player.name, 'last_messaged', target)
-        target_user = self.db.get_offline_user(target)
-        if target_user is not None:
-            if target_user.enabled_mt == 0 and not player.has_permission("primebds.exempt.msgtoggle"):
-                player.send_message(f"{ColorFormat.RED}This player has private messages disabled")
-                event.is_cancelled = True
-                return True
-
-        message = " ".join(args[2:]) if len(args) > 2 else ""
-        discordRelay(f"**{player.name} -> {target}**: {message}", "chat")
-
-        if config["modules"]["server_messages"]["enhanced_whispers"]:
-            online_target = self.server.get_player(target)
-            if online_target is None:
-                player.send_message(f"{ColorFormat.RED}Player '{target}' is not online")
-                event.is_cancelled = True
-                return True
-            player.send_message(f"{config['modules']['server_messages']['whisper_prefix']}{ColorFormat.GRAY}To {online_target.name}: {ColorFormat.ITALIC}{message}")
-            online_target.send_message(f"{config['modules']['server_messages']['whisper_prefix']}{ColorFormat.GRAY}From {player.name}: {ColorFormat.ITALIC}{message}")
+
+    message = " ".join(args[2:]) if len(args) > 2 else ""
+    discordRelay(f"**{player.name} -> {target}**: {message}", "chat")
+
+    if config["modules"]["server_messages"]["enhanced_whispers"]:
+        online_target = self.server.get_player(target)
+        if online_target is None:
+            player.send_message(f"{ColorFormat.RED}Player '{target}' is not online")
             event.is_cancelled = True
+            return True
+        rank = self.chat_states.get(player).rank
+        player.send_message(self.chat_formats.render("whisper_to", rank, player=player.name, target=online_target.name, message=message))
+        online_target.send_message(self.chat_formats.render("whisper_from", rank, player=player.name, target=online_target.name, message=message))
+        event.is_cancelled = True
 
-        for pl in self.server.online_players:  
-            user = self.db.get_online_user(pl.xuid)
-            if user:
-                if user.enabled_ss == 1 and pl.has_permission("primebds.command.socialspy"):
-                    pl.send_message(f"{config['modules']['server_messages']['social_spy_prefix']}{ColorFormat.DARK_GRAY}[{ColorFormat.RESET}{player.name} {ColorFormat.GRAY}-> {ColorFormat.RESET}{target}{ColorFormat.DARK_GRAY}] {ColorFormat.GRAY}{message}")
+    spy_message = self.chat_formats.render("social_spy", self.chat_states.get(player).rank, player=player.name, target=target, message=message)
+    self.subscriptions.send("enabled_ss", spy_message)
 
 def handle_server_command_preprocess(self: "PrimeBDS", event: ServerCommandEvent):
     args = event.command.split()
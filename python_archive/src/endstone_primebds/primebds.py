@@ -17,7 +17,11 @@ from endstone_primebds.commands.Server.monitor import clear_all_monitor_interval
 from endstone_primebds.commands.Misc.blockscan import clear_all_blockscan_intervals
 from endstone_primebds.utils.config_util import load_config
 from endstone_primebds.utils.economy_utils import get_eco_link
-from endstone_primebds.utils.db_util import UserDB, sessionDB, ServerDB, User, ModLog, ServerData
+from endstone_primebds.utils.db_util import UserDB, sessionDB, ServerDB, DatabaseExecutor, DatabaseManager, ModerationIndex
+from endstone_primebds.utils.expiry_util import ExpiryScheduler
+from endstone_primebds.utils.chat_util import ChatStates, ChatFormats
+from endstone_primebds.utils.subscription_util import Subscriptions
+from endstone_primebds.utils.logging_util import open_webhooks, shutdown_webhooks
 import endstone_primebds.utils.internal_permissions_util as perms_util
 
 def plugin_text():
@@ -75,7 +79,6 @@ class PrimeBDS(Plugin):
             "counts": {}
         }
         self.globalmute = 0
-        self.chat_cooldown = {}
         self.silentmutes = set()
         self.isgod = set()
         self.crasher_patch_applied = set()
@@ -185,10 +188,18 @@ class PrimeBDS(Plugin):
         plugin_text()
 
     def on_enable(self):
+        open_webhooks()
         self.register_events(self)
-        self.db.migrate_table("users", User)
-        self.db.migrate_table("mod_logs", ModLog)
-        self.serverdb.migrate_table("server_info", ServerData)
+        self.moderation = ModerationIndex(self.db, self.serverdb)
+        self.moderation.load()
+        self.expiry = ExpiryScheduler(self.db)
+        self.expiry.load()
+        self.expiry.start(self)
+        self.chat_states = ChatStates(self.db)
+        self.chat_formats = ChatFormats()
+        self.subscriptions = Subscriptions(self.db)
+        for player in self.server.online_players:
+            self.subscriptions.add(player)
 
         load_config()
 
@@ -202,10 +213,59 @@ class PrimeBDS(Plugin):
         self.gamerules = self.serverdb.get_gamerules()
         self.check_for_inactive_sessions()
 
+        self.db_executor = DatabaseExecutor(self)
+        for database in (self.db, self.sldb, self.serverdb):
+            database.executor = self.db_executor
+
+        db_config = load_config().get("modules", {}).get("database", {})
+        flush_ticks = max(1, int(db_config.get("write_behind_flush_seconds", 2) * 20))
+        self.db_flush_task = self.server.scheduler.run_task(self, self.db.flush_async, flush_ticks, flush_ticks).task_id
+
+        back_config = load_config().get("modules", {}).get("back", {})
+        back_flush_ticks = max(1, int(back_config.get("flush_seconds", 5) * 20))
+        self.last_warp_flush_task = self.server.scheduler.run_task(
+            self, self.serverdb.flush_last_warps_async, back_flush_ticks, back_flush_ticks
+        ).task_id
+
+        rollup_days = db_config.get("session_rollup_after_days", 30)
+        compaction_batch = db_config.get("session_compaction_batch_size", 200)
+        compaction_ticks = max(1, int(db_config.get("session_compaction_interval_seconds", 5) * 20))
+        self.session_compaction_task = self.server.scheduler.run_task(
+            self, lambda: self.sldb.compact_sessions_async(rollup_days, compaction_batch), compaction_ticks, compaction_ticks
+        ).task_id
+
+        # Other servers sharing these files (multiworld) announce their writes through cache_changes
+        self.change_poll_task = self.change_prune_task = None
+        for database in (self.db, self.sldb, self.serverdb):
+            database.prune_changes()
+        if any(database.shared for database in (self.db, self.sldb, self.serverdb)):
+            poll_ticks = max(1, int(db_config.get("change_poll_seconds", 1) * 20))
+            self.change_poll_task = self.server.scheduler.run_task(self, self.poll_database_changes, poll_ticks, poll_ticks).task_id
+            prune_ticks = DatabaseManager.CHANGE_PRUNE_SECONDS * 20
+            self.change_prune_task = self.server.scheduler.run_task(self, self.prune_database_changes, prune_ticks, prune_ticks).task_id
+
+    def poll_database_changes(self):
+        for database in (self.db, self.sldb, self.serverdb):
+            database.poll_changes()
+
+    def prune_database_changes(self):
+        for database in (self.db, self.sldb, self.serverdb):
+            if database.shared:
+                database.submit(database.prune_changes)
+
     def on_disable(self):
         stop_intervals(self)
         clear_all_blockscan_intervals(self)
         clear_all_monitor_intervals(self)
+        self.server.scheduler.cancel_task(self.db_flush_task)
+        self.server.scheduler.cancel_task(self.last_warp_flush_task)
+        self.server.scheduler.cancel_task(self.session_compaction_task)
+        for task in (self.change_poll_task, self.change_prune_task):
+            if task is not None:
+                self.server.scheduler.cancel_task(task)
+        self.expiry.stop(self)
+        self.db_executor.shutdown()
+        shutdown_webhooks()
         self.db.close_connection()
         self.sldb.close_connection()
 
@@ -240,6 +300,8 @@ class PrimeBDS(Plugin):
 
                 self.sldb.end_session(xuid, candidate_end)
 
+        self.sldb.repair_playtime_totals()
+
     def reload_custom_perms(self, player: Player):
         user = self.db.get_online_user(player.xuid)
         if not user:
@@ -370,6 +432,7 @@ class PrimeBDS(Plugin):
         player.recalculate_permissions()
         perms_util.clear_prefix_suffix_cache()
         perms_util.invalidate_perm_cache(player.xuid)
+        self.subscriptions.invalidate(player.xuid)
 
     def on_command(self, sender: CommandSender, command: Command, args: list[str]) -> bool:
         """Handle incoming commands dynamically"""
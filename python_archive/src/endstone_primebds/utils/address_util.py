@@ -27,6 +27,14 @@ def is_valid_port(port_str: str) -> bool:
 def strip_port(ip_with_port: str) -> str:
     return ip_with_port.split(":")[0] if ip_with_port else ""
 
+def subnet_key(ip: str, subnet_mask: int = 24) -> str:
+    """Network address of an IPv4 (optionally with port) at the given mask, or "" if not IPv4."""
+    try:
+        network = ipaddress.IPv4Network(f"{strip_port(ip)}/{subnet_mask}", strict=False)
+        return str(network.network_address)
+    except Exception:
+        return ""
+
 def same_subnet(ip1: str, ip2: str, subnet_mask: int = 24) -> bool:
     try:
         ip1_clean = strip_port(ip1)
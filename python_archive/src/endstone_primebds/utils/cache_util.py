@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+# Every cache created, by name, so they can be reported together
+CACHES: "dict[str, TTLCache]" = {}
+
+class TTLCache:
+    """
+    Bounded mapping with least-recently-used eviction and a per-entry time to live.
+
+    Counts hits, misses, evictions (size bound) and expirations (TTL) so cache
+    behaviour can be checked at runtime with /primebds caches.
+    """
+
+    def __init__(self, name: str, max_size: int = 1024, ttl: Optional[float] = 60, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        CACHES[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and self._clock() >= expires_at:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = _MISSING):
+        ttl = self.ttl if ttl is _MISSING else ttl
+        expires_at = self._clock() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def replace(self, key: Hashable, value: Any) -> bool:
+        """Swap the value of a live entry without touching its expiry; no-op if absent."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return False
+            self._data[key] = (value, entry[1])
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry now rather than on next access."""
+        now = self._clock()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items() if expires_at is not None and now >= expires_at]
+            for key in expired:
+                del self._data[key]
+            self.expirations += len(expired)
+        return len(expired)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+def cache_stats() -> dict[str, dict]:
+    """Stats for every registered cache, by name."""
+    return {name: cache.stats() for name, cache in CACHES.items()}
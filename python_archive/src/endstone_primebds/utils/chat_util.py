@@ -0,0 +1,222 @@
+import string
+import time
+from operator import itemgetter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from endstone import Player
+import endstone_primebds.utils.internal_permissions_util as perms_util
+from endstone_primebds.utils.config_util import load_config, config_generation
+from endstone_primebds.utils.db_util import get_ip_host
+
+if TYPE_CHECKING:
+    from endstone_primebds.utils.db_util import UserDB
+
+@dataclass
+class ChatState:
+    xuid: str
+    ip_host: str
+    rank: str
+    staff_chat: bool
+    is_muted: bool
+    mute_time: int
+    mute_reason: Optional[str]
+    is_ip_muted: bool
+    ip_mute_time: int
+    ip_mute_reason: Optional[str]
+    last_chat: float = 0.0
+    stale: bool = False
+
+    def expires_at(self) -> Optional[int]:
+        """Earliest time a mute on this snapshot runs out, if any."""
+        times = [t for muted, t in ((self.is_muted, self.mute_time), (self.is_ip_muted, self.ip_mute_time)) if muted and t]
+        return min(times) if times else None
+
+class ChatStates:
+    """
+    What handle_chat_event needs for each online player, kept in memory.
+
+    Built on join and marked stale by the database whenever the player's user or mod_logs
+    row changes (locally or through the change feed), so an allowed message does no
+    database work. Stale states and lapsed mutes are rebuilt on the next message; the
+    chat cooldown survives a rebuild.
+    """
+
+    def __init__(self, db: "UserDB"):
+        self.db = db
+        self._states: dict[str, ChatState] = {}
+        self.stats = {"hits": 0, "builds": 0}
+        db.chat_states = self
+
+    def get(self, player: Player) -> ChatState:
+        state = self._states.get(player.xuid)
+        if state is None or state.stale:
+            return self.build(player)
+
+        expires_at = state.expires_at()
+        if expires_at is not None and expires_at < time.time():
+            return self.build(player)
+
+        self.stats["hits"] += 1
+        return state
+
+    def build(self, player: Player) -> ChatState:
+        """Read the player's chat state from the database, lifting any mute that has run out."""
+        xuid = player.xuid
+        previous = self._states.get(xuid)
+
+        is_muted = bool(self.db.check_and_update_mute(xuid, player.name))
+        mod_log = self.db.get_mod_log(xuid) if is_muted else None
+        is_ip_muted, ip_mute_time, ip_mute_reason = self.db.check_ip_mute(str(player.address))
+        user = self.db.get_online_user(xuid)
+
+        state = ChatState(
+            xuid=xuid,
+            ip_host=get_ip_host(str(player.address)),
+            rank=user.internal_rank if user else "Default",
+            staff_chat=bool(user and user.enabled_sc),
+            is_muted=is_muted and mod_log is not None,
+            mute_time=mod_log.mute_time if mod_log else 0,
+            mute_reason=mod_log.mute_reason if mod_log else None,
+            is_ip_muted=is_ip_muted,
+            ip_mute_time=ip_mute_time or 0,
+            ip_mute_reason=ip_mute_reason,
+            last_chat=previous.last_chat if previous else 0.0
+        )
+        self._states[xuid] = state
+        self.stats["builds"] += 1
+        return state
+
+    def invalidate(self, xuid: Optional[str] = None, ip_host: Optional[str] = None):
+        """Mark one player's state stale, every player sharing an IP host, or everyone if neither is given."""
+        if xuid is None and ip_host is None:
+            for state in list(self._states.values()):
+                state.stale = True
+            return
+
+        state = self._states.get(xuid) if xuid else None
+        if state is not None:
+            state.stale = True
+        if ip_host:
+            for state in list(self._states.values()):
+                if state.ip_host == ip_host:
+                    state.stale = True
+
+    def discard(self, xuid: str):
+        self._states.pop(xuid, None)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+# Format templates in server_messages: kind -> (config key, default, output is a PlayerChatEvent.format)
+FORMATS = {
+    "chat": ("chat_format", "{rank_prefix}{player}{rank_suffix}{chat_prefix}§r{message}", True),
+    "nametag": ("nametag_format", "{rank_prefix}{player}{rank_suffix}", False),
+    "whisper_to": ("whisper_to_format", "{whisper_prefix}§7To {target}: §o{message}", False),
+    "whisper_from": ("whisper_from_format", "{whisper_prefix}§7From {player}: §o{message}", False),
+    "social_spy": ("social_spy_format", "{social_spy_prefix}§8[§r{player} §7-> §r{target}§8] §7{message}", False),
+    "staff_chat": ("staff_chat_format", "{staff_chat_prefix}§e{player}§7: §6{message}", False)
+}
+
+# Filled in per message; everything else is resolved when the template is compiled
+RUNTIME_FIELDS = ("player", "target", "message")
+
+_formatter = string.Formatter()
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+def _parse(template: str) -> list[tuple[str, Optional[str]]]:
+    try:
+        return [(literal, field) for literal, field, _, _ in _formatter.parse(template)]
+    except ValueError:
+        # Unbalanced braces: show the template as written
+        return [(template, None)]
+
+class CompiledFormat:
+    """
+    A template with its rank and config values baked in; call it with the runtime fields.
+    Templates compile to a %-format string, the cheapest way to splice these strings.
+    """
+
+    __slots__ = ("format_string", "pick", "escape")
+
+    def __init__(self, format_string: str, fields: list[int], escape: bool):
+        self.format_string = format_string
+        self.pick = itemgetter(*fields) if fields else (lambda values: ())
+        self.escape = escape
+
+    def __call__(self, player: str = "", target: str = "", message: str = "") -> str:
+        if self.escape:
+            return self.format_string % self.pick((_escape(player), _escape(target), _escape(message)))
+        return self.format_string % self.pick((player, target, message))
+
+def compile_format(template: str, constants: dict[str, str], settings: dict[str, str], escape: bool = False) -> CompiledFormat:
+    """
+    Compile a template into a CompiledFormat.
+
+    {player}, {target} and {message} stay as runtime fields. Names in constants ({rank},
+    {rank_prefix}, {rank_suffix}) and string settings from server_messages ({chat_prefix},
+    ...) are substituted now; a setting may itself use the runtime and rank placeholders.
+    Unknown placeholders are kept as literal text. With escape, the output is itself a
+    format string (PlayerChatEvent.format), so every brace in it is doubled.
+    """
+    parts: list[tuple[str, Optional[str]]] = []
+    for literal, field in _parse(template):
+        parts.append((literal, None))
+        if field is None:
+            continue
+        if field in settings and field not in constants:
+            parts.extend(_parse(settings[field]))
+        else:
+            parts.append(("", field))
+
+    pieces = []
+    fields = []
+    for literal, field in parts:
+        text = literal
+        if field is not None and field not in RUNTIME_FIELDS:
+            text += constants.get(field, "{" + field + "}")
+        pieces.append((_escape(text) if escape else text).replace("%", "%%"))
+        if field in RUNTIME_FIELDS:
+            pieces.append("%s")
+            fields.append(RUNTIME_FIELDS.index(field))
+    return CompiledFormat("".join(pieces), fields, escape)
+
+class ChatFormats:
+    """
+    FORMATS compiled per rank and cached.
+
+    Everything but the runtime fields is resolved once, so rendering a chat line or
+    nametag only fills in the player, target and message. The cache is dropped when config.json is
+    reloaded or saved and when rank prefixes/suffixes change.
+    """
+
+    def __init__(self):
+        self._compiled: dict[tuple[str, str], CompiledFormat] = {}
+        self._generation: Optional[tuple[int, int]] = None
+
+    def get(self, kind: str, rank: str) -> CompiledFormat:
+        generation = (config_generation(), perms_util.prefix_generation())
+        if generation != self._generation:
+            self._compiled.clear()
+            self._generation = generation
+
+        compiled = self._compiled.get((kind, rank))
+        if compiled is None:
+            compiled = self._compiled[(kind, rank)] = self._compile(kind, rank)
+        return compiled
+
+    def render(self, kind: str, rank: str, player: str = "", target: str = "", message: str = "") -> str:
+        return self.get(kind, rank)(player, target, message)
+
+    def _compile(self, kind: str, rank: str) -> CompiledFormat:
+        key, default, escape = FORMATS[kind]
+        server_messages = load_config().get("modules", {}).get("server_messages", {})
+        settings = {name: value for name, value in server_messages.items() if isinstance(value, str) and name != key}
+        constants = {
+            "rank": rank,
+            "rank_prefix": perms_util.get_prefix(rank, perms_util.PERMISSIONS),
+            "rank_suffix": perms_util.get_suffix(rank, perms_util.PERMISSIONS)
+        }
+        return compile_format(server_messages.get(key, default), constants, settings, escape)
@@ -45,6 +45,11 @@ cache = None
 cmd_cache = None
 permissions_cache = None
 rules_cache = None
+# Bumped whenever config.json is reloaded or saved, so anything compiled from it can tell it is out of date
+_config_generation = 0
+
+def config_generation() -> int:
+    return _config_generation
 
 def load_cmd_config():
     """Load or create a configuration file in primebds_info/commands.json, cached in memory."""
@@ -117,8 +122,9 @@ def load_config():
 
 def reload_config():
     """Reload all configuration caches."""
-    global cache, cmd_cache, permissions_cache, rules_cache
+    global cache, cmd_cache, permissions_cache, rules_cache, _config_generation
     cache = None
+    _config_generation += 1
     cmd_cache = None
     permissions_cache = None
     rules_cache = None
@@ -129,9 +135,10 @@ def reload_config():
     load_permissions()
 
 def save_config(config: dict, update_cache: bool = False) -> None:
-    global cache
+    global cache, _config_generation
     if update_cache:
         cache = config
+    _config_generation += 1
 
     text = json.dumps(config, indent=4)
     open_text_file(CONFIG_PATH, "w", text=text)
@@ -1,20 +1,30 @@
 import json
 import os
+import queue
 import re
 import sqlite3
 import threading
-from dataclasses import dataclass, fields
+import uuid
+from dataclasses import dataclass, fields, replace
 import time
-from typing import List, Tuple, Any, Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Tuple, Any, Dict, Optional, Callable, TYPE_CHECKING
 from endstone import ColorFormat, Player
 from endstone.level import Location
 from endstone.util import Vector
-from endstone_primebds.utils.address_util import same_subnet
+from endstone_primebds.utils.address_util import strip_port, subnet_key
+from endstone_primebds.utils.cache_util import TTLCache
+from endstone_primebds.utils import location_util
 from endstone_primebds.utils.mod_util import format_time_remaining
 from endstone_primebds.utils.time_util import TimezoneUtils
-from endstone_primebds.utils.config_util import find_server_properties, find_and_load_config, parse_properties_file, find_folder
+from endstone_primebds.utils.config_util import find_server_properties, find_and_load_config, parse_properties_file, find_folder, load_config
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from endstone_primebds.utils.chat_util import ChatStates
+    from endstone_primebds.utils.expiry_util import ExpiryScheduler
+    from endstone_primebds.utils.subscription_util import Subscriptions
+
 current_dir = os.path.dirname(os.path.abspath(__file__))
 while not (os.path.exists(os.path.join(current_dir, 'plugins')) and os.path.exists(os.path.join(current_dir, 'worlds'))):
     current_dir = os.path.dirname(current_dir)
@@ -59,7 +69,7 @@ class User:
     last_messaged: str
     last_join: int
     last_leave: int
-    last_logout_pos: str
+    last_logout_pos: bytes
     last_logout_dim: str
     enabled_mt: int
     enabled_ss: int
@@ -88,6 +98,8 @@ class ModLog:
     ip_address: str
     is_ip_banned: bool
     is_ip_muted: bool
+    ip_host: str
+    ip_subnet: str
 
 @dataclass
 class Warn:
@@ -156,10 +168,243 @@ class LastWarp:
     cooldown: int
     delay: int
 
+def get_ip_host(ip_address: Optional[str]) -> str:
+    """Host part of an "ip:port" address, as stored in mod_logs.ip_host."""
+    return strip_port(ip_address).strip() if ip_address else ""
+
+class ReadResult:
+    """Fully fetched result of a pooled read, shaped like the cursor API callers already use."""
+
+    def __init__(self, rows: list, description):
+        self._rows = rows
+        self._pos = 0
+        self.description = description
+        self.rowcount = -1
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchmany(self, size: int = 1) -> list:
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self) -> list:
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+class ReadConnectionPool:
+    """Bounded checkout/return pool of reader connections for one database file.
+
+    Readers are opened lazily up to `size`. Under WAL each reader sees the last
+    committed snapshot, and because results are fetched fully before a connection
+    is returned no read transaction is ever left open between checkouts.
+    """
+
+    def __init__(self, db_path: str, size: int = 4):
+        self.db_path = db_path
+        self.size = max(1, int(size))
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._closed = False
+
+        # Contention counters
+        self.checkouts = 0
+        self.waits = 0
+        self.peak_in_use = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        conn = None
+        create = False
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Read pool is closed")
+            self.checkouts += 1
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    self.waits += 1
+
+        if create:
+            try:
+                conn = self._connect()
+            except sqlite3.Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+        elif conn is None:
+            conn = self._idle.get()
+
+        with self._lock:
+            self._in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self._in_use)
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._in_use -= 1
+            if self._closed:
+                self._created -= 1
+                conn.close()
+                return
+        self._idle.put(conn)
+
+    def close(self):
+        """Close every idle reader; readers still checked out are closed on release."""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._created -= 1
+                conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "in_use": self._in_use,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "waits": self.waits
+            }
+
+class RowMapper:
+    """Precompiled mapping from an explicit column list onto a dataclass.
+
+    Only columns that exist in both the table and the dataclass are selected.
+    Fields with no backing column, and NULLs when `patch_none` is set, fall back
+    to the same type defaults `UserDB.patch_user_fields` uses.
+    """
+
+    TYPE_DEFAULTS = {int: 0, float: 0.0, str: "", bool: 0}
+
+    def __init__(self, data_cls, table_columns: list[str], patch_none: bool = False):
+        self.data_cls = data_cls
+        self.patch_none = patch_none
+        self.selected = [f.name for f in fields(data_cls) if f.name in table_columns]
+        self.columns = ", ".join(self.selected)
+
+        index = {name: i for i, name in enumerate(self.selected)}
+        self._plan = tuple(
+            (index.get(f.name, -1), self.TYPE_DEFAULTS.get(f.type) if patch_none or f.name not in index else None)
+            for f in fields(data_cls)
+        )
+
+    def map(self, row):
+        if self.patch_none:
+            return self.data_cls(*[
+                row[i] if i >= 0 and row[i] is not None else default
+                for i, default in self._plan
+            ])
+        return self.data_cls(*[row[i] if i >= 0 else default for i, default in self._plan])
+
+    def map_all(self, rows) -> list:
+        return [self.map(row) for row in rows]
+
+class DatabaseExecutor:
+    """
+    Runs database calls on one dedicated worker thread, in submission order.
+
+    Callbacks are handed back to the server thread through the scheduler, so they may
+    touch players and the world like any other task.
+    """
+
+    def __init__(self, plugin, name: str = "PrimeBDS-DB"):
+        self.plugin = plugin
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._closed = False
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "callbacks": 0}
+
+    def submit(self, fn: Callable, *args, callback: Optional[Callable[[Any], None]] = None, **kwargs) -> Future:
+        if self._closed:
+            return _run_inline(fn, args, kwargs, callback)
+
+        self.stats["submitted"] += 1
+        future = self._pool.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda done: self._on_done(done, callback))
+        return future
+
+    def _on_done(self, future: Future, callback: Optional[Callable[[Any], None]]):
+        error = future.exception()
+        if error is not None:
+            self.stats["failed"] += 1
+            print(f"[PrimeBDS] Database task failed: {error}")
+            return
+
+        self.stats["completed"] += 1
+        if callback is None:
+            return
+
+        result = future.result()
+        def run_callback():
+            self.stats["callbacks"] += 1
+            callback(result)
+        self.plugin.server.scheduler.run_task(self.plugin, run_callback, 0)
+
+    def pending(self) -> int:
+        return self.stats["submitted"] - self.stats["completed"] - self.stats["failed"]
+
+    def shutdown(self):
+        """Drain queued work; anything submitted afterwards runs inline."""
+        self._closed = True
+        self._pool.shutdown(wait=True)
+
+def _run_inline(fn: Callable, args: tuple, kwargs: dict, callback: Optional[Callable[[Any], None]]) -> Future:
+    """Synchronous fallback used when no executor is attached (or it has shut down)."""
+    future = Future()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        future.set_exception(e)
+        return future
+    future.set_result(result)
+    if callback is not None:
+        callback(result)
+    return future
+
 # DB
 class DatabaseManager:
     _lock = threading.Lock()
 
+    # Declarative secondary indexes: table -> [(index name, column list)]
+    INDEXES: Dict[str, List[Tuple[str, str]]] = {}
+
+    # Numbered schema migrations, oldest first: running MIGRATIONS[n - 1] brings the file to user_version n.
+    # Applied steps never run again, so schema changes are appended as new steps rather than edited in.
+    MIGRATIONS: Tuple[str, ...] = ()
+
+    # How long cache_changes rows are kept for other processes to read, and how often old ones are deleted
+    CHANGE_RETENTION_SECONDS = 600
+    CHANGE_PRUNE_SECONDS = 60
+    MAX_TRACKED_QUERIES = 512
+
     def __init__(self, db_name: str):
         start_path = os.path.dirname(os.path.abspath(__file__))
         config = find_and_load_config("primebds_data/config.json", start_path, "multiworld", 20, True)
@@ -168,17 +413,21 @@ class DatabaseManager:
 
         main_level = main_server_properties.get("level-name", "Unknown")
         level = local_server_properties.get("level-name", "Unknown")
+        worlds = config.get("modules", {}).get("multiworld", {}).get("worlds", {})
+
+        # Whether other server processes open this same file (multiworld); only then is the change feed used
+        self.shared = False
 
         if main_level.lower() == level.lower():
             self.db_path = os.path.join(DB_FOLDER, db_name if db_name.endswith('.db') else db_name + '.db')
+            self.shared = any(isinstance(world, dict) and world.get("enabled", False) for world in worlds.values())
         else:
-            multiworld = config.get("modules", {}).get("multiworld", {})
-            worlds = multiworld.get("worlds", {})
             is_enabled = worlds[level].get("enabled", False)
             if is_enabled:
                 main_root = find_folder("primebds_data/database", start_path, "multiworld", 20, True)
                 if main_root:
                     self.db_path = os.path.join(main_root, db_name if db_name.endswith('.db') else db_name + '.db')
+                    self.shared = True
                     print("DEBUG: SUB-WORLD DB LINKED")
                 else:
                     self.db_path = os.path.join(DB_FOLDER, db_name if db_name.endswith('.db') else db_name + '.db')
@@ -189,18 +438,90 @@ class DatabaseManager:
         self.conn.execute("PRAGMA journal_mode=WAL;")  # Enable WAL for concurrency
         self.cursor = self.conn.cursor()
 
-    def execute(self, query: str, params: Tuple = (), readonly=False) -> sqlite3.Cursor:
+        db_config = load_config().get("modules", {}).get("database", {})
+        self.read_pool = ReadConnectionPool(self.db_path, db_config.get("read_pool_size", 4))
+
+        # Schema registry: table -> column names, plus mappers compiled against them
+        self._schema: dict[str, list[str]] = {}
+        self._mappers: dict[tuple, RowMapper] = {}
+
+        # Distinct statements issued, for query plan diagnostics
+        self._issued_queries: dict[str, int] = {}
+
+        # Set by the plugin once enabled; async variants run inline until then
+        self.executor: Optional[DatabaseExecutor] = None
+
+        # While migrating, writes join the migration transaction instead of committing
+        self._migrating = False
+
+        # Change feed shared by every process using this file (multiworld), read from once migrated
+        self.origin = uuid.uuid4().hex
+        self._last_change_id = 0
+        self._data_version = None
+        self.change_stats = {"published": 0, "polls": 0, "foreign_writes": 0, "applied": 0}
+
+    def migrate(self):
+        """
+        Apply the MIGRATIONS steps this file hasn't seen yet, all in one transaction.
+        The applied count lives in PRAGMA user_version, so a current schema costs a single pragma read.
+        """
+        target = len(self.MIGRATIONS)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < target:
+            with self._lock:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._migrating = True
+            try:
+                # Another server sharing this file may have migrated it while we waited for the write lock
+                version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+                for step in self.MIGRATIONS[version:]:
+                    getattr(self, step)()
+                self.conn.execute(f"PRAGMA user_version = {target}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                self._migrating = False
+                self.refresh_schema()
+
+        self._last_change_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM cache_changes").fetchone()[0]
+        self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _commit(self):
+        if not self._migrating:
+            self.conn.commit()
+
+    def create_change_feed(self):
+        self.create_table('cache_changes', {
+            'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+            'origin': 'TEXT',
+            'scope': 'TEXT',
+            'key': 'TEXT',
+            'changed_at': 'INTEGER'
+        })
+
+    def submit(self, fn: Callable, *args, callback: Optional[Callable[[Any], None]] = None, **kwargs) -> Future:
+        """Run fn off the server thread and deliver its result to callback on the server thread."""
+        if self.executor is None:
+            return _run_inline(fn, args, kwargs, callback)
+        return self.executor.submit(fn, *args, callback=callback, **kwargs)
+
+    def execute(self, query: str, params: Tuple = (), readonly=False) -> sqlite3.Cursor | ReadResult:
+        self._record_query(query)
         if readonly:
-            read_conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            cursor = read_conn.cursor()
-            cursor.execute(query, params)
-            return cursor
+            read_conn = self.read_pool.acquire()
+            try:
+                cursor = read_conn.execute(query, params)
+                return ReadResult(cursor.fetchall(), cursor.description)
+            finally:
+                self.read_pool.release(read_conn)
         else:
             with self._lock:
-                self.cursor.execute(query, params)
+                # A cursor per call, so results can't be clobbered by the executor thread
+                cursor = self.conn.execute(query, params)
                 if not query.strip().upper().startswith("SELECT"):
-                    self.conn.commit()
-                return self.cursor
+                    self._commit()
+                return cursor
 
     def _serialize_enchants(self, enchants) -> str:
         """Return a JSON string for an enchantments mapping with safe string keys.
@@ -233,7 +554,7 @@ class DatabaseManager:
         query = f"CREATE TABLE IF NOT EXISTS {table_name} ({column_definitions})"
         with self._lock:
             self.cursor.execute(query)
-            self.conn.commit()
+            self._commit()
 
         if unique:
             index_name = f"idx_{table_name}_{'_'.join(unique)}"
@@ -241,29 +562,24 @@ class DatabaseManager:
             self.cursor.execute(
                 f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table_name} ({cols})"
             )
-            self.conn.commit()
+            self._commit()
+
+        self.refresh_schema(table_name)
+        self.ensure_indexes(table_name)
 
 
     def insert(self, table_name: str, data: Dict[str, Any]):
+        """Insert one row. Columns must already exist; new ones are added by a MIGRATIONS step."""
         if not data:
             raise ValueError("Insert data cannot be empty")
 
+        values = tuple(int(v) if isinstance(v, bool) else v for v in data.values())
+        columns = ', '.join(data.keys())
+        placeholders = ', '.join(['?' for _ in data])
+        query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
         with self._lock:
-            self.cursor.execute(f"PRAGMA table_info({table_name})")
-            existing_columns = {row[1] for row in self.cursor.fetchall()}
-
-            for col, value in data.items():
-                if col not in existing_columns:
-                    col_type = "INTEGER" if isinstance(value, (int, bool)) else "REAL" if isinstance(value, float) else "TEXT"
-                    default = 0 if col_type == "INTEGER" else 0.0 if col_type == "REAL" else "''"
-                    self.cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {col} {col_type} DEFAULT {default}")
-
-            values = tuple(int(v) if isinstance(v, bool) else v for v in data.values())
-            columns = ', '.join(data.keys())
-            placeholders = ', '.join(['?' for _ in data])
-            query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-            self.cursor.execute(query, values)
-            self.conn.commit()
+            self.conn.execute(query, values)
+            self._commit()
 
     def insert_session(self, xuid: str, name: str, start_time: int):
         with self._lock:
@@ -274,21 +590,62 @@ class DatabaseManager:
             self.conn.commit()
 
     def ensure_user_table_columns(self):
+        existing_columns = self.table_columns("users")
         with self._lock:
-            self.cursor.execute("PRAGMA table_info(users)")
-            existing_columns = [col[1] for col in self.cursor.fetchall()]
-
             for f in fields(User):
                 if f.name not in existing_columns:
                     self.cursor.execute(
                         f"ALTER TABLE users ADD COLUMN {f.name} {self.get_sql_type(f.type)} DEFAULT 0"
                     )
-            self.conn.commit()
+            self._commit()
+        self.refresh_schema("users")
 
     def get_sql_type(self, py_type):
         mapping = {int: "INTEGER", str: "TEXT", float: "REAL"}
         return mapping.get(py_type, "TEXT")
 
+    def ensure_indexes(self, table_name: str):
+        """Create the declared secondary indexes for a table, skipping any whose columns don't exist yet."""
+        indexes = self.INDEXES.get(table_name)
+        if not indexes:
+            return
+
+        existing_columns = set(self.table_columns(table_name))
+        with self._lock:
+            for index_name, columns in indexes:
+                needed = {col.split()[0] for col in columns.split(",")}
+                if not needed <= existing_columns:
+                    continue
+                self.cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})")
+            self._commit()
+
+    def _record_query(self, query: str):
+        head = query.lstrip()[:6].upper()
+        if head not in ("SELECT", "UPDATE", "DELETE"):
+            return
+        count = self._issued_queries.get(query)
+        if count is not None:
+            self._issued_queries[query] = count + 1
+        elif len(self._issued_queries) < self.MAX_TRACKED_QUERIES:
+            self._issued_queries[query] = 1
+
+    def find_table_scans(self) -> List[Tuple[str, List[str]]]:
+        """
+        Run EXPLAIN QUERY PLAN over every statement issued so far.
+        Returns (query, [plan steps]) for each statement whose plan contains a full SCAN.
+        """
+        report = []
+        for query in list(self._issued_queries):
+            params = (None,) * query.count("?")
+            try:
+                plan = self.execute(f"EXPLAIN QUERY PLAN {query}", params, readonly=True).fetchall()
+            except sqlite3.Error:
+                continue
+            scans = [row[3] for row in plan if row[3].startswith("SCAN")]
+            if scans:
+                report.append((" ".join(query.split()), scans))
+        return report
+
     def fetch_all(self, table_name: str) -> List[Dict[str, Any]]:
         with self._lock:
             self.cursor.execute(f"SELECT * FROM {table_name}")
@@ -298,19 +655,55 @@ class DatabaseManager:
     def fetch_by_condition(self, table_name: str, condition: str, params: Tuple) -> List[Dict[str, Any]]:
         with self._lock:
             query = f"SELECT * FROM {table_name} WHERE {condition}"
+            self._record_query(query)
             self.cursor.execute(query, params)
             columns = [desc[0] for desc in self.cursor.description]
             return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
         
     def get_column_names(self, table_name: str) -> list[str]:
+        return list(self.table_columns(table_name))
+
+    def table_columns(self, table_name: str) -> list[str]:
+        """Column names for a table, read from PRAGMA once and cached."""
+        columns = self._schema.get(table_name)
+        if columns is None:
+            with self._lock:
+                self.cursor.execute(f"PRAGMA table_info({table_name})")
+                columns = [row[1] for row in self.cursor.fetchall()]
+            self._schema[table_name] = columns
+        return columns
+
+    def refresh_schema(self, table_name: Optional[str] = None):
+        """Drop cached layouts (and mappers built on them) after a table gains columns."""
+        if table_name is None:
+            self._schema.clear()
+            self._mappers.clear()
+            return
+        self._schema.pop(table_name, None)
+        for key in [k for k in self._mappers if k[0] == table_name]:
+            del self._mappers[key]
+
+    def row_mapper(self, table_name: str, data_cls, patch_none: bool = False) -> RowMapper:
+        """Return the cached RowMapper of `data_cls` for `table_name`."""
+        key = (table_name, data_cls, patch_none)
+        mapper = self._mappers.get(key)
+        if mapper is None:
+            mapper = RowMapper(data_cls, self.table_columns(table_name), patch_none)
+            self._mappers[key] = mapper
+        return mapper
+
+    def executemany(self, query: str, rows: List[Tuple]):
+        """Run one write statement for many parameter rows and commit once."""
+        self._record_query(query)
         with self._lock:
-            self.cursor.execute(f"PRAGMA table_info({table_name})")
-            return [row[1] for row in self.cursor.fetchall()]
+            self.cursor.executemany(query, rows)
+            self._commit()
 
     def update(self, table_name: str, updates: Dict[str, Any], condition: str, params: Tuple):
         with self._lock:
             update_clause = ', '.join([f"{col} = ?" for col in updates.keys()])
             query = f"UPDATE {table_name} SET {update_clause} WHERE {condition}"
+            self._record_query(query)
             all_params = tuple(updates.values()) + (params if isinstance(params, tuple) else (params,))
             self.cursor.execute(query, all_params)
             self.conn.commit()
@@ -318,21 +711,270 @@ class DatabaseManager:
     def delete(self, table_name: str, condition: str, params: Tuple):
         with self._lock:
             query = f"DELETE FROM {table_name} WHERE {condition}"
+            self._record_query(query)
             self.cursor.execute(query, params)
             self.conn.commit()
 
+    def publish_changes(self, scope: str, keys: list):
+        """Record written keys so other processes sharing this file drop their cached copies."""
+        if not keys or not self.shared:
+            return
+        now = int(time.time())
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO cache_changes (origin, scope, key, changed_at) VALUES (?, ?, ?, ?)",
+                [(self.origin, scope, key, now) for key in keys]
+            )
+            self.conn.commit()
+        self.change_stats["published"] += len(keys)
+
+    def poll_changes(self) -> int:
+        """
+        Apply changes published by other processes since the last poll.
+        PRAGMA data_version only moves when another connection commits, so an idle poll is one pragma.
+        """
+        if not self.shared:
+            return 0
+        self.change_stats["polls"] += 1
+        with self._lock:
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return 0
+        self._data_version = version
+        self.change_stats["foreign_writes"] += 1
+
+        rows = self.execute(
+            "SELECT id, origin, scope, key FROM cache_changes WHERE id > ? ORDER BY id",
+            (self._last_change_id,), readonly=True
+        ).fetchall()
+
+        applied = 0
+        if rows and self._last_change_id and rows[0][0] > self._last_change_id + 1:
+            # Rows we never saw were pruned; drop everything rather than guess
+            self._apply_change("*", None)
+            applied += 1
+        for change_id, origin, scope, key in rows:
+            self._last_change_id = change_id
+            if origin != self.origin:
+                self._apply_change(scope, key)
+                applied += 1
+        self.change_stats["applied"] += applied
+        return applied
+
+    def prune_changes(self) -> int:
+        """Delete change rows older than CHANGE_RETENTION_SECONDS; every sharing process has read them by then."""
+        cursor = self.execute(
+            "DELETE FROM cache_changes WHERE changed_at < ?", (int(time.time()) - self.CHANGE_RETENTION_SECONDS,)
+        )
+        return cursor.rowcount
+
+    def _apply_change(self, scope: str, key: Optional[str]):
+        """Drop whatever this database caches for a key another process wrote."""
+        pass
+
     def close_connection(self):
+        self.read_pool.close()
         self.conn.close()
 
+class _TrieNode:
+    __slots__ = ("children", "keys")
+
+    def __init__(self):
+        self.children: dict[str, "_TrieNode"] = {}
+        self.keys: set[str] = set()
+
+class WarpIndex:
+    """
+    Every warp row held in memory, keyed by lowercase name, with a prefix trie over
+    names, display names and aliases.
+
+    Lookups never touch the database or decode positions; the caller decodes the
+    Location of the one warp it picked. ServerDB refreshes single entries after each write.
+    """
+
+    COLUMNS = "name, pos, displayname, category, description, cost, cooldown, delay, aliases"
+
+    def __init__(self, db: "ServerDB"):
+        self.db = db
+        self._warps: dict[str, Warps] = {}
+        self._aliases: dict[str, str] = {}
+        self._trie = _TrieNode()
+        self._loaded = False
+        self.stats = {"lookups": 0, "exact": 0, "prefix": 0, "scored": 0, "misses": 0}
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def load(self):
+        self._warps.clear()
+        self._aliases.clear()
+        self._trie = _TrieNode()
+        rows = self.db.execute(f"SELECT {self.COLUMNS} FROM warps", readonly=True).fetchall()
+        for row in rows:
+            self._add(self._entry(row))
+        self._loaded = True
+
+    def reset(self):
+        """Forget every entry; the index reloads on next use."""
+        self._loaded = False
+
+    def refresh(self, name: str):
+        """Re-read one warp after it was written, or drop it if it no longer exists."""
+        if not self._loaded:
+            return
+        old = self._warps.get(name.lower())
+        if old is not None:
+            self._remove(old)
+        row = self.db.execute(
+            f"SELECT {self.COLUMNS} FROM warps WHERE name = ? COLLATE NOCASE", (name,), readonly=True
+        ).fetchone()
+        if row:
+            self._add(self._entry(row))
+
+    def _entry(self, row: tuple) -> Warps:
+        name, pos, displayname, category, description, cost, cooldown, delay, aliases = row
+        return Warps(name, pos, displayname, category, description, cost, cooldown, delay, self.db.decode_aliases(aliases))
+
+    @staticmethod
+    def _terms(warp: Warps) -> set[str]:
+        terms = {warp.name.lower()}
+        if warp.displayname:
+            terms.add(warp.displayname.lower())
+        terms.update(alias.lower() for alias in warp.aliases if alias)
+        return terms
+
+    def _add(self, warp: Warps):
+        key = warp.name.lower()
+        self._warps[key] = warp
+        for alias in warp.aliases:
+            self._aliases.setdefault(alias.lower(), key)
+        for term in self._terms(warp):
+            node = self._trie
+            for char in term:
+                node = node.children.setdefault(char, _TrieNode())
+                node.keys.add(key)
+
+    def _remove(self, warp: Warps):
+        key = warp.name.lower()
+        self._warps.pop(key, None)
+        for alias in warp.aliases:
+            if self._aliases.get(alias.lower()) == key:
+                del self._aliases[alias.lower()]
+        for term in self._terms(warp):
+            node = self._trie
+            for char in term:
+                child = node.children.get(char)
+                if child is None:
+                    break
+                child.keys.discard(key)
+                if not child.keys:
+                    del node.children[char]
+                    break
+                node = child
+
+    def _prefixed(self, prefix: str) -> set[str]:
+        node = self._trie
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.keys
+
+    @staticmethod
+    def _score(query: str, warp: Warps) -> int:
+        score = 0
+        if query in warp.name.lower():
+            score += 3
+        if query in (warp.displayname or "").lower():
+            score += 2
+        if query in (warp.category or "").lower():
+            score += 1
+        if any(query in alias.lower() for alias in warp.aliases):
+            score += 4  # aliases get priority
+        return score
+
+    def get(self, name: str) -> Optional[Warps]:
+        self._ensure_loaded()
+        return self._warps.get(name.lower())
+
+    def all(self) -> list[Warps]:
+        self._ensure_loaded()
+        return list(self._warps.values())
+
+    def match(self, query: str) -> Optional[Warps]:
+        """Exact name or alias, else the best warp with a term starting with query, else the best substring score."""
+        self._ensure_loaded()
+        self.stats["lookups"] += 1
+        query = query.strip().lower()
+        if not query:
+            self.stats["misses"] += 1
+            return None
+
+        key = query if query in self._warps else self._aliases.get(query)
+        if key is not None:
+            self.stats["exact"] += 1
+            return self._warps[key]
+
+        candidates = [self._warps[key] for key in sorted(self._prefixed(query))]
+        stat = "prefix"
+        if not candidates:
+            candidates = self._warps.values()
+            stat = "scored"
+
+        best, best_score = None, 0
+        for warp in candidates:
+            score = self._score(query, warp)
+            if score > best_score:
+                best, best_score = warp, score
+        self.stats[stat if best is not None else "misses"] += 1
+        return best
+
+    def suggest(self, query: str, limit: int = 5) -> list[Warps]:
+        """Warps a partially typed query could mean: prefix matches first, then substring matches."""
+        self._ensure_loaded()
+        query = query.strip().lower()
+        if not query:
+            return sorted(self._warps.values(), key=lambda w: w.name.lower())[:limit]
+
+        keys = sorted(self._prefixed(query))
+        if len(keys) < limit:
+            scored = sorted(
+                (warp for key, warp in self._warps.items() if key not in keys and self._score(query, warp)),
+                key=lambda w: (-self._score(query, w), w.name.lower())
+            )
+            keys += [warp.name.lower() for warp in scored]
+        return [self._warps[key] for key in keys[:limit]]
+
 class ServerDB(DatabaseManager):
+    INDEXES = {
+        'name_bans': [('idx_name_bans_name', 'name')],
+        'warps': [('idx_warps_name_nocase', 'name COLLATE NOCASE')]
+    }
+
+    MIGRATIONS = ("create_tables", "create_change_feed", "pack_locations", "rebuild_name_bans")
+
+    # Tables whose pos column holds a location
+    LOCATION_TABLES = ("warps", "homes", "spawns", "last_warp")
+
     def __init__(self, db_name: str):
         super().__init__(db_name)
         self.db_name = db_name
-        self.create_tables()
+        self.migrate()
+        self.warps = WarpIndex(self)
+
+        # Attached by ModerationIndex.load(); name ban checks fall back to SQL until then
+        self.moderation: Optional[ModerationIndex] = None
+
+        # /back locations: xuid -> (username, name, packed pos), latest only, upserted by flush_last_warps()
+        self._last_locations: dict[str, tuple] = {}
+        self._pending_last_locations: dict[str, tuple] = {}
+        self._last_location_lock = threading.Lock()
+        self.last_location_stats = {"queued": 0, "coalesced": 0, "flushes": 0, "rows_flushed": 0}
 
     def migrate_table(self, table_name: str, data_cls):
         """Add missing columns to a table according to the dataclass fields."""
-        existing_columns = {row[1] for row in self.execute(f"PRAGMA table_info({table_name})").fetchall()}
+        existing_columns = set(self.table_columns(table_name))
         type_map = {int: "INTEGER", float: "REAL", str: "TEXT", bool: "INTEGER"}
 
         for f in fields(data_cls):
@@ -363,6 +1005,9 @@ class ServerDB(DatabaseManager):
                 except sqlite3.OperationalError as e:
                     print(f"Warning: Could not add column '{f.name}' to {table_name}: {e}")
 
+        self.refresh_schema(table_name)
+        self.ensure_indexes(table_name)
+
     def create_tables(self):
         """Creates all necessary tables for the server database."""
 
@@ -439,7 +1084,6 @@ class ServerDB(DatabaseManager):
         self.execute(
             "INSERT OR IGNORE INTO server_info (id, last_shutdown_time) VALUES (1, 0)"
         )
-        self.conn.commit()
 
         self.migrate_table("server_info", ServerData) 
         self.migrate_table("name_bans", NameBans) 
@@ -462,46 +1106,53 @@ class ServerDB(DatabaseManager):
         Automatically excludes any columns not in the ServerData dataclass.
         Returns None if no row found.
         """
-        result = self.execute("SELECT * FROM server_info WHERE id = 1").fetchone()
+        mapper = self.row_mapper("server_info", ServerData)
+        result = self.execute(f"SELECT {mapper.columns} FROM server_info WHERE id = 1").fetchone()
         if result:
-            column_info = self.execute("PRAGMA table_info(server_info)").fetchall()
-            column_names = [row[1] for row in column_info]
-            raw_data = dict(zip(column_names, result))
-
-            server_fields = {f.name for f in fields(ServerData)}
-            filtered_data = {k: v for k, v in raw_data.items() if k in server_fields}
-
-            server_data = ServerData(**filtered_data)
-            return server_data
+            return mapper.map(result)
 
         return None
 
-    def encode_location(self, loc: Location) -> str:
-        """Convert Location to JSON string."""
-        return json.dumps({
-            'x': loc.x,
-            'y': loc.y,
-            'z': loc.z,
-            'dimension': loc.dimension.name, 
-            'pitch': loc.pitch,
-            'yaw': loc.yaw
-        })
-
-    def decode_location(self, pos_str: str, server) -> Location:
-        """Parse JSON string back to Location object."""
-        data = json.loads(pos_str)
+    def encode_location(self, loc: Location) -> bytes:
+        """Pack a Location into its 33 byte binary form."""
+        return location_util.encode_location(loc)
 
-        dimension_name = data['dimension']
-        dimension_obj = server.level.get_dimension(dimension_name)
+    def decode_location(self, pos, server) -> Optional[Location]:
+        """Unpack a stored position back into a Location."""
+        return location_util.decode_location(pos, server)
 
-        return Location(
-            x=data['x'],
-            y=data['y'],
-            z=data['z'],
-            dimension=dimension_obj,
-            pitch=data['pitch'],
-            yaw=data['yaw']
+    def pack_locations(self):
+        """Convert JSON text positions to the packed binary form."""
+        for table in self.LOCATION_TABLES:
+            rows = self.execute(
+                f"SELECT rowid, pos FROM {table} WHERE typeof(pos) = 'text' AND pos != ''"
+            ).fetchall()
+            updates = []
+            for rowid, pos in rows:
+                unpacked = location_util.unpack_location(pos)
+                if unpacked is not None:
+                    updates.append((location_util.pack_location(*unpacked), rowid))
+            if updates:
+                self.executemany(f"UPDATE {table} SET pos = ? WHERE rowid = ?", updates)
+
+    def rebuild_name_bans(self):
+        """
+        Recreate name_bans without its CHECK (id = 1), which let the table hold a single ban;
+        names are made unique so add_name's INSERT OR REPLACE re-bans a name in place.
+        """
+        self.create_table('name_bans_new', {
+            'id': 'INTEGER PRIMARY KEY',
+            'name': 'TEXT UNIQUE',
+            'banned_time': 'INTEGER',
+            'ban_reason': 'TEXT'
+        })
+        self.execute(
+            "INSERT OR REPLACE INTO name_bans_new (name, banned_time, ban_reason) "
+            "SELECT name, banned_time, ban_reason FROM name_bans ORDER BY id"
         )
+        self.execute("DROP TABLE name_bans")
+        self.execute("ALTER TABLE name_bans_new RENAME TO name_bans")
+        self.ensure_indexes("name_bans")
 
     def get_gamerules(self) -> dict:
         row = self.execute(
@@ -530,19 +1181,28 @@ class ServerDB(DatabaseManager):
             self.conn.commit()
         except sqlite3.Error as e:
             print(f"Error adding name: {e}")
+        if self.moderation is not None:
+            self.moderation.refresh_name_ban(name)
+        self.publish_changes("name_ban", [name])
 
     def remove_name(self, name: str):
         """Remove a name from the bans list"""
         self.execute("DELETE FROM name_bans WHERE name = ?", (name,))
         self.conn.commit()
+        if self.moderation is not None:
+            self.moderation.refresh_name_ban(name)
+        self.publish_changes("name_ban", [name])
 
     def check_nameban(self, name: str) -> bool:
         """
         Check if a name is currently banned
         Respects ban duration
         """
-        self.execute("SELECT banned_time FROM name_bans WHERE name = ? LIMIT 1", (name,))
-        row = self.cursor.fetchone()
+        if self.moderation is not None:
+            ban = self.moderation.get_name_ban(name)
+            return ban is not None and time.time() < ban.banned_time
+
+        row = self.execute("SELECT banned_time FROM name_bans WHERE name = ? LIMIT 1", (name,)).fetchone()
         if row is None:
             return False
 
@@ -553,42 +1213,53 @@ class ServerDB(DatabaseManager):
         """Clear all bans"""
         self.execute("DELETE FROM name_bans")
         self.conn.commit()
+        if self.moderation is not None:
+            self.moderation.clear_name_bans()
+        self.publish_changes("name_ban", [None])
 
-    def get_ban_info(self, name: str) -> Optional[NameBans]:
-        result = self.execute("SELECT * FROM name_bans WHERE name = ? LIMIT 1", (name,)).fetchone()
-        if result:
-            column_info = self.execute("PRAGMA table_info(name_bans)").fetchall()
-            column_names = [row[1] for row in column_info]
-
-            raw_data = dict(zip(column_names, result))
+    def _apply_change(self, scope: str, key: Optional[str]):
+        if scope == "warp":
+            self.warps.refresh(key)
+            return
+        if scope == "*":
+            self.warps.reset()
+        if self.moderation is None or scope not in ("name_ban", "*"):
+            return
+        if key is None:
+            self.moderation.clear_name_bans()
+            for ban in self.get_all_bans():
+                self.moderation.refresh_name_ban(ban.name)
+        else:
+            self.moderation.refresh_name_ban(key)
 
-            ban_fields = {f.name for f in fields(NameBans)}
-            filtered_data = {k: v for k, v in raw_data.items() if k in ban_fields}
+    def get_ban_info(self, name: str) -> Optional[NameBans]:
+        if self.moderation is not None:
+            return self.moderation.get_name_ban(name)
 
-            return NameBans(**filtered_data)
+        mapper = self.row_mapper("name_bans", NameBans)
+        result = self.execute(f"SELECT {mapper.columns} FROM name_bans WHERE name = ? LIMIT 1", (name,)).fetchone()
+        if result:
+            return mapper.map(result)
 
         return None
     
+    def count_name_bans(self) -> int:
+        return self.execute("SELECT COUNT(*) FROM name_bans", readonly=True).fetchone()[0]
+
+    def get_name_ban_page(self, limit: int, offset: int) -> list[str]:
+        rows = self.execute(
+            "SELECT name FROM name_bans ORDER BY rowid LIMIT ? OFFSET ?", (limit, offset), readonly=True
+        ).fetchall()
+        return [row[0] for row in rows]
+
     def get_all_bans(self) -> List[NameBans]:
         """
         Fetch all rows from name_bans and return as list of NameBans objects.
         Automatically filters only dataclass fields.
         """
-        results = self.execute("SELECT * FROM name_bans").fetchall()
-        if not results:
-            return []
-
-        column_info = self.execute("PRAGMA table_info(name_bans)").fetchall()
-        column_names = [row[1] for row in column_info]
-
-        ban_fields = {f.name for f in fields(NameBans)}
-        all_bans = []
-        for row in results:
-            raw_data = dict(zip(column_names, row))
-            filtered_data = {k: v for k, v in raw_data.items() if k in ban_fields}
-            all_bans.append(NameBans(**filtered_data))
-
-        return all_bans
+        mapper = self.row_mapper("name_bans", NameBans)
+        results = self.execute(f"SELECT {mapper.columns} FROM name_bans").fetchall()
+        return mapper.map_all(results)
 
     def encode_aliases(self, aliases: list[str]) -> str:
         return json.dumps(aliases)
@@ -625,6 +1296,7 @@ class ServerDB(DatabaseManager):
             (json.dumps(aliases), warp_name)
         )
         self.conn.commit()
+        self._warp_changed(warp_name)
         return True
 
     def remove_alias(self, warp_name: str, alias: str) -> bool:
@@ -650,6 +1322,7 @@ class ServerDB(DatabaseManager):
             (json.dumps(aliases), warp_name)
         )
         self.conn.commit()
+        self._warp_changed(warp_name)
         return True
 
     def update_warp_property(self, name: str, field: str, value) -> bool:
@@ -674,6 +1347,7 @@ class ServerDB(DatabaseManager):
 
         self.execute(f"UPDATE warps SET {field} = ? WHERE name = ? COLLATE NOCASE", (value, name))
         self.conn.commit()
+        self._warp_changed(name)
         return True
 
     def create_warp(self, name: str, location: Location, displayname: str = None,
@@ -695,102 +1369,53 @@ class ServerDB(DatabaseManager):
             (name, pos_str, displayname, category, description, cost, cooldown, delay, aliases_json)
         )
         self.conn.commit()
+        self._warp_changed(name)
         return True
 
-    def get_warp(self, name: str, server) -> dict | None:
-        row = self.execute(
-            """
-            SELECT name, pos, displayname, category, description, cost, cooldown, delay, aliases
-            FROM warps
-            WHERE name = ? COLLATE NOCASE
-            """,
-            (name,)
-        ).fetchone()
-
-        if not row:
-            return None
-
-        name, pos_str, displayname, category, description, cost, cooldown, delay, aliases = row
-        pos = self.decode_location(pos_str, server) if pos_str else None
-        aliases = self.decode_aliases(aliases)
+    def _warp_changed(self, name: str):
+        self.warps.refresh(name)
+        self.publish_changes("warp", [name])
 
-        return {
-            'name': name,
-            'pos': pos,
-            'displayname': displayname,
-            'category': category,
-            'description': description,
-            'cost': cost,
-            'cooldown': cooldown,
-            'delay': delay,
-            'aliases': aliases
+    def _warp_dict(self, warp: Warps, server=None) -> dict:
+        """Warp as a dict; 'pos' is decoded to a Location only when a server is given."""
+        data = {
+            'name': warp.name,
+            'displayname': warp.displayname,
+            'category': warp.category,
+            'description': warp.description,
+            'cost': warp.cost,
+            'cooldown': warp.cooldown,
+            'delay': warp.delay,
+            'aliases': list(warp.aliases)
         }
+        if server is not None:
+            data['pos'] = self.decode_location(warp.pos, server) if warp.pos else None
+        return data
+
+    def get_warp(self, name: str, server) -> dict | None:
+        warp = self.warps.get(name)
+        return self._warp_dict(warp, server) if warp else None
     
     def get_warp_fuzzy(self, query: str, server) -> dict | None:
-        query = query.lower()
-        warps = self.get_all_warps(server)
-
-        best_match = None
-        best_score = 0
-
-        for warp_name, warp in warps.items():
-            name = warp["name"].lower()
-            display = (warp.get("displayname") or "").lower()
-            category = (warp.get("category") or "").lower()
-            aliases = [a.lower() for a in warp.get("aliases", [])]
-
-            # Exact match first
-            if query == name or query in aliases:
-                return warp
-
-            # Score-based matching
-            score = 0
-            if query in name:
-                score += 3
-            if query in display:
-                score += 2
-            if query in category:
-                score += 1
-            if any(query in a for a in aliases):
-                score += 4  # aliases get priority
-
-            # Pick highest score
-            if score > best_score:
-                best_score = score
-                best_match = warp
+        warp = self.warps.match(query)
+        return self._warp_dict(warp, server) if warp else None
 
-        return best_match if best_score >= 1 else None
+    def suggest_warps(self, query: str, limit: int = 5) -> list[str]:
+        """Names of the warps a partially typed query could mean."""
+        return [warp.name for warp in self.warps.suggest(query, limit)]
 
-    def get_all_warps(self, server):
-        rows = self.execute("""
-            SELECT name, pos, displayname, category, description, cost, cooldown, delay, aliases
-            FROM warps
-        """).fetchall()
-
-        warps = {}
-
-        for row in rows:
-            (name, pos, displayname, category, description,
-            cost, cooldown, delay, alias_str) = row
-
-            warps[name] = {
-                "name": name,
-                "pos": self.decode_location(pos, server) if pos else None,
-                "displayname": displayname,
-                "category": category,
-                "description": description,
-                "cost": cost,
-                "cooldown": cooldown,
-                "delay": delay,
-                "aliases": self.decode_aliases(alias_str)
-            }
+    def list_warps(self) -> dict[str, dict]:
+        """Every warp by name, without decoding positions; for menus and listings."""
+        return {warp.name: self._warp_dict(warp) for warp in self.warps.all()}
 
-        return warps
+    def get_all_warps(self, server):
+        return {warp.name: self._warp_dict(warp, server) for warp in self.warps.all()}
 
     def delete_warp(self, name: str) -> bool:
         """Delete a warp by name, ignoring capitalization."""
         cur = self.execute("DELETE FROM warps WHERE name = ? COLLATE NOCASE", (name,))
         self.conn.commit()
+        self._warp_changed(name)
         return cur.rowcount > 0
 
     def create_spawn(self, location: Location, cost: float = 0.0, cooldown: int = 0, delay: int = 0) -> bool:
@@ -957,28 +1582,73 @@ class ServerDB(DatabaseManager):
             homes[name] = {'pos': pos, 'cooldown': cooldown, 'delay': delay}
         return homes
     
-    def set_last_warp(self, location: Location, xuid: str = None, username: str = None,
-                    name: str = "lastwarp") -> bool:
-        if not xuid and not username:
-            raise ValueError("Either xuid or username must be provided.")
-
-        pos_str = self.encode_location(location)
-        where_clause, params = self.user_selector(xuid, username)
-        existing = self.execute(f"SELECT 1 FROM last_warp WHERE {where_clause}", params).fetchone()
+    def queue_last_warp(self, location: Location, xuid: str, username: str = None, name: str = "lastwarp"):
+        """
+        Remember a player's /back location in memory; only the latest per player is kept.
+        Written by flush_last_warps() on the flush timer, on quit and on shutdown.
+        """
+        entry = (username, name, self.encode_location(location))
+        with self._last_location_lock:
+            self._last_locations[xuid] = entry
+            if xuid in self._pending_last_locations:
+                self.last_location_stats["coalesced"] += 1
+            self._pending_last_locations[xuid] = entry
+            self.last_location_stats["queued"] += 1
+
+    def flush_last_warps(self, xuids: list[str] = None, forget: bool = False) -> int:
+        """
+        Upsert queued /back locations (all of them, or only xuids) in one transaction.
+        With forget, the written players' in-memory locations are dropped once committed,
+        unless a newer one was queued meanwhile.
+        """
+        with self._last_location_lock:
+            if xuids is None:
+                pending = self._pending_last_locations
+                self._pending_last_locations = {}
+            else:
+                pending = {x: self._pending_last_locations.pop(x) for x in xuids if x in self._pending_last_locations}
+        if not pending:
+            return 0
 
-        if existing:
-            self.execute(
-                f"UPDATE last_warp SET pos = ?, name = ? WHERE {where_clause}",
-                (pos_str, name, *params)
-            )
-        else:
-            self.execute(
-                "INSERT INTO last_warp (xuid, username, name, pos) VALUES (?, ?, ?, ?)",
-                (xuid, username, name, pos_str)
-            )
+        rows = [(xuid, username, name, pos) for xuid, (username, name, pos) in pending.items()]
+        with self._lock:
+            try:
+                # username is UNIQUE too, so clear rows left behind by a name another account now uses
+                self.cursor.executemany(
+                    "DELETE FROM last_warp WHERE username = ? AND xuid != ?",
+                    [(username, xuid) for xuid, username, _, _ in rows if username]
+                )
+                self.cursor.executemany(
+                    """
+                    INSERT INTO last_warp (xuid, username, name, pos) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(xuid) DO UPDATE SET name = excluded.name, pos = excluded.pos
+                    """,
+                    rows
+                )
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                with self._last_location_lock:
+                    for xuid, entry in pending.items():
+                        self._pending_last_locations.setdefault(xuid, entry)
+                print(f"[PrimeBDS] Failed to flush /back locations: {e}")
+                return 0
+
+        with self._last_location_lock:
+            self.last_location_stats["flushes"] += 1
+            self.last_location_stats["rows_flushed"] += len(rows)
+            if forget:
+                for xuid, entry in pending.items():
+                    if self._last_locations.get(xuid) is entry:
+                        del self._last_locations[xuid]
+        return len(rows)
+
+    def flush_last_warps_async(self, xuids: list[str] = None, forget: bool = False) -> Future:
+        return self.submit(self.flush_last_warps, xuids, forget)
 
-        self.conn.commit()
-        return True
+    def close_connection(self):
+        self.flush_last_warps()
+        super().close_connection()
 
     def set_last_warp_settings(self, cooldown: int = 0, delay: int = 0) -> bool:
         """Set the global cooldown and delay for /back warps."""
@@ -1002,6 +1672,20 @@ class ServerDB(DatabaseManager):
         if not xuid and not username:
             raise ValueError("Either xuid or username must be provided.")
 
+        remembered = self._last_locations.get(xuid) if xuid else None
+        if remembered is not None:
+            # Position from memory; cooldown and delay still live on the row (0 until it is first written)
+            row = self.execute("SELECT cooldown, delay FROM last_warp WHERE xuid = ?", (xuid,), readonly=True).fetchone()
+            cooldown, delay = row if row else (0, 0)
+            username, name, pos = remembered
+            return {
+                'xuid': xuid, 'username': username, 'name': name, 'pos': self.decode_location(pos, server),
+                'cooldown': cooldown, 'delay': delay
+            }
+
+        if not xuid:
+            self.flush_last_warps()
+
         where_clause, params = self.user_selector(xuid, username)
         row = self.execute(
             f"SELECT xuid, username, name, pos, cooldown, delay FROM last_warp WHERE {where_clause}",
@@ -1018,6 +1702,13 @@ class ServerDB(DatabaseManager):
         if not xuid and not username:
             raise ValueError("Either xuid or username must be provided.")
 
+        if xuid:
+            with self._last_location_lock:
+                self._last_locations.pop(xuid, None)
+                self._pending_last_locations.pop(xuid, None)
+        else:
+            self.flush_last_warps()
+
         where_clause, params = self.user_selector(xuid, username)
         cur = self.execute(f"DELETE FROM last_warp WHERE {where_clause}", params)
         self.conn.commit()
@@ -1035,19 +1726,404 @@ class ServerDB(DatabaseManager):
         else:
             raise ValueError("Either xuid or username must be provided.")
 
+class AltClusters:
+    """
+    Connected components of linked accounts, kept as a flattened union-find keyed by xuid.
+
+    Edges are the rows of alt_logs (shared subnet or device). The xuid -> root mapping is
+    persisted in alt_clusters so startup only loads it; when links expire, just the
+    components that lost an edge are rebuilt from the links that remain.
+    """
+
+    SQL_PARAM_CHUNK = 500
+
+    def __init__(self, db: "UserDB"):
+        self.db = db
+        self._root: dict[str, str] = {}
+        self._members: dict[str, set[str]] = {}
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+
+        rows = self.db.execute("SELECT xuid, root FROM alt_clusters", readonly=True).fetchall()
+        if not rows:
+            if self.db.execute("SELECT 1 FROM alt_logs LIMIT 1", readonly=True).fetchone():
+                self.rebuild()
+            return
+
+        for xuid, root in rows:
+            self._root[xuid] = root
+            self._members.setdefault(root, set()).add(xuid)
+
+    def reset(self):
+        """Forget the in-memory clusters; they are reloaded from alt_clusters on next use."""
+        self._root.clear()
+        self._members.clear()
+        self._loaded = False
+
+    def find(self, xuid: str) -> str:
+        self._ensure_loaded()
+        return self._root.get(xuid, xuid)
+
+    def cluster_of(self, xuid: str) -> set[str]:
+        """All accounts linked to xuid (including itself)."""
+        root = self.find(xuid)
+        return set(self._members.get(root, {xuid}))
+
+    def link(self, xuid_a: str, xuid_b: str):
+        """Union the clusters of two linked accounts."""
+        if not xuid_a or not xuid_b or xuid_a == xuid_b:
+            return
+
+        root_a, root_b = self.find(xuid_a), self.find(xuid_b)
+        if root_a == root_b:
+            return
+
+        members_a = self._members.get(root_a, {xuid_a})
+        members_b = self._members.get(root_b, {xuid_b})
+        if len(members_a) < len(members_b):
+            root_a, root_b = root_b, root_a
+            members_a, members_b = members_b, members_a
+
+        moved = members_b | (members_a - self._root.keys())
+        for xuid in moved:
+            self._root[xuid] = root_a
+        members_a |= members_b
+        self._members[root_a] = members_a
+        if root_b != root_a:
+            self._members.pop(root_b, None)
+
+        self.db.executemany(
+            "INSERT OR REPLACE INTO alt_clusters (xuid, root) VALUES (?, ?)",
+            [(xuid, root_a) for xuid in moved]
+        )
+        self.db.publish_changes("alt", [None])
+
+    def linked_via(self, xuid: str) -> dict[str, str]:
+        """
+        For every other account in xuid's cluster, the account it was reached through
+        on a shortest path of links (xuid itself for direct links).
+        """
+        members = self.cluster_of(xuid)
+        if len(members) < 2:
+            return {}
+
+        adjacency: dict[str, set[str]] = {}
+        for main_xuid, alt_xuid in self._edges(members):
+            adjacency.setdefault(main_xuid, set()).add(alt_xuid)
+            adjacency.setdefault(alt_xuid, set()).add(main_xuid)
+
+        via = {}
+        frontier = [xuid]
+        seen = {xuid}
+        while frontier:
+            next_frontier = []
+            for current in frontier:
+                for neighbor in adjacency.get(current, ()):
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        via[neighbor] = current
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return via
+
+    def expire(self, now: int) -> int:
+        """Delete expired links and split the clusters that depended on them."""
+        expired = self.db.execute(
+            "SELECT main_xuid, alt_xuid FROM alt_logs WHERE expiry < ?", (now,), readonly=True
+        ).fetchall()
+        if not expired:
+            return 0
+
+        self.db.execute("DELETE FROM alt_logs WHERE expiry < ?", (now,))
+
+        affected_roots = {self.find(xuid) for edge in expired for xuid in edge if xuid}
+        for root in affected_roots:
+            members = self._members.pop(root, None)
+            if members:
+                self._rebuild_component(members)
+        self.db.publish_changes("alt", [None])
+        return len(expired)
+
+    def rebuild(self):
+        """Recompute every cluster from alt_logs (first run only)."""
+        xuids = {
+            xuid
+            for edge in self.db.execute("SELECT main_xuid, alt_xuid FROM alt_logs", readonly=True).fetchall()
+            for xuid in edge if xuid
+        }
+        self._root.clear()
+        self._members.clear()
+        self.db.execute("DELETE FROM alt_clusters")
+        self._rebuild_component(xuids)
+
+    def _edges(self, xuids: set[str]) -> list[tuple[str, str]]:
+        """Live alt_logs links touching any of the given accounts."""
+        edges = set()
+        ordered = list(xuids)
+        for i in range(0, len(ordered), self.SQL_PARAM_CHUNK):
+            chunk = ordered[i:i + self.SQL_PARAM_CHUNK]
+            marks = ", ".join("?" for _ in chunk)
+            rows = self.db.execute(
+                f"SELECT main_xuid, alt_xuid FROM alt_logs WHERE main_xuid IN ({marks}) "
+                f"UNION SELECT main_xuid, alt_xuid FROM alt_logs WHERE alt_xuid IN ({marks})",
+                (*chunk, *chunk), readonly=True
+            ).fetchall()
+            edges.update((a, b) for a, b in rows if a and b)
+        return list(edges)
+
+    def _rebuild_component(self, xuids: set[str]):
+        """Re-run union-find over the remaining links of a set of accounts and persist the result."""
+        parent = {xuid: xuid for xuid in xuids}
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for a, b in self._edges(xuids):
+            parent.setdefault(a, a)
+            parent.setdefault(b, b)
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+        components: dict[str, set[str]] = {}
+        for xuid in parent:
+            components.setdefault(find(xuid), set()).add(xuid)
+
+        for xuid in parent:
+            self._root.pop(xuid, None)
+        rows = []
+        for root, members in components.items():
+            if len(members) < 2:
+                continue
+            self._members[root] = members
+            for xuid in members:
+                self._root[xuid] = root
+                rows.append((xuid, root))
+
+        stale = list(parent)
+        for i in range(0, len(stale), self.SQL_PARAM_CHUNK):
+            chunk = stale[i:i + self.SQL_PARAM_CHUNK]
+            self.db.execute(f"DELETE FROM alt_clusters WHERE xuid IN ({', '.join('?' for _ in chunk)})", tuple(chunk))
+        if rows:
+            self.db.executemany("INSERT OR REPLACE INTO alt_clusters (xuid, root) VALUES (?, ?)", rows)
+
+@dataclass
+class ModerationEntry:
+    rowid: int
+    xuid: Optional[str]
+    name: Optional[str]
+    ip_host: str
+    is_banned: int
+    banned_time: int
+    ban_reason: str
+    is_ip_banned: int
+    is_muted: int
+    mute_time: int
+    mute_reason: str
+    is_ip_muted: int
+
+    @property
+    def active(self) -> bool:
+        return bool(self.is_banned or self.is_ip_banned or self.is_muted or self.is_ip_muted)
+
+class ModerationIndex:
+    """
+    Active bans and mutes held in memory so login and chat checks are dict lookups.
+
+    Only mod_logs rows carrying a ban or mute flag are kept (by rowid, xuid and ip host),
+    along with every name ban. The moderation writers in UserDB and ServerDB re-read the
+    rows they touched through refresh()/refresh_name_ban(), which keeps the index coherent.
+    """
+
+    COLUMNS = ("rowid, xuid, name, COALESCE(ip_host, ''), is_banned, banned_time, ban_reason, "
+               "is_ip_banned, is_muted, mute_time, mute_reason, is_ip_muted")
+
+    def __init__(self, user_db: "UserDB", server_db: "ServerDB"):
+        self.user_db = user_db
+        self.server_db = server_db
+        self._rows: dict[int, ModerationEntry] = {}
+        self._by_xuid: dict[str, int] = {}
+        self._by_host: dict[str, set[int]] = {}
+        self._name_bans: dict[str, NameBans] = {}
+        self.stats = {"lookups": 0, "refreshes": 0}
+
+    def load(self):
+        """Bulk load the index and attach it to both databases."""
+        self._rows.clear()
+        self._by_xuid.clear()
+        self._by_host.clear()
+        rows = self.user_db.execute(
+            f"SELECT {self.COLUMNS} FROM mod_logs "
+            "WHERE is_banned = 1 OR is_ip_banned = 1 OR is_muted = 1 OR is_ip_muted = 1",
+            readonly=True
+        ).fetchall()
+        for row in rows:
+            self._put(ModerationEntry(*row))
+
+        self._name_bans = {ban.name: ban for ban in self.server_db.get_all_bans()}
+
+        self.user_db.moderation = self
+        self.server_db.moderation = self
+
+    def refresh(self, condition: str, params: Tuple) -> list[ModerationEntry]:
+        """Re-read the mod_logs rows matching condition after they were written."""
+        self.stats["refreshes"] += 1
+        rows = self.user_db.execute(
+            f"SELECT {self.COLUMNS} FROM mod_logs WHERE {condition}", params, readonly=True
+        ).fetchall()
+        entries = [ModerationEntry(*row) for row in rows]
+        for entry in entries:
+            self._drop(entry.rowid)
+            if entry.active:
+                self._put(entry)
+        return entries
+
+    def refresh_name_ban(self, name: str):
+        self.stats["refreshes"] += 1
+        self._name_bans.pop(name, None)
+        ban = self.server_db.execute(
+            "SELECT name, banned_time, ban_reason FROM name_bans WHERE name = ? LIMIT 1", (name,), readonly=True
+        ).fetchone()
+        if ban:
+            self._name_bans[name] = NameBans(*ban)
+
+    def clear_name_bans(self):
+        self._name_bans.clear()
+
+    def is_tracked(self, xuid: str) -> bool:
+        return xuid in self._by_xuid
+
+    def get_ban(self, xuid: str) -> Optional[ModerationEntry]:
+        self.stats["lookups"] += 1
+        entry = self._rows.get(self._by_xuid.get(xuid))
+        return entry if entry and entry.is_banned else None
+
+    def get_mute(self, xuid: str) -> Optional[ModerationEntry]:
+        self.stats["lookups"] += 1
+        entry = self._rows.get(self._by_xuid.get(xuid))
+        return entry if entry and entry.is_muted else None
+
+    def get_ip_ban(self, ip: str) -> Optional[ModerationEntry]:
+        self.stats["lookups"] += 1
+        for rowid in self._by_host.get(get_ip_host(ip), ()):
+            entry = self._rows[rowid]
+            if entry.is_ip_banned:
+                return entry
+        return None
+
+    def get_ip_mute(self, ip: str) -> Optional[ModerationEntry]:
+        """Latest-expiring IP mute on the host, matching check_ip_mute's ORDER BY mute_time DESC."""
+        self.stats["lookups"] += 1
+        mutes = [self._rows[rowid] for rowid in self._by_host.get(get_ip_host(ip), ()) if self._rows[rowid].is_ip_muted]
+        return max(mutes, key=lambda entry: entry.mute_time or 0) if mutes else None
+
+    def get_name_ban(self, name: str) -> Optional[NameBans]:
+        self.stats["lookups"] += 1
+        return self._name_bans.get(name)
+
+    def size(self) -> dict:
+        return {"entries": len(self._rows), "hosts": len(self._by_host), "name_bans": len(self._name_bans)}
+
+    def _put(self, entry: ModerationEntry):
+        self._rows[entry.rowid] = entry
+        if entry.xuid:
+            self._by_xuid[entry.xuid] = entry.rowid
+        if entry.ip_host:
+            self._by_host.setdefault(entry.ip_host, set()).add(entry.rowid)
+
+    def _drop(self, rowid: int):
+        entry = self._rows.pop(rowid, None)
+        if entry is None:
+            return
+        if entry.xuid and self._by_xuid.get(entry.xuid) == rowid:
+            del self._by_xuid[entry.xuid]
+        host_rows = self._by_host.get(entry.ip_host)
+        if host_rows is not None:
+            host_rows.discard(rowid)
+            if not host_rows:
+                del self._by_host[entry.ip_host]
+
 class UserDB(DatabaseManager):
+    INDEXES = {
+        'users': [
+            ('idx_users_name', 'name'), ('idx_users_unique_id', 'unique_id'), ('idx_users_device_id', 'device_id'),
+            ('idx_users_internal_rank', 'internal_rank COLLATE NOCASE')
+        ],
+        'mod_logs': [
+            ('idx_mod_logs_name', 'name'), ('idx_mod_logs_ip_host', 'ip_host'), ('idx_mod_logs_ip_subnet', 'ip_subnet'),
+            ('idx_mod_logs_is_muted', 'is_muted'), ('idx_mod_logs_is_banned', 'is_banned'),
+            ('idx_mod_logs_is_ip_banned', 'is_ip_banned')
+        ],
+        'punishment_logs': [('idx_punishment_logs_name_timestamp', 'name, timestamp')],
+        'mod_notes': [('idx_mod_notes_xuid', 'xuid'), ('idx_mod_notes_name', 'name')],
+        'alt_logs': [('idx_alt_logs_expiry', 'expiry'), ('idx_alt_logs_alt_xuid', 'alt_xuid')],
+        'alt_clusters': [('idx_alt_clusters_root', 'root')],
+        'warn_logs': [('idx_warn_logs_xuid_time', 'xuid, warn_time'), ('idx_warn_logs_name_time', 'name, warn_time')]
+    }
+
+    MIGRATIONS = ("create_tables", "create_change_feed", "pack_logout_positions", "create_filter_indexes")
+
+    # /filterlist filters: name -> (table, condition); rows are listed in insertion order
+    PLAYER_FILTERS = {
+        "default": ("users", "internal_rank = 'default' COLLATE NOCASE"),
+        "offline": ("users", "name IS NOT NULL"),
+        "muted": ("mod_logs", "is_muted = 1 AND name IS NOT NULL"),
+        "banned": ("mod_logs", "is_banned = 1 AND name IS NOT NULL"),
+        "ipbanned": ("mod_logs", "is_ip_banned = 1 AND name IS NOT NULL")
+    }
+
     def __init__(self, db_name: str):
-        """Initialize the database connection and create tables."""
+        """Initialize the database connection and bring the schema up to date."""
         super().__init__(db_name)
         self.db_name = db_name
-        self._cache = {}
-        self._name_to_xuid_cache = {}
-        self._xuid_to_name_cache = {}
-        self._ip_ban_cache = {}
+        db_config = load_config().get("modules", {}).get("database", {})
+        self._cache_ttl = db_config.get("cache_ttl_seconds", 60)
+        cache_size = db_config.get("cache_max_entries", 1024)
+
+        # Bounded LRU+TTL caches, all keyed by xuid except the name and IP host lookups
+        self._user_cache = TTLCache("users", cache_size, self._cache_ttl)
+        self._mod_log_cache = TTLCache("mod_logs", cache_size, self._cache_ttl)
+        self._name_to_xuid_cache = TTLCache("name_to_xuid", cache_size, self._cache_ttl)
+        self._xuid_to_name_cache = TTLCache("xuid_to_name", cache_size, self._cache_ttl)
+        self._ip_ban_cache = TTLCache("ip_bans", cache_size, self._cache_ttl)
         self._ip_ban_index = {}
-        self._ip_mute_cache = {}
-        self._cache_ttl = 60
-        self.create_tables()
+        self._ip_mute_cache = TTLCache("ip_mutes", cache_size, self._cache_ttl)
+        self._punishment_cursors = TTLCache("punishment_cursors", 256, 300)
+        self._filter_counts = TTLCache("player_filter_counts", len(self.PLAYER_FILTERS), self._cache_ttl)
+        # Subnet -> xuids, built lazily; the executor thread reads it during alt checks
+        self._subnet_index: Optional[dict[str, set[str]]] = None
+        self._subnet_of: dict[str, str] = {}
+        self._subnet_lock = threading.Lock()
+
+        # Write-behind: xuid -> {column: value}, merged until the next flush
+        db_config = load_config().get("modules", {}).get("database", {})
+        self._pending_updates: dict[str, dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        # Batches a flush has taken but not yet committed stay overlaid on reads until it has
+        self._flushing: list[dict[str, dict[str, Any]]] = []
+        self._flush_generation = 0
+        self.write_behind_max_pending = db_config.get("write_behind_max_pending", 64)
+        self.write_behind_stats = {"queued": 0, "coalesced": 0, "flushes": 0, "rows_flushed": 0}
+
+        self.migrate()
+        self.alt_clusters = AltClusters(self)
+
+        # Attached by ModerationIndex.load(); checks fall back to SQL until then
+        self.moderation: Optional[ModerationIndex] = None
+
+        # Attached by ExpiryScheduler.load(); until then expired alt links are purged on read
+        self.expiry: Optional["ExpiryScheduler"] = None
+
+        # Attached by ChatStates and Subscriptions; told whenever a player's user or mod_logs row changes
+        self.chat_states: Optional["ChatStates"] = None
+        self.subscriptions: Optional["Subscriptions"] = None
 
     def create_tables(self):
         """Create tables if they don't exist."""
@@ -1092,7 +2168,8 @@ class UserDB(DatabaseManager):
             'ip_address': 'TEXT',
             'is_ip_banned': 'INTEGER',
             'is_ip_muted': 'INTEGER',
-            
+            'ip_host': 'TEXT',
+            'ip_subnet': 'TEXT'
         }
         self.create_table('mod_logs', moderation_log_columns)
 
@@ -1126,6 +2203,12 @@ class UserDB(DatabaseManager):
         }
         self.create_table('alt_logs', alt_log_columns, unique=['main_xuid', 'alt_xuid'])
 
+        alt_cluster_columns = {
+            'xuid': 'TEXT PRIMARY KEY',
+            'root': 'TEXT'
+        }
+        self.create_table('alt_clusters', alt_cluster_columns)
+
         warn_log_columns = {
             'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
             'xuid': 'TEXT',
@@ -1136,6 +2219,9 @@ class UserDB(DatabaseManager):
         }
         self.create_table('warn_logs', warn_log_columns)
 
+        self.migrate_table("users", User)
+        self.migrate_table("mod_logs", ModLog)
+
     def save_user(self, player: Player):
         """Primary data saving for users."""
         xuid = player.xuid
@@ -1150,6 +2236,8 @@ class UserDB(DatabaseManager):
         last_join = int(time.time())
         last_leave = 0
         ip = str(player.address)
+        ip_host = get_ip_host(ip)
+        ip_subnet = subnet_key(ip)
         internal_rank = "Operator" if player.is_op else "Default"
 
         self.invalidate_user_cache(xuid)
@@ -1172,10 +2260,11 @@ class UserDB(DatabaseManager):
             mod_data = {
                 'xuid': xuid, 'name': name, 'is_muted': 0, 'mute_time': 0, 'mute_reason': "None",
                 'is_banned': 0, 'banned_time': 0, 'ban_reason': "None", 'ip_address': ip, 'is_ip_banned': 0,
-                    'is_ip_muted': 0
+                    'is_ip_muted': 0, 'ip_host': ip_host, 'ip_subnet': ip_subnet
             }
             self.insert('users', data)
             self.insert('mod_logs', mod_data)
+            self.invalidate_player_counts()
         else:
             # Existing user: update
             user_updates = {
@@ -1184,14 +2273,19 @@ class UserDB(DatabaseManager):
                 'gamemode': gamemode
             }
             mod_updates = {
-                'name': name, 'ip_address': ip
+                'name': name, 'ip_address': ip, 'ip_host': ip_host, 'ip_subnet': ip_subnet
             }
             self.update('users', user_updates, 'xuid = ?', (xuid,))
             self.update('mod_logs', mod_updates, 'xuid = ?', (xuid,))
+            if self.moderation is not None and self.moderation.is_tracked(xuid):
+                self.moderation.refresh('xuid = ?', (xuid,))
+
+        self._index_subnet(xuid, ip_subnet)
+        self.publish_changes("user", [xuid])
 
     def migrate_table(self, table_name: str, data_cls):
         """Add missing columns to a table according to the dataclass fields."""
-        existing_columns = {row[1] for row in self.execute(f"PRAGMA table_info({table_name})").fetchall()}
+        existing_columns = set(self.table_columns(table_name))
         type_map = {int: "INTEGER", float: "REAL", str: "TEXT", bool: "INTEGER"}
 
         for f in fields(data_cls):
@@ -1219,6 +2313,59 @@ class UserDB(DatabaseManager):
                 except sqlite3.OperationalError as e:
                     print(f"Warning: Could not add column '{f.name}' to {table_name}: {e}")
 
+        self.refresh_schema(table_name)
+        if table_name == "mod_logs":
+            self.backfill_ip_hosts()
+            self.backfill_ip_subnets()
+        self.ensure_indexes(table_name)
+
+    def backfill_ip_hosts(self):
+        """Fill ip_host for rows written before the column existed."""
+        self.execute(
+            """
+            UPDATE mod_logs
+            SET ip_host = TRIM(CASE WHEN INSTR(ip_address, ':') > 0
+                                    THEN SUBSTR(ip_address, 1, INSTR(ip_address, ':') - 1)
+                                    ELSE ip_address END)
+            WHERE (ip_host IS NULL OR ip_host = '') AND ip_address IS NOT NULL AND ip_address != ''
+            """
+        )
+
+    def create_filter_indexes(self):
+        self.ensure_indexes("users")
+        self.ensure_indexes("mod_logs")
+
+    def pack_logout_positions(self):
+        """Convert "x,y,z" logout positions plus last_logout_dim to the packed binary form."""
+        rows = self.execute(
+            "SELECT xuid, last_logout_pos, last_logout_dim FROM users "
+            "WHERE typeof(last_logout_pos) = 'text' AND last_logout_pos != ''"
+        ).fetchall()
+        updates = []
+        for xuid, pos, dimension in rows:
+            unpacked = location_util.unpack_location(pos)
+            if unpacked is not None:
+                x, y, z, _, pitch, yaw = unpacked
+                updates.append((location_util.pack_location(x, y, z, dimension or "Overworld", pitch, yaw), xuid))
+        if updates:
+            self.executemany("UPDATE users SET last_logout_pos = ? WHERE xuid = ?", updates)
+
+    def backfill_ip_subnets(self):
+        """Fill the /24 ip_subnet key for rows written before the column existed."""
+        # Read on the writer: during a migration the column only exists inside its transaction
+        rows = self.execute(
+            "SELECT xuid, ip_address FROM mod_logs WHERE (ip_subnet IS NULL OR ip_subnet = '') AND ip_host != ''"
+        ).fetchall()
+        updates = [(key, xuid) for xuid, ip_address in rows if (key := subnet_key(ip_address))]
+        if not updates:
+            return
+
+        with self._lock:
+            self.cursor.executemany("UPDATE mod_logs SET ip_subnet = ? WHERE xuid = ?", updates)
+            self._commit()
+        with self._subnet_lock:
+            self._subnet_index = None
+
     def patch_user_fields(self, data: dict) -> dict:
         """Ensure user data fields are properly typed with safe defaults, no overwriting existing non-None fields."""
         type_defaults = {
@@ -1241,90 +2388,209 @@ class UserDB(DatabaseManager):
 
         return patched_data
 
-    def get_online_user(self, xuid: str) -> Optional[User]:
-        cached = self._cache.get(xuid)
-        if cached:
-            user, cached_time = cached
-            if time.time() - cached_time < self._cache_ttl:
-                return user
+    def queue_user_update(self, xuid: str, updates: Dict[str, Any]):
+        """
+        Queue column updates for a user without writing them yet.
+        Updates for the same xuid are merged (latest value wins) and written by flush().
+        """
+        if not xuid or not updates:
+            return
+
+        values = {}
+        for column, value in updates.items():
+            if isinstance(value, Vector):
+                value = f"{value.x},{value.y},{value.z}"
+            elif isinstance(value, bool):
+                value = int(value)
+            values[column] = value
+
+        with self._pending_lock:
+            pending = self._pending_updates.get(xuid)
+            if pending is None:
+                pending = self._pending_updates[xuid] = {}
             else:
-                self.invalidate_user_cache(xuid)
+                self.write_behind_stats["coalesced"] += len(pending.keys() & values.keys())
+            pending.update(values)
+            self.write_behind_stats["queued"] += len(values)
+            should_flush = len(self._pending_updates) >= self.write_behind_max_pending
+
+        # Keep a cached copy coherent instead of dropping it
+        user = self._user_cache.get(xuid)
+        if user:
+            self._user_cache.replace(xuid, self._apply_pending(user, values))
+
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write every queued user update in one transaction. Returns the number of users written."""
+        with self._pending_lock:
+            pending = self._pending_updates
+            self._pending_updates = {}
+            if pending:
+                self._flushing.append(pending)
+        if not pending:
+            return 0
+
+        # Users with the same set of dirty columns share one executemany
+        batches: dict[tuple, list] = {}
+        for xuid, updates in pending.items():
+            columns = tuple(updates.keys())
+            batches.setdefault(columns, []).append((*updates.values(), xuid))
 
-        result = self.execute(
-            "SELECT * FROM users WHERE xuid = ?",
-            (xuid,), readonly=True
-        ).fetchone()
+        with self._lock:
+            try:
+                for columns, rows in batches.items():
+                    set_clause = ", ".join(f"{col} = ?" for col in columns)
+                    self.cursor.executemany(f"UPDATE users SET {set_clause} WHERE xuid = ?", rows)
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                with self._pending_lock:
+                    # Requeue without clobbering anything queued since
+                    for xuid, updates in pending.items():
+                        self._pending_updates[xuid] = {**updates, **self._pending_updates.get(xuid, {})}
+                    self._finish_flush(pending)
+                print(f"[PrimeBDS] Failed to flush queued user updates: {e}")
+                return 0
+
+        with self._pending_lock:
+            self._finish_flush(pending)
+        self.write_behind_stats["flushes"] += 1
+        self.write_behind_stats["rows_flushed"] += len(pending)
+        self.publish_changes("user", list(pending))
+        return len(pending)
+
+    def _finish_flush(self, pending: dict[str, dict[str, Any]]):
+        """Stop overlaying a flushed batch; call with _pending_lock held."""
+        self._flushing = [batch for batch in self._flushing if batch is not pending]
+        self._flush_generation += 1
+
+    def _apply_pending(self, user: User, updates: Optional[Dict[str, Any]] = None) -> User:
+        """Overlay queued and still-uncommitted column values onto a user read from the database."""
+        if updates is None:
+            with self._pending_lock:
+                updates = {}
+                for batch in self._flushing:
+                    updates.update(batch.get(user.xuid, ()))
+                updates.update(self._pending_updates.get(user.xuid, ()))
+        known = {k: v for k, v in updates.items() if k in User.__dataclass_fields__}
+        return replace(user, **known) if known else user
+
+    def _discard_pending(self, xuid: Optional[str], column: str):
+        """Drop a queued value that a direct write is about to supersede."""
+        if not xuid:
+            return
+        with self._pending_lock:
+            pending = self._pending_updates.get(xuid)
+            if pending:
+                pending.pop(column, None)
+                if not pending:
+                    del self._pending_updates[xuid]
 
-        if result:
-            column_info = self.execute("PRAGMA table_info(users)").fetchall()
-            column_names = [row[1] for row in column_info]
-            raw_data = dict(zip(column_names, result))
-            result_dict = self.patch_user_fields(raw_data)
-            user = User(**result_dict)
+    def close_connection(self):
+        self.flush()
+        super().close_connection()
+
+    # Async variants of the hot paths; callbacks run on the server thread
+    def get_online_user_async(self, xuid: str, callback: Callable[[Optional[User]], None] = None) -> Future:
+        return self.submit(self.get_online_user, xuid, callback=callback)
+
+    def get_mod_log_async(self, xuid: str, callback: Callable[[Optional[ModLog]], None] = None) -> Future:
+        return self.submit(self.get_mod_log, xuid, callback=callback)
+
+    def check_alts_async(self, main_xuid: str, main_name: str, ip: str, device_id: str,
+                         callback: Callable[[list[dict]], None] = None) -> Future:
+        """check_alts with only the SQL on the worker; clusters and expiry are updated on the server thread."""
+        def link(result: tuple[list[dict], int]):
+            alts, expiry_time = result
+            self._link_alts(main_xuid, alts, expiry_time)
+            if callback is not None:
+                callback(alts)
+
+        return self.submit(self._record_alts, main_xuid, main_name, ip, device_id, callback=link)
 
-            self._cache[xuid] = (user, time.time())
+    def get_latest_active_warning_async(self, xuid: Optional[str] = None, name: Optional[str] = None,
+                                        callback: Callable[[Optional[dict]], None] = None) -> Future:
+        return self.submit(self.get_latest_active_warning, xuid, name, callback=callback)
+
+    def flush_async(self) -> Future:
+        return self.submit(self.flush)
+
+    def _read_user(self, condition: str, params: Tuple) -> Optional[User]:
+        """
+        Read one user with queued values overlaid. If a flush commits between the read and the
+        overlay, neither may hold its values, so the read is retried.
+        """
+        mapper = self.row_mapper("users", User, patch_none=True)
+        while True:
+            generation = self._flush_generation
+            result = self.execute(
+                f"SELECT {mapper.columns} FROM users WHERE {condition}", params, readonly=True
+            ).fetchone()
+            if not result:
+                return None
+            user = self._apply_pending(mapper.map(result))
+            if generation == self._flush_generation:
+                return user
+
+    def get_online_user(self, xuid: str) -> Optional[User]:
+        cached = self._user_cache.get(xuid)
+        if cached:
+            return cached
+
+        user = self._read_user("xuid = ?", (xuid,))
+        if user:
+
+            self._user_cache.set(xuid, user)
             return user
 
         return None
 
     def invalidate_user_cache(self, xuid: Optional[str] = None):
         """
-        Removes a cached user entry, or clears the entire cache if xuid is None.
+        Removes the cached entries for one player, or clears every user cache if xuid is None.
         """
+        if self.chat_states is not None:
+            self.chat_states.invalidate(xuid or None)
+        if self.subscriptions is not None:
+            self.subscriptions.invalidate(xuid or None)
         if xuid:
-            self._cache.pop(xuid, None)
-            self._cache.pop("modlog:{xuid}", None)
-            self._name_to_xuid_cache.clear()
-            self._xuid_to_name_cache.clear()
+            self._user_cache.pop(xuid)
+            self._mod_log_cache.pop(xuid)
+            name = self._xuid_to_name_cache.pop(xuid)
+            if name is not None:
+                self._name_to_xuid_cache.pop(name)
         else:
-            self._cache.clear()
+            self._user_cache.clear()
+            self._mod_log_cache.clear()
             self._name_to_xuid_cache.clear()
             self._xuid_to_name_cache.clear()
     
     def get_online_user_by_unique_id(self, unique_id: str) -> Optional[User]:
-        result = self.execute(
-            "SELECT * FROM users WHERE unique_id = ?", 
-            (unique_id,), readonly=True
-        ).fetchone()
-        if result:
-            column_info = self.execute("PRAGMA table_info(users)").fetchall()
-            column_names = [row[1] for row in column_info]
-            raw_data = dict(zip(column_names, result))
-            result_dict = self.patch_user_fields(raw_data)
-            user = User(**result_dict)
-
-            return user
-        return None
+        return self._read_user("unique_id = ?", (unique_id,))
 
     def get_offline_user(self, name: str) -> Optional[User]:
         xuid = self.get_xuid_by_name(name)
-        cached = self._cache.get(xuid)
+        cached = self._user_cache.get(xuid) if xuid else None
         if cached:
-            user, cached_time = cached
-            if time.time() - cached_time < self._cache_ttl:
-                return user
-            else:
-                self.invalidate_user_cache(xuid)
-
-        result = self.execute(
-            "SELECT * FROM users WHERE name = ?",
-            (name,), readonly=True
-        ).fetchone()
+            return cached
 
-        if result:
-            column_names = [row[1] for row in self.execute("PRAGMA table_info(users)").fetchall()]
-            result_dict = self.patch_user_fields(dict(zip(column_names, result)))
-            user = User(**result_dict)
-            self._cache[name] = (user, time.time())
-            return user
-        return None
+        user = self._read_user("name = ?", (name,))
+        if user:
+            self._user_cache.set(user.xuid, user)
+        return user
     
     def check_and_update_mute(self, xuid: str, name: str) -> int:
         """Checks if a player is muted and updates the database if the mute has expired."""
-        mute_row = self.execute(
-            "SELECT is_muted, mute_time FROM mod_logs WHERE xuid = ?", 
-            (xuid,), readonly=True
-        ).fetchone()
+        if self.moderation is not None:
+            mute = self.moderation.get_mute(xuid)
+            mute_row = (mute.is_muted, mute.mute_time) if mute else None
+        else:
+            mute_row = self.execute(
+                "SELECT is_muted, mute_time FROM mod_logs WHERE xuid = ?",
+                (xuid,), readonly=True
+            ).fetchone()
 
         if mute_row:
             is_muted, mute_time = mute_row
@@ -1338,58 +2604,132 @@ class UserDB(DatabaseManager):
         return 0
 
     def get_mod_log(self, xuid: str) -> Optional[ModLog]:
-        cached = self._cache.get(f"modlog:{xuid}")
+        cached = self._mod_log_cache.get(xuid)
         if cached:
-            log, cached_time = cached
-            if time.time() - cached_time < self._cache_ttl:
-                return log
-            else:
-                self.invalidate_user_cache(f"modlog:{xuid}")
+            return cached
 
+        mapper = self.row_mapper("mod_logs", ModLog)
         row = self.execute(
-            "SELECT * FROM mod_logs WHERE xuid = ?",
+            f"SELECT {mapper.columns} FROM mod_logs WHERE xuid = ?",
             (xuid,), readonly=True
         ).fetchone()
 
         if row:
-            column_info = self.execute("PRAGMA table_info(mod_logs)").fetchall()
-            column_names = [col[1] for col in column_info]
-            raw_data = dict(zip(column_names, row))
-
-            modlog_fields = {f.name for f in fields(ModLog)}
-            filtered = {k: v for k, v in raw_data.items() if k in modlog_fields}
-
-            mod_log = ModLog(**filtered)
-            self._cache[f"modlog:{xuid}"] = (mod_log, time.time())
+            mod_log = mapper.map(row)
+            self._mod_log_cache.set(xuid, mod_log)
             return mod_log
         return None
 
+    def count_players(self, filter_type: str, exclude_names: list[str] = ()) -> int:
+        """
+        Number of players matching a PLAYER_FILTERS entry, less any excluded names.
+        The unexcluded total is cached and dropped by moderation and rank writes.
+        """
+        table, condition = self.PLAYER_FILTERS[filter_type]
+        total = self._filter_counts.get(filter_type)
+        if total is None:
+            self.flush()
+            total = self.execute(f"SELECT COUNT(*) FROM {table} WHERE {condition}", readonly=True).fetchone()[0]
+            self._filter_counts.set(filter_type, total)
+
+        if exclude_names:
+            placeholders = ", ".join("?" for _ in exclude_names)
+            total -= self.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE {condition} AND name IN ({placeholders})",
+                tuple(exclude_names), readonly=True
+            ).fetchone()[0]
+        return total
+
+    def get_player_page(self, filter_type: str, limit: int, offset: int, exclude_names: list[str] = ()) -> list[str]:
+        """Names of one page of players matching a PLAYER_FILTERS entry."""
+        table, condition = self.PLAYER_FILTERS[filter_type]
+        params: tuple = ()
+        if exclude_names:
+            condition += f" AND name NOT IN ({', '.join('?' for _ in exclude_names)})"
+            params = tuple(exclude_names)
+        rows = self.execute(
+            f"SELECT name FROM {table} WHERE {condition} ORDER BY rowid LIMIT ? OFFSET ?",
+            params + (limit, offset), readonly=True
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def invalidate_player_counts(self):
+        self._filter_counts.clear()
+
     def get_all_users(self) -> list[dict]:
-        rows = self.execute("SELECT * FROM users", readonly=True).fetchall()
-        columns = [col[1] for col in self.execute("PRAGMA table_info(users)").fetchall()]
+        self.flush()
+        columns = self.table_columns("users")
+        rows = self.execute(f"SELECT {', '.join(columns)} FROM users", readonly=True).fetchall()
         return [dict(zip(columns, row)) for row in rows]
     
+    def _load_subnet_index(self) -> dict[str, set[str]]:
+        """Call with _subnet_lock held."""
+        if self._subnet_index is None:
+            index: dict[str, set[str]] = {}
+            rows = self.execute(
+                "SELECT xuid, ip_subnet FROM mod_logs WHERE xuid IS NOT NULL AND ip_subnet != ''",
+                readonly=True
+            ).fetchall()
+            for xuid, key in rows:
+                index.setdefault(key, set()).add(xuid)
+            self._subnet_of = {xuid: key for xuid, key in rows}
+            self._subnet_index = index
+        return self._subnet_index
+
+    def _index_subnet(self, xuid: str, key: str):
+        """Move a player to their current subnet in the in-memory subnet -> xuids map."""
+        with self._subnet_lock:
+            if self._subnet_index is None:
+                return
+
+            previous = self._subnet_of.get(xuid)
+            if previous == key:
+                return
+            if previous:
+                members = self._subnet_index.get(previous)
+                if members:
+                    members.discard(xuid)
+                    if not members:
+                        del self._subnet_index[previous]
+            if key:
+                self._subnet_index.setdefault(key, set()).add(xuid)
+                self._subnet_of[xuid] = key
+            else:
+                self._subnet_of.pop(xuid, None)
+
+    def _subnet_has_others(self, key: str, xuid: str) -> bool:
+        """Whether anyone besides xuid is known on the subnet."""
+        with self._subnet_lock:
+            members = self._load_subnet_index().get(key)
+            return bool(members) and (len(members) > 1 or xuid not in members)
+
+    def _schedule_expiry(self, expires_at: int, kind: str, key=None):
+        if self.expiry is not None:
+            self.expiry.schedule(expires_at, kind, key)
+
     def get_alts(self, ip: str, device_id: str, exclude_xuid: str) -> list[dict]:
         now = int(time.time())
-        self.execute("DELETE FROM alt_logs WHERE expiry < ?", (now,))
+        if self.expiry is None:
+            self.alt_clusters.expire(now)
 
-        query = """
-            SELECT u.name, u.xuid, COALESCE(m.ip_address, '') AS ip_address, u.device_id
+        select = """
+            SELECT u.rowid, u.name, u.xuid, COALESCE(m.ip_address, '') AS ip_address, u.device_id
             FROM users u
             LEFT JOIN mod_logs m ON u.xuid = m.xuid
-            WHERE u.xuid != ?
         """
-        rows = self.execute(query, (exclude_xuid,), readonly=True).fetchall()
-        columns = ["name", "xuid", "ip_address", "device_id"]
+        matches = {}
 
-        results = []
-        for row in rows:
-            alt = dict(zip(columns, row))
-            if (
-                (alt["ip_address"] and ip and same_subnet(ip, alt["ip_address"])) or
-                (device_id and alt["device_id"] and alt["device_id"] == device_id)
-            ):
-                results.append(alt)
+        key = subnet_key(ip) if ip else ""
+        if key and self._subnet_has_others(key, exclude_xuid):
+            rows = self.execute(f"{select} WHERE m.ip_subnet = ? AND u.xuid != ?", (key, exclude_xuid), readonly=True).fetchall()
+            matches.update((row[2], row) for row in rows)
+
+        if device_id:
+            rows = self.execute(f"{select} WHERE u.device_id = ? AND u.xuid != ?", (device_id, exclude_xuid), readonly=True).fetchall()
+            matches.update((row[2], row) for row in rows)
+
+        columns = ["name", "xuid", "ip_address", "device_id"]
+        results = [dict(zip(columns, row[1:])) for row in sorted(matches.values(), key=lambda r: r[0])]
 
         extra_rows = self.execute(
             """
@@ -1401,14 +2741,20 @@ class UserDB(DatabaseManager):
         ).fetchall()
 
         for alt_name, alt_xuid in extra_rows:
-            if not any(r["xuid"] == alt_xuid for r in results):
+            if alt_xuid not in matches:
                 results.append({"name": alt_name, "xuid": alt_xuid,
                                 "ip_address": "", "device_id": ""})
 
         return results
     
-    def check_alts(self, main_xuid: str, main_name: str, ip: str, device_id: str):
-        """Check for alt accounts and update alt_logs with 90-day expiry."""
+    def check_alts(self, main_xuid: str, main_name: str, ip: str, device_id: str) -> list[dict]:
+        """Check for alt accounts, update alt_logs with 90-day expiry and return the alts found."""
+        alts, expiry_time = self._record_alts(main_xuid, main_name, ip, device_id)
+        self._link_alts(main_xuid, alts, expiry_time)
+        return alts
+
+    def _record_alts(self, main_xuid: str, main_name: str, ip: str, device_id: str) -> tuple[list[dict], int]:
+        """The SQL half of check_alts: find the alts and upsert their alt_logs rows."""
         now = int(time.time())
         expiry_time = now + 90 * 24 * 60 * 60  # 90 days in seconds
 
@@ -1423,9 +2769,99 @@ class UserDB(DatabaseManager):
                 """,
                 (main_name, main_xuid, alt["name"], alt["xuid"], expiry_time),
             )
+        return alts, expiry_time
+
+    def _link_alts(self, main_xuid: str, alts: list[dict], expiry_time: int):
+        """The in-memory half of check_alts; runs on the server thread."""
+        for alt in alts:
+            self.alt_clusters.link(main_xuid, alt["xuid"])
+        if alts:
+            self._schedule_expiry(expiry_time, "alt")
+
+    def get_linked_alts(self, xuid: str) -> list[dict]:
+        """
+        Every account in xuid's alt cluster, including ones only linked transitively.
+        Each entry carries the name of the account it was linked through ("via").
+        """
+        if self.expiry is None:
+            self.alt_clusters.expire(int(time.time()))
+        via = self.alt_clusters.linked_via(xuid)
+        if not via:
+            return []
+
+        xuids = list(via)
+        names = {}
+        for i in range(0, len(xuids), AltClusters.SQL_PARAM_CHUNK):
+            chunk = xuids[i:i + AltClusters.SQL_PARAM_CHUNK]
+            rows = self.execute(
+                f"SELECT xuid, name FROM users WHERE xuid IN ({', '.join('?' for _ in chunk)})",
+                tuple(chunk), readonly=True
+            ).fetchall()
+            names.update(rows)
+
+        return [
+            {"xuid": alt_xuid, "name": names.get(alt_xuid), "via": names.get(via_xuid) if via_xuid != xuid else None}
+            for alt_xuid, via_xuid in via.items()
+        ]
+
+    def _refresh_moderation(self, scope: str, key: str):
+        """
+        Bring the local index up to date after a mod_logs write and announce it to other processes.
+        scope is the mod_logs column the write matched on: "xuid", "name" or "ip_host".
+        """
+        entries = self.moderation.refresh(f"{scope} = ?", (key,)) if self.moderation is not None else None
+        if self.chat_states is not None:
+            if entries is None:
+                self.chat_states.invalidate()
+            for entry in entries or ():
+                self.chat_states.invalidate(entry.xuid, entry.ip_host)
+        self.invalidate_player_counts()
+        self.publish_changes(scope, [key])
+
+    def _apply_change(self, scope: str, key: Optional[str]):
+        if scope != "alt":
+            self.invalidate_player_counts()
+        if scope == "user":
+            if not key:
+                return
+            self.invalidate_user_cache(key)
+            if self.moderation is not None and self.moderation.is_tracked(key):
+                self.moderation.refresh('xuid = ?', (key,))
+        elif scope in ("xuid", "name", "ip_host"):
+            if scope == "ip_host":
+                self.invalidate_ip_ban(key)
+                self._ip_mute_cache.pop(key)
+            if self.moderation is not None:
+                entries = self.moderation.refresh(f"{scope} = ?", (key,))
+            else:
+                entries = [ModerationEntry(*row) for row in self.execute(
+                    f"SELECT {ModerationIndex.COLUMNS} FROM mod_logs WHERE {scope} = ?", (key,), readonly=True
+                ).fetchall()]
+            for entry in entries:
+                if entry.xuid:
+                    self.invalidate_user_cache(entry.xuid)
+                    self.invalidate_ip_ban_by_xuid(entry.xuid)
+                if entry.is_banned:
+                    if entry.is_ip_banned and entry.ip_host:
+                        self._schedule_expiry(entry.banned_time, "ip_ban", entry.ip_host)
+                    elif entry.xuid:
+                        self._schedule_expiry(entry.banned_time, "ban", entry.xuid)
+                if entry.is_muted and entry.xuid:
+                    self._schedule_expiry(entry.mute_time, "mute", entry.xuid)
+        elif scope == "alt":
+            self.alt_clusters.reset()
+        elif scope == "*":
+            self.invalidate_user_cache()
+            self._ip_ban_cache.clear()
+            self._ip_mute_cache.clear()
+            self.alt_clusters.reset()
+            if self.moderation is not None:
+                self.moderation.load()
 
     def add_ban(self, xuid, expiration: int, reason: str, ip_ban: bool = False):
         self.update('mod_logs', {'is_banned': 1, 'banned_time': expiration, 'ban_reason': reason, 'is_ip_banned': ip_ban}, 'xuid = ?', (xuid,))
+        self._refresh_moderation("xuid", xuid)
+        self._schedule_expiry(expiration, "ban", xuid)
         self.insert('punishment_logs', {
             'xuid': xuid, 'name': self.get_name_by_xuid(xuid), 'action_type': 'Ban',
             'reason': reason, 'timestamp': int(time.time()), 'duration': expiration
@@ -1434,33 +2870,30 @@ class UserDB(DatabaseManager):
         self.invalidate_ip_ban_by_xuid(xuid)
 
     def add_ip_ban(self, ip: str, expiration: int, reason: str):
-        def get_host(ip_address: str) -> str:
-            return ip_address.split(':')[0].strip()
-
-        ip_host = get_host(ip)
+        ip_host = get_ip_host(ip)
         now = int(time.time())
 
-        query = "SELECT xuid, name, ip_address FROM mod_logs"
-        rows = self.execute(query, (), readonly=True).fetchall()
+        rows = self.execute(
+            "SELECT xuid, name, ip_address FROM mod_logs WHERE ip_host = ?",
+            (ip_host,), readonly=True
+        ).fetchall()
         columns = ["xuid", "name", "ip_address"]
-        all_entries = [dict(zip(columns, row)) for row in rows]
-
-        matching_entries = [entry for entry in all_entries if get_host(entry["ip_address"]) == ip_host]
+        matching_entries = [dict(zip(columns, row)) for row in rows]
 
         if matching_entries:
-            for entry in matching_entries:
-                self.execute(
-                    """
-                    UPDATE mod_logs
-                    SET is_banned = 1,
-                        banned_time = ?,
-                        ban_reason = ?,
-                        is_ip_banned = 1
-                    WHERE ip_address = ?
-                    """,
-                    (expiration, reason, entry["ip_address"])
-                )
+            self.execute(
+                """
+                UPDATE mod_logs
+                SET is_banned = 1,
+                    banned_time = ?,
+                    ban_reason = ?,
+                    is_ip_banned = 1
+                WHERE ip_host = ?
+                """,
+                (expiration, reason, ip_host)
+            )
 
+            for entry in matching_entries:
                 self.execute(
                     """
                     INSERT INTO punishment_logs (xuid, name, action_type, reason, timestamp, duration)
@@ -1481,13 +2914,13 @@ class UserDB(DatabaseManager):
                 INSERT INTO mod_logs (
                     xuid, name, is_muted, mute_time, mute_reason,
                     is_banned, banned_time, ban_reason,
-                    ip_address, is_ip_banned, is_ip_muted
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ip_address, is_ip_banned, is_ip_muted, ip_host
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     None, None, 0, 0, "None",
                     1, expiration, reason,
-                    ip, 1, 0
+                    ip, 1, 0, ip_host
                 )
             )
 
@@ -1499,57 +2932,60 @@ class UserDB(DatabaseManager):
                 (None, ip_host, "IP Ban", reason, now, expiration)
             )
 
+        self._refresh_moderation("ip_host", ip_host)
+        self._schedule_expiry(expiration, "ip_ban", ip_host)
         self.invalidate_ip_ban(ip_host)
 
     def add_mute(self, xuid: str, expiration: int, reason: str, ip_mute: bool = False):
         self.update('mod_logs', {'is_muted': 1, 'mute_time': expiration, 'mute_reason': reason, 'is_ip_muted': ip_mute }, 'xuid = ?', (xuid,))
+        self._refresh_moderation("xuid", xuid)
+        self._schedule_expiry(expiration, "mute", xuid)
         self.insert('punishment_logs', {
             'xuid': xuid, 'name': self.get_name_by_xuid(xuid), 'action_type': 'Mute',
             'reason': reason, 'timestamp': int(time.time()), 'duration': expiration
         })
         self.invalidate_user_cache(xuid)
 
-    def remove_ban(self, name: str):
+    def remove_ban(self, name: str, reason: str = "Ban Removed"):
         xuid = self.get_xuid_by_name(name)
         self.update('mod_logs', {'is_banned': 0, 'banned_time': 0, 'ban_reason': "None", 'is_ip_banned': 0}, 'name = ?', (name,))
+        self._refresh_moderation("name", name)
         self.insert('punishment_logs', {
             'xuid': xuid, 'name': name, 'action_type': 'Unban',
-            'reason': 'Ban Removed', 'timestamp': int(time.time()), 'duration': 0
+            'reason': reason, 'timestamp': int(time.time()), 'duration': 0
         })
         self.invalidate_user_cache(xuid)
         self.invalidate_ip_ban_by_xuid(xuid)
 
-    def remove_ip_ban(self, ip: str):
-        def get_host(ip_address: str) -> str:
-            return ip_address.split(':')[0].strip()
-
-        ip_host = get_host(ip)
+    def remove_ip_ban(self, ip: str, reason: str = "IP Ban Removed"):
+        ip_host = get_ip_host(ip)
         now = int(time.time())
 
-        # Fetch all rows and filter by host
-        query = "SELECT xuid, name, ip_address FROM mod_logs"
-        rows = self.execute(query, (), readonly=True).fetchall()
+        rows = self.execute(
+            "SELECT xuid, name, ip_address FROM mod_logs WHERE ip_host = ?",
+            (ip_host,), readonly=True
+        ).fetchall()
         columns = ["xuid", "name", "ip_address"]
-        all_entries = [dict(zip(columns, row)) for row in rows]
-        matching_entries = [entry for entry in all_entries if get_host(entry["ip_address"]) == ip_host]
+        matching_entries = [dict(zip(columns, row)) for row in rows]
 
         if not matching_entries:
             return
 
-        # Update all matching rows by full IP+port
-        for entry in matching_entries:
-            self.execute(
-                """
-                UPDATE mod_logs
-                SET is_banned = 0,
-                    banned_time = 0,
-                    ban_reason = "None",
-                    is_ip_banned = 0
-                WHERE ip_address = ?
-                """,
-                (entry["ip_address"],)
-            )
+        # Update all rows sharing the host
+        self.execute(
+            """
+            UPDATE mod_logs
+            SET is_banned = 0,
+                banned_time = 0,
+                ban_reason = "None",
+                is_ip_banned = 0
+            WHERE ip_host = ?
+            """,
+            (ip_host,)
+        )
+        self._refresh_moderation("ip_host", ip_host)
 
+        for entry in matching_entries:
             # Insert punishment log
             self.execute(
                 """
@@ -1560,7 +2996,7 @@ class UserDB(DatabaseManager):
                     entry.get("xuid", None),
                     entry.get("name") if entry.get("name") else ip_host,
                     "Unban",
-                    "IP Ban Removed",
+                    reason,
                     now,
                     0
                 )
@@ -1570,36 +3006,32 @@ class UserDB(DatabaseManager):
         self.invalidate_ip_ban(ip_host)
 
     def check_ip_ban(self, ip: str) -> bool:
-        def get_host(ip_address: str) -> str:
-            return ip_address.split(':')[0].strip()
+        if self.moderation is not None:
+            return self.moderation.get_ip_ban(ip) is not None
 
-        ip_host = get_host(ip)
-
-        if not hasattr(self, "_ip_ban_cache"):
-            self._ip_ban_cache = {}
-        if not hasattr(self, "_ip_ban_index"):
-            self._ip_ban_index = {}
+        ip_host = get_ip_host(ip)
 
         # Check cache first
         cached = self._ip_ban_cache.get(ip_host)
         if cached is not None:
             return cached
 
-        # Fetch all rows and filter by host
-        query = "SELECT xuid, ip_address FROM mod_logs WHERE is_ip_banned = 1"
-        rows = self.execute(query, (), readonly=True).fetchall()
-        columns = ["xuid", "ip_address"]
-        matching_entries = [dict(zip(columns, row)) for row in rows if get_host(row[1]) == ip_host]
+        # The unary + keeps the planner on idx_mod_logs_ip_host (a handful of rows) rather than
+        # idx_mod_logs_is_ip_banned, which would walk every IP-banned row
+        row = self.execute(
+            "SELECT xuid FROM mod_logs WHERE ip_host = ? AND +is_ip_banned = 1 LIMIT 1",
+            (ip_host,), readonly=True
+        ).fetchone()
 
-        if matching_entries:
-            xuid = matching_entries[0]["xuid"]
+        if row:
+            xuid = row[0]
             result = True
         else:
             xuid = None
             result = False
 
         # Update cache
-        self._ip_ban_cache[ip_host] = result
+        self._ip_ban_cache.set(ip_host, result)
 
         # Update IP->XUID index
         if xuid:
@@ -1610,8 +3042,7 @@ class UserDB(DatabaseManager):
         return result
         
     def invalidate_ip_ban(self, ip: str):
-        if hasattr(self, "_ip_ban_cache"):
-            self._ip_ban_cache.pop(ip, None)
+        self._ip_ban_cache.pop(ip)
 
     def invalidate_ip_ban_by_xuid(self, xuid: str):
         ip_bases = self._ip_ban_index.pop(xuid, None)
@@ -1619,76 +3050,90 @@ class UserDB(DatabaseManager):
             return
 
         for ip_base in ip_bases:
-            self._ip_ban_cache.pop(ip_base, None)
+            self._ip_ban_cache.pop(ip_base)
 
     def check_ip_mute(self, ip: str) -> tuple[bool, Optional[int], Optional[str]]:
-        ip_base = ip.split(':')[0]
+        ip_base = get_ip_host(ip)
         now = time.time()
 
+        if self.moderation is not None:
+            mute = self.moderation.get_ip_mute(ip)
+            if mute is None:
+                return False, None, None
+            if mute.mute_time < now:
+                self._expire_ip_mute(mute.name, now)
+                return False, None, None
+            return True, mute.mute_time, mute.mute_reason
+
         cached = self._ip_mute_cache.get(ip_base)
         if cached:
-            (is_muted, mute_time, mute_reason), expiry = cached
-
-            if now < expiry:
-                if is_muted and mute_time is not None and mute_time < now:
-                    del self._ip_mute_cache[ip_base]
-                else:
-                    return is_muted, mute_time, mute_reason
+            is_muted, mute_time, mute_reason = cached
+            if is_muted and mute_time is not None and mute_time < now:
+                self._ip_mute_cache.pop(ip_base)
             else:
-                del self._ip_mute_cache[ip_base]
+                return is_muted, mute_time, mute_reason
 
         row = self.execute(
             "SELECT name, mute_time, mute_reason FROM mod_logs "
-            "WHERE ip_address LIKE ? AND is_ip_muted = 1 "
+            "WHERE ip_host = ? AND is_ip_muted = 1 "
             "ORDER BY mute_time DESC LIMIT 1",
-            (f"{ip_base}%",), readonly=True
+            (ip_base,), readonly=True
         ).fetchone()
 
         if row:
             name, mute_time, mute_reason = row
 
             if mute_time < now:
-                self._ip_mute_cache.pop(ip_base, None)
-
-                self.update(
-                    'mod_logs',
-                    {'is_muted': 0, 'mute_time': 0, 'mute_reason': "None", "is_ip_muted": 0},
-                    'name = ?',
-                    (name,)
-                )
-                self.insert(
-                    'punishment_logs',
-                    {
-                        'xuid': self.get_xuid_by_name(name),
-                        'name': name,
-                        'action_type': 'Unmute',
-                        'reason': 'Mute Expired',
-                        'timestamp': int(now),
-                        'duration': 0
-                    }
-                )
+                self._ip_mute_cache.pop(ip_base)
+                self._expire_ip_mute(name, now)
                 return False, None, None
 
             result = (True, mute_time, mute_reason)
 
-            self._ip_mute_cache[ip_base] = (result, now + self._cache_ttl)
+            self._ip_mute_cache.set(ip_base, result)
 
             return result
 
         result = (False, None, None)
-        self._ip_mute_cache[ip_base] = (result, now + self._cache_ttl)
+        self._ip_mute_cache.set(ip_base, result)
 
         return result
 
+    def _expire_ip_mute(self, name: str, now: float):
+        self.update(
+            'mod_logs',
+            {'is_muted': 0, 'mute_time': 0, 'mute_reason': "None", "is_ip_muted": 0},
+            'name = ?',
+            (name,)
+        )
+        self._refresh_moderation("name", name)
+        self.insert(
+            'punishment_logs',
+            {
+                'xuid': self.get_xuid_by_name(name),
+                'name': name,
+                'action_type': 'Unmute',
+                'reason': 'Mute Expired',
+                'timestamp': int(now),
+                'duration': 0
+            }
+        )
+
     def remove_mute(self, name: str):
         xuid = self.get_xuid_by_name(name)
         self.update('mod_logs', {'is_muted': 0, 'mute_time': 0, 'mute_reason': "None", "is_ip_muted": 0}, 'name = ?', (name,))
+        self._refresh_moderation("name", name)
         self.insert('punishment_logs', {
             'xuid': xuid, 'name': name, 'action_type': 'Unmute',
             'reason': 'Mute Expired', 'timestamp': int(time.time()), 'duration': 0
         })
         self.invalidate_user_cache(xuid)
 
+    PUNISHMENTS_PER_PAGE = 5
+
+    # Shown by /punishments; expired-mute bookkeeping rows are hidden
+    _HISTORY_FILTER = "name = ? AND NOT (action_type = 'Unmute' AND reason = 'Mute Expired')"
+
     def print_punishment_history(self, name: str, page: int = 1):
         """Prints punishment history for a named player"""
 
@@ -1707,70 +3152,101 @@ class UserDB(DatabaseManager):
             
         current_time = int(time.time())
 
-        punishment_query = """
-            SELECT action_type, reason, timestamp, duration
-            FROM punishment_logs
-            WHERE name = ?
-            AND NOT (action_type = 'Unmute' AND reason = 'Mute Expired')
-            ORDER BY timestamp DESC
-        """
-        all_logs = self.execute(punishment_query, (name,), readonly=True).fetchall()
-        if not all_logs:
-            return False
-
-        active_punishments = {}
-        past_punishments = []
-
-        for action_type, reason, timestamp, duration in all_logs:
-            formatted_time = TimezoneUtils.convert_to_timezone(timestamp, 'EST')
-
-            if action_type == "Ban" and is_banned and banned_time > current_time and "Ban" not in active_punishments:
+        # The newest Ban/Mute row is the active one while the punishment still runs
+        active_punishments = []
+        if is_banned and banned_time > current_time:
+            row = self._latest_punishment(name, "Ban")
+            if row:
                 ban_expires_in = format_time_remaining(banned_time)
                 ip_ban_status = "IP " if is_ip_banned else ""
-                active_punishments["Ban"] = (
-                    timestamp,
+                active_punishments.append((row[1], row[0],
                     f"{ColorFormat.RED}{ip_ban_status}Ban {ColorFormat.GRAY}- {ColorFormat.YELLOW}{ban_reason} "
                     f"{ColorFormat.GRAY}({ColorFormat.YELLOW}{ban_expires_in}{ColorFormat.GRAY})\n"
-                    f"{ColorFormat.ITALIC}Date Issued: {ColorFormat.GRAY}{formatted_time}{ColorFormat.RESET}"
-                )
-            elif action_type == "Mute" and is_muted and mute_time > current_time and "Mute" not in active_punishments:
+                    f"{ColorFormat.ITALIC}Date Issued: {ColorFormat.GRAY}{TimezoneUtils.convert_to_timezone(row[1], 'EST')}{ColorFormat.RESET}"
+                ))
+        if is_muted and mute_time > current_time:
+            row = self._latest_punishment(name, "Mute")
+            if row:
                 mute_expires_in = format_time_remaining(mute_time, True)
-                active_punishments["Mute"] = (
-                    timestamp,
+                active_punishments.append((row[1], row[0],
                     f"{ColorFormat.AQUA}Mute {ColorFormat.GRAY}- {ColorFormat.YELLOW}{mute_reason} "
                     f"{ColorFormat.GRAY}({ColorFormat.YELLOW}{mute_expires_in}{ColorFormat.GRAY})\n"
-                    f"{ColorFormat.ITALIC}Date Issued: {ColorFormat.GRAY}{formatted_time}{ColorFormat.RESET}"
-                )
-            
-            else:
-                past_punishments.append(
-                    f"{ColorFormat.BLUE}{action_type} {ColorFormat.GRAY}- {ColorFormat.YELLOW}{reason} "
-                    f"{ColorFormat.GRAY}({ColorFormat.YELLOW}EXPIRED{ColorFormat.GRAY})\n"
-                    f"{ColorFormat.ITALIC}Date Issued: {ColorFormat.GRAY}{formatted_time}{ColorFormat.RESET}"
-                )
+                    f"{ColorFormat.ITALIC}Date Issued: {ColorFormat.GRAY}{TimezoneUtils.convert_to_timezone(row[1], 'EST')}{ColorFormat.RESET}"
+                ))
+        active_punishments.sort(reverse=True)
 
-        per_page = 5
-        total_pages = (len(past_punishments) + per_page - 1) // per_page
-        start, end = (page - 1) * per_page, (page - 1) * per_page + per_page
-        paginated_past = past_punishments[start:end]
+        past_rows, has_more = self.get_punishment_page(name, page, [entry[1] for entry in active_punishments])
+        if not past_rows and not active_punishments and page == 1:
+            return False
 
         msg = [f""]
 
         if active_punishments:
             msg.append(f"{ColorFormat.GREEN}Active {ColorFormat.GOLD}Punishments for {ColorFormat.YELLOW}{name}{ColorFormat.GOLD}:")
-            for _, entry in active_punishments.values():
+            for _, _, entry in active_punishments:
                 msg.append(f"{ColorFormat.GRAY}- {entry}")
             msg.append(f"{ColorFormat.GOLD}---------------")
 
         msg.append(f"{ColorFormat.DARK_RED}Past {ColorFormat.GOLD}Punishments for {ColorFormat.YELLOW}{name}{ColorFormat.GOLD}:{ColorFormat.RESET}")
-        msg.extend(f"{ColorFormat.GRAY}- {entry}" for entry in paginated_past)
+        for _, action_type, reason, timestamp in past_rows:
+            msg.append(
+                f"{ColorFormat.GRAY}- {ColorFormat.BLUE}{action_type} {ColorFormat.GRAY}- {ColorFormat.YELLOW}{reason} "
+                f"{ColorFormat.GRAY}({ColorFormat.YELLOW}EXPIRED{ColorFormat.GRAY})\n"
+                f"{ColorFormat.ITALIC}Date Issued: {ColorFormat.GRAY}{TimezoneUtils.convert_to_timezone(timestamp, 'EST')}{ColorFormat.RESET}"
+            )
         msg.append(f"{ColorFormat.GOLD}---------------")
 
-        if page < total_pages:
+        if has_more:
             msg.append(f"{ColorFormat.DARK_GRAY}Use {ColorFormat.YELLOW}/punishments {name} {page + 1} {ColorFormat.DARK_GRAY}for more.")
 
         return "\n".join(msg)
 
+    def _latest_punishment(self, name: str, action_type: str) -> Optional[tuple]:
+        """(id, timestamp) of the newest punishment of one type."""
+        return self.execute(
+            f"SELECT id, timestamp FROM punishment_logs WHERE {self._HISTORY_FILTER} AND action_type = ? "
+            "ORDER BY timestamp DESC, id DESC LIMIT 1",
+            (name, action_type), readonly=True
+        ).fetchone()
+
+    def get_punishment_page(self, name: str, page: int, exclude_ids: list[int] = (),
+                            per_page: int = PUNISHMENTS_PER_PAGE) -> tuple[list[tuple], bool]:
+        """
+        One page of (id, action_type, reason, timestamp) rows, newest first, and whether more follow.
+
+        Pages continue from the (timestamp, id) where the previous page ended when that page was
+        shown recently, so walking forward never re-reads earlier rows; other pages fall back to OFFSET.
+        """
+        query = f"SELECT id, action_type, reason, timestamp FROM punishment_logs WHERE {self._HISTORY_FILTER}"
+        params: list = [name]
+        if exclude_ids:
+            query += f" AND id NOT IN ({', '.join('?' for _ in exclude_ids)})"
+            params.extend(exclude_ids)
+
+        offset = 0
+        after = self._punishment_cursors.get((name, page - 1)) if page > 1 else None
+        if after is not None:
+            query += " AND (timestamp, id) < (?, ?)"
+            params.extend(after)
+        else:
+            offset = (page - 1) * per_page
+
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params.extend((per_page + 1, offset))
+        rows = self.execute(query, tuple(params), readonly=True).fetchall()
+
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if rows:
+            self._punishment_cursors.set((name, page), (rows[-1][3], rows[-1][0]))
+        return rows, has_more
+
+    def has_punishment_history(self, name: str) -> bool:
+        """Whether /punishments has anything to show for a player."""
+        return self.execute(
+            f"SELECT 1 FROM punishment_logs WHERE {self._HISTORY_FILTER} LIMIT 1", (name,), readonly=True
+        ).fetchone() is not None
+
     def get_punishment_logs(self, name: str) -> Optional[List[PunishmentLog]]:
         rows = self.execute("SELECT * FROM punishment_logs WHERE name = ?", (name,), readonly=True).fetchall()
         return [PunishmentLog(*row) for row in rows] if rows else None
@@ -1784,22 +3260,17 @@ class UserDB(DatabaseManager):
         return cursor.rowcount > 0
 
     def get_offline_mod_log(self, name: str) -> Optional[ModLog]:
-        row = self.execute("SELECT * FROM mod_logs WHERE name = ?", (name,), readonly=True).fetchone()
+        mapper = self.row_mapper("mod_logs", ModLog)
+        row = self.execute(f"SELECT {mapper.columns} FROM mod_logs WHERE name = ?", (name,), readonly=True).fetchone()
         if not row:
             return None
 
-        column_info = self.execute("PRAGMA table_info(mod_logs)").fetchall()
-        column_names = [col[1] for col in column_info]
-        raw_data = dict(zip(column_names, row))
-
-        modlog_fields = {f.name for f in fields(ModLog)}
-        filtered = {k: v for k, v in raw_data.items() if k in modlog_fields}
-
-        return ModLog(**filtered)
+        return mapper.map(row)
 
     def get_xuid_by_name(self, player_name: str) -> str | None:
-        if player_name in self._name_to_xuid_cache:
-            return self._name_to_xuid_cache[player_name]
+        cached = self._name_to_xuid_cache.get(player_name)
+        if cached is not None:
+            return cached
 
         row = self.execute(
             "SELECT xuid FROM mod_logs WHERE name = ?",
@@ -1809,14 +3280,15 @@ class UserDB(DatabaseManager):
 
         if row:
             xuid = row[0]
-            self._name_to_xuid_cache[player_name] = xuid
-            self._xuid_to_name_cache[xuid] = player_name
+            self._name_to_xuid_cache.set(player_name, xuid)
+            self._xuid_to_name_cache.set(xuid, player_name)
             return xuid
         return None
 
     def get_name_by_xuid(self, xuid: str) -> str | None:
-        if xuid in self._xuid_to_name_cache:
-            return self._xuid_to_name_cache[xuid]
+        cached = self._xuid_to_name_cache.get(xuid)
+        if cached is not None:
+            return cached
 
         row = self.execute(
             "SELECT name FROM mod_logs WHERE xuid = ?",
@@ -1826,8 +3298,8 @@ class UserDB(DatabaseManager):
 
         if row:
             name = row[0]
-            self._xuid_to_name_cache[xuid] = name
-            self._name_to_xuid_cache[name] = xuid
+            self._xuid_to_name_cache.set(xuid, name)
+            self._name_to_xuid_cache.set(name, xuid)
             return name
         return None
 
@@ -1966,6 +3438,7 @@ class UserDB(DatabaseManager):
             (perms_json, xuid)
         )
         self.invalidate_user_cache(xuid)
+        self.publish_changes("user", [xuid])
 
     def get_permissions(self, xuid: str) -> dict:
         """Get all permissions for a player using execute."""
@@ -1990,26 +3463,71 @@ class UserDB(DatabaseManager):
             self.set_permissions(xuid, perms)
 
     def update_user_data(self, name: str, column: str, value):
-        self.invalidate_user_cache(self.get_xuid_by_name(name))
+        xuid = self.get_xuid_by_name(name)
+        self._discard_pending(xuid, column)
         if isinstance(value, Vector):
             x, y, z = value.x, value.y, value.z
             value = f"{x},{y},{z}"
         self.update('users', {column: value}, 'name = ?', (name,))
+        self.invalidate_user_cache(xuid)
+        if column == "internal_rank":
+            self.invalidate_player_counts()
+        self.publish_changes("user", [xuid])
 
     def update_mod_data(self, name: str, column: str, value):
-        self.invalidate_user_cache(self.get_xuid_by_name(name))
+        xuid = self.get_xuid_by_name(name)
+        self.invalidate_user_cache(xuid)
         if isinstance(value, Vector):
             x, y, z = value.x, value.y, value.z
             value = f"{x},{y},{z}"
-        self.update('mod_logs', {column: value}, 'name = ?', (name,))
+        updates = {column: value}
+        if column == "ip_address":
+            updates["ip_host"] = get_ip_host(value)
+            updates["ip_subnet"] = subnet_key(value)
+        self.update('mod_logs', updates, 'name = ?', (name,))
+        if column == "ip_address" and xuid:
+            self._index_subnet(xuid, updates["ip_subnet"])
+        self._refresh_moderation("name", name)
+
+def _valid_session(start_time, end_time, now: int) -> bool:
+    """Same sanity checks playtime has always applied to logged sessions."""
+    if not isinstance(start_time, (int, float)) or start_time <= 0 or start_time > now:
+        return False
+    return isinstance(end_time, (int, float)) and end_time > 0 and end_time >= start_time
+
+def _live_playtime(total: int, open_since, now: int) -> int:
+    """Closed-session total plus the running part of an open session."""
+    total = total or 0
+    if isinstance(open_since, (int, float)) and 0 < open_since <= now:
+        total += int(now - open_since)
+    return total
 
 class sessionDB(DatabaseManager):
     """Session tracking."""
 
+    INDEXES = {
+        'sessions_log': [('idx_sessions_log_xuid_end', 'xuid, end_time'), ('idx_sessions_log_end', 'end_time')],
+        'playtime_totals': [
+            ('idx_playtime_totals_total', 'total_playtime'),
+            ('idx_playtime_totals_recent', 'last_session_start'),
+            ('idx_playtime_totals_open', 'open_since')
+        ]
+    }
+
+    SECONDS_PER_DAY = 86400
+
+    MIGRATIONS = ("create_tables", "create_change_feed", "create_open_session_index")
+
+    PLAYTIME_ORDERS = {
+        "highest": "total_playtime DESC",
+        "lowest": "total_playtime ASC",
+        "recent": "last_session_start DESC"
+    }
+
     def __init__(self, db_name: str):
-        """Initialize the database connection and create tables."""
+        """Initialize the database connection and bring the schema up to date."""
         super().__init__(db_name)
-        self.create_tables()
+        self.migrate()
 
     def create_tables(self):
         """Create tables if they don't exist."""
@@ -2025,8 +3543,30 @@ class sessionDB(DatabaseManager):
             'xuid': 'TEXT',
             'name': 'TEXT'
         }
+        playtime_total_columns = {
+            'xuid': 'TEXT PRIMARY KEY',
+            'name': 'TEXT',
+            'total_playtime': 'INTEGER DEFAULT 0',
+            'last_session_start': 'INTEGER DEFAULT 0',
+            'open_since': 'INTEGER'
+        }
         self.create_table('sessions_log', session_log_columns)
         self.create_table('user_toggles', user_toggle_columns)
+        self.create_table('playtime_totals', playtime_total_columns)
+
+        session_rollup_columns = {
+            'xuid': 'TEXT',
+            'name': 'TEXT',
+            'day': 'INTEGER',
+            'total_seconds': 'INTEGER DEFAULT 0',
+            'session_count': 'INTEGER DEFAULT 0',
+            'first_seen': 'INTEGER',
+            'last_seen': 'INTEGER'
+        }
+        self.create_table('session_rollups', session_rollup_columns, unique=['xuid', 'day'])
+
+    def create_open_session_index(self):
+        self.ensure_indexes("playtime_totals")
 
     def fetch_all_as_dicts(self, query: str, params: tuple = ()) -> list[dict]:
         """Helper to run a query and return list of dicts keyed by column name."""
@@ -2058,14 +3598,108 @@ class sessionDB(DatabaseManager):
             'end_time': None
         }
         self.insert('sessions_log', data)
+        self.execute(
+            """
+            INSERT INTO playtime_totals (xuid, name, total_playtime, last_session_start, open_since)
+            VALUES (?, ?, 0, ?, ?)
+            ON CONFLICT(xuid) DO UPDATE SET
+                name = excluded.name,
+                last_session_start = excluded.last_session_start,
+                open_since = excluded.open_since
+            """,
+            (xuid, name, start_time, start_time)
+        )
 
     def end_session(self, xuid: str, end_time: int):
-        query = """
-            UPDATE sessions_log
-            SET end_time = ?
-            WHERE xuid = ? AND end_time IS NULL
+        """Closes any open sessions and adds their length to playtime_totals in the same transaction."""
+        with self._lock:
+            open_sessions = self.cursor.execute(
+                "SELECT name, start_time FROM sessions_log WHERE xuid = ? AND end_time IS NULL", (xuid,)
+            ).fetchall()
+            if not open_sessions:
+                return
+
+            self.cursor.execute(
+                "UPDATE sessions_log SET end_time = ? WHERE xuid = ? AND end_time IS NULL", (end_time, xuid)
+            )
+
+            now = int(time.time())
+            added = sum(
+                int(end_time - start_time) for _, start_time in open_sessions
+                if _valid_session(start_time, end_time, now)
+            )
+            name, last_start = max(open_sessions, key=lambda s: s[1] or 0)
+            self.cursor.execute(
+                """
+                INSERT INTO playtime_totals (xuid, name, total_playtime, last_session_start, open_since)
+                VALUES (?, ?, ?, ?, NULL)
+                ON CONFLICT(xuid) DO UPDATE SET
+                    total_playtime = total_playtime + excluded.total_playtime,
+                    last_session_start = MAX(last_session_start, excluded.last_session_start),
+                    open_since = NULL
+                """,
+                (xuid, name, added, last_start or 0)
+            )
+            self.conn.commit()
+
+    def repair_playtime_totals(self, xuids: list[str] = None) -> int:
         """
-        self.execute(query, (end_time, xuid))
+        Recomputes playtime_totals rows from sessions_log for the given players, or for
+        every player that has sessions but no totals row (first run after upgrading).
+        """
+        if xuids is None:
+            xuids = [row[0] for row in self.execute(
+                """
+                SELECT DISTINCT s.xuid FROM sessions_log s
+                WHERE NOT EXISTS (SELECT 1 FROM playtime_totals t WHERE t.xuid = s.xuid)
+                """, readonly=True
+            ).fetchall()]
+        if not xuids:
+            return 0
+
+        now = int(time.time())
+        for i in range(0, len(xuids), 500):
+            chunk = xuids[i:i + 500]
+            marks = ', '.join('?' for _ in chunk)
+            self.execute(
+                f"""
+                INSERT OR REPLACE INTO playtime_totals (xuid, name, total_playtime, last_session_start, open_since)
+                SELECT xuid,
+                    COALESCE(
+                        (SELECT name FROM sessions_log latest WHERE latest.xuid = merged.xuid
+                            ORDER BY start_time DESC LIMIT 1),
+                        (SELECT name FROM session_rollups latest WHERE latest.xuid = merged.xuid
+                            ORDER BY day DESC LIMIT 1)
+                    ),
+                    SUM(seconds), MAX(last_start), MAX(open_since)
+                FROM (
+                    SELECT xuid,
+                        CASE WHEN start_time > 0 AND start_time <= ? AND end_time > 0 AND end_time >= start_time
+                            THEN end_time - start_time ELSE 0 END AS seconds,
+                        start_time AS last_start,
+                        CASE WHEN end_time IS NULL THEN start_time END AS open_since
+                    FROM sessions_log WHERE xuid IN ({marks})
+                    UNION ALL
+                    SELECT xuid, total_seconds, first_seen, NULL
+                    FROM session_rollups WHERE xuid IN ({marks})
+                ) AS merged
+                GROUP BY xuid
+                """,
+                (now, *chunk, *chunk)
+            )
+        return len(xuids)
+
+    def start_session_async(self, xuid: str, name: str, start_time: int) -> Future:
+        return self.submit(self.start_session, xuid, name, start_time)
+
+    def end_session_async(self, xuid: str, end_time: int) -> Future:
+        return self.submit(self.end_session, xuid, end_time)
+
+    def get_total_playtime_async(self, xuid: str, callback: Callable[[int], None] = None) -> Future:
+        return self.submit(self.get_total_playtime, xuid, callback=callback)
+
+    def compact_sessions_async(self, older_than_days: int, batch_size: int = 200) -> Future:
+        return self.submit(self.compact_sessions, older_than_days, batch_size)
 
     def get_current_session(self, xuid: str):
         query = "SELECT * FROM sessions_log WHERE xuid = ? AND end_time IS NULL ORDER BY start_time DESC LIMIT 1"
@@ -2073,7 +3707,78 @@ class sessionDB(DatabaseManager):
         result = cursor.fetchone()
         return result or None
 
+    def compact_sessions(self, older_than_days: int, batch_size: int = 200) -> int:
+        """
+        Rolls closed sessions that ended before the retention horizon into per-player daily
+        buckets and deletes the raw rows. Handles at most batch_size sessions per call so it can
+        run between ticks; returns how many sessions were compacted.
+        """
+        horizon = int(time.time()) - max(0, int(older_than_days)) * self.SECONDS_PER_DAY
+        query = """
+            SELECT id, xuid, name, start_time, end_time FROM sessions_log
+            WHERE end_time IS NOT NULL AND end_time < ?
+            ORDER BY end_time LIMIT ?
+        """
+        self._record_query(query)
+
+        with self._lock:
+            sessions = self.cursor.execute(query, (horizon, batch_size)).fetchall()
+            if not sessions:
+                return 0
+
+            buckets = {}
+            now = int(time.time())
+            for _, xuid, name, start_time, end_time in sessions:
+                valid = _valid_session(start_time, end_time, now)
+                seen = start_time if isinstance(start_time, (int, float)) and start_time > 0 else end_time
+                day = int(seen // self.SECONDS_PER_DAY) * self.SECONDS_PER_DAY
+                bucket = buckets.setdefault((xuid, day), {
+                    'name': name, 'total_seconds': 0, 'session_count': 0, 'first_seen': seen, 'last_seen': end_time
+                })
+                bucket['total_seconds'] += int(end_time - start_time) if valid else 0
+                bucket['session_count'] += 1
+                bucket['first_seen'] = min(bucket['first_seen'], seen)
+                bucket['last_seen'] = max(bucket['last_seen'], end_time)
+
+            self.cursor.executemany(
+                """
+                INSERT INTO session_rollups (xuid, name, day, total_seconds, session_count, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(xuid, day) DO UPDATE SET
+                    total_seconds = total_seconds + excluded.total_seconds,
+                    session_count = session_count + excluded.session_count,
+                    first_seen = MIN(first_seen, excluded.first_seen),
+                    last_seen = MAX(last_seen, excluded.last_seen)
+                """,
+                [
+                    (xuid, b['name'], day, b['total_seconds'], b['session_count'], b['first_seen'], b['last_seen'])
+                    for (xuid, day), b in buckets.items()
+                ]
+            )
+            self.cursor.executemany("DELETE FROM sessions_log WHERE id = ?", [(row[0],) for row in sessions])
+            self.conn.commit()
+
+        return len(sessions)
+
+    def get_session_rollups(self, xuid: str) -> list[dict]:
+        """Daily buckets of compacted sessions, shaped like get_user_sessions entries."""
+        rows = self.execute(
+            "SELECT day, total_seconds, session_count, first_seen, last_seen FROM session_rollups WHERE xuid = ?",
+            (xuid,), readonly=True
+        ).fetchall()
+        return [
+            {
+                'start_time': first_seen,
+                'end_time': last_seen,
+                'duration': total_seconds,
+                'day': day,
+                'session_count': session_count
+            }
+            for day, total_seconds, session_count, first_seen, last_seen in rows
+        ]
+
     def get_user_sessions(self, xuid: str) -> list[dict]:
+        """Raw recent sessions followed by the daily rollups of compacted ones."""
         query = "SELECT start_time, end_time FROM sessions_log WHERE xuid = ?"
         cursor = self.execute(query, (xuid,), readonly=True)
         sessions = cursor.fetchall()
@@ -2092,40 +3797,105 @@ class sessionDB(DatabaseManager):
                 'end_time': end_time_display,
                 'duration': duration
             })
+        result.extend(self.get_session_rollups(xuid))
         return result
 
     def get_total_playtime(self, xuid: str) -> int:
-        query = "SELECT start_time, end_time FROM sessions_log WHERE xuid = ?"
-        cursor = self.execute(query, (xuid,), readonly=True)
-        sessions = cursor.fetchall()
+        row = self.execute(
+            "SELECT total_playtime, open_since FROM playtime_totals WHERE xuid = ?", (xuid,), readonly=True
+        ).fetchone()
+        if not row:
+            return 0
+        return _live_playtime(row[0], row[1], int(time.time()))
 
-        total_time = 0
+    def _open_playtimes(self, now: int) -> list[tuple]:
+        """(xuid, name, closed total, live total, last session start) for every player with a session open."""
+        rows = self.execute(
+            """
+            SELECT xuid, name, total_playtime, last_session_start, open_since
+            FROM playtime_totals WHERE open_since > 0
+            """,
+            readonly=True
+        ).fetchall()
+        return [
+            (xuid, name, total or 0, _live_playtime(total, open_since, now), last_start)
+            for xuid, name, total, last_start, open_since in rows
+        ]
+
+    def get_playtime_page(self, order: str = "highest", limit: int = 10, offset: int = 0) -> list[dict]:
+        """
+        One page of the playtime leaderboard, ranked on the total it shows: closed sessions plus
+        the running part of an open one (or most recent session for "recent"). Players without an
+        open session come off the total_playtime index; the few online ones are merged in.
+        """
+        order_by = self.PLAYTIME_ORDERS.get(order, self.PLAYTIME_ORDERS["highest"])
         now = int(time.time())
 
-        for start_time, end_time in sessions:
-            if not isinstance(start_time, (int, float)) or start_time <= 0 or start_time > now:
-                continue 
+        if order == "recent":
+            rows = self.execute(
+                f"""
+                SELECT xuid, name, total_playtime, last_session_start, open_since
+                FROM playtime_totals ORDER BY {order_by} LIMIT ? OFFSET ?
+                """,
+                (limit, offset), readonly=True
+            ).fetchall()
+            entries = [
+                (xuid, name, _live_playtime(total, open_since, now), last_start)
+                for xuid, name, total, last_start, open_since in rows
+            ]
+        else:
+            closed = self.execute(
+                f"""
+                SELECT xuid, name, total_playtime, last_session_start
+                FROM playtime_totals
+                WHERE open_since IS NULL OR open_since <= 0
+                ORDER BY {order_by} LIMIT ?
+                """,
+                (offset + limit,), readonly=True
+            ).fetchall()
+            live = [(xuid, name, total, last_start) for xuid, name, _, total, last_start in self._open_playtimes(now)]
+            entries = sorted(
+                [(xuid, name, total or 0, last_start) for xuid, name, total, last_start in closed] + live,
+                key=lambda entry: entry[2], reverse=order_by.endswith("DESC")
+            )[offset:offset + limit]
+
+        return [
+            {
+                'xuid': xuid,
+                'name': name,
+                'total_playtime': total,
+                'recent_session_start': last_start
+            }
+            for xuid, name, total, last_start in entries
+        ]
 
-            if end_time:
-                if not isinstance(end_time, (int, float)) or end_time <= 0 or end_time < start_time:
-                    continue
-                total_time += int(end_time - start_time)
-            else:
-                total_time += int(now - start_time)
+    def count_playtimes(self) -> int:
+        return self.execute("SELECT COUNT(*) FROM playtime_totals", readonly=True).fetchone()[0]
 
-        return total_time
+    def get_playtime_rank(self, xuid: str) -> Optional[int]:
+        """1-based leaderboard position of a player by live total, or None if they have no sessions."""
+        row = self.execute(
+            "SELECT total_playtime, open_since FROM playtime_totals WHERE xuid = ?", (xuid,), readonly=True
+        ).fetchone()
+        if not row:
+            return None
 
-    def get_all_playtimes(self) -> list[dict]:
-        query = "SELECT DISTINCT xuid, name FROM sessions_log"
-        cursor = self.execute(query, readonly=True)  # readonly for faster non-blocking SELECT
-        users = cursor.fetchall()
+        now = int(time.time())
+        total = _live_playtime(row[0], row[1], now)
+        ahead = self.execute(
+            "SELECT COUNT(*) FROM playtime_totals WHERE total_playtime > ?", (total,), readonly=True
+        ).fetchone()[0]
+        # The index count ranks open sessions on their closed total; swap in their live one
+        for _, _, closed_total, live_total, _ in self._open_playtimes(now):
+            ahead += (live_total > total) - (closed_total > total)
+        return ahead + 1
 
-        result = []
-        for xuid, name in users:
-            total_playtime = self.get_total_playtime(xuid)
-            result.append({
-                'xuid': xuid,
-                'name': name,
-                'total_playtime': total_playtime
-            })
-        return result
\ No newline at end of file
+    def get_all_playtimes(self) -> list[dict]:
+        rows = self.execute(
+            "SELECT xuid, name, total_playtime, open_since FROM playtime_totals", readonly=True
+        ).fetchall()
+        now = int(time.time())
+        return [
+            {'xuid': xuid, 'name': name, 'total_playtime': _live_playtime(total, open_since, now)}
+            for xuid, name, total, open_since in rows
+        ]
\ No newline at end of file
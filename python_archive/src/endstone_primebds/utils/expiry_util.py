@@ -0,0 +1,131 @@
+import heapq
+import time
+from typing import TYPE_CHECKING, Hashable, Optional
+
+if TYPE_CHECKING:
+    from endstone_primebds.primebds import PrimeBDS
+    from endstone_primebds.utils.db_util import UserDB
+
+class ExpiryScheduler:
+    """
+    Min-heap of (expires_at, kind, key) for every timed punishment and alt link.
+
+    One scheduler task calls tick(), which pops whatever is due and fires the matching
+    expire action (unmute, unban, IP unban, alt link purge) with its punishment log entry.
+    Entries are re-checked against the database before acting, so lifted or extended
+    punishments left behind in the heap are simply skipped. Warnings need no action:
+    every warn_logs read already filters on warn_time.
+    """
+
+    KINDS = ("mute", "ban", "ip_ban", "alt")
+
+    def __init__(self, db: "UserDB"):
+        self.db = db
+        self._heap: list[tuple[int, str, Hashable]] = []
+        self._task_id: Optional[int] = None
+        self._next_alt: Optional[int] = None
+        self.stats = {kind: 0 for kind in self.KINDS}
+
+    def load(self):
+        """Fill the heap from mod_logs and alt_logs and attach to the database."""
+        self._heap.clear()
+        self._next_alt = None
+        rows = self.db.execute(
+            """
+            SELECT xuid, ip_host, is_banned, banned_time, is_ip_banned, is_muted, mute_time
+            FROM mod_logs
+            WHERE (is_banned = 1 AND banned_time > 0) OR (is_muted = 1 AND mute_time > 0)
+            """,
+            readonly=True
+        ).fetchall()
+        for xuid, ip_host, is_banned, banned_time, is_ip_banned, is_muted, mute_time in rows:
+            if is_banned and banned_time:
+                if is_ip_banned and ip_host:
+                    self._heap.append((banned_time, "ip_ban", ip_host))
+                elif xuid:
+                    self._heap.append((banned_time, "ban", xuid))
+            if is_muted and mute_time and xuid:
+                self._heap.append((mute_time, "mute", xuid))
+
+        heapq.heapify(self._heap)
+        self._schedule_next_alt()
+        self.db.expiry = self
+
+    def schedule(self, expires_at: int, kind: str, key: Hashable = None):
+        if not expires_at or expires_at <= 0:
+            return
+        if kind == "alt":
+            # Links are purged in one pass, so only the earliest one needs an entry
+            if self._next_alt is not None and self._next_alt <= expires_at:
+                return
+            self._next_alt = int(expires_at)
+        heapq.heappush(self._heap, (int(expires_at), kind, key))
+
+    def start(self, plugin: "PrimeBDS", period_ticks: int = 20):
+        self._task_id = plugin.server.scheduler.run_task(plugin, self.tick, period_ticks, period_ticks).task_id
+
+    def stop(self, plugin: "PrimeBDS"):
+        if self._task_id is not None:
+            plugin.server.scheduler.cancel_task(self._task_id)
+            self._task_id = None
+
+    def next_due(self) -> Optional[int]:
+        return self._heap[0][0] if self._heap else None
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def tick(self, now: Optional[int] = None) -> int:
+        """Fire every entry that is due; cheap when nothing is."""
+        now = int(time.time()) if now is None else now
+        fired = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, kind, key = heapq.heappop(self._heap)
+            if kind == "alt":
+                if expires_at == self._next_alt:
+                    fired += self._expire_alts(now)
+                continue
+            if self._expire(kind, key, now):
+                self.stats[kind] += 1
+                fired += 1
+        return fired
+
+    def _expire(self, kind: str, key: Hashable, now: int) -> bool:
+        if kind == "ip_ban":
+            row = self.db.execute(
+                "SELECT MAX(banned_time) FROM mod_logs WHERE ip_host = ? AND is_ip_banned = 1",
+                (key,), readonly=True
+            ).fetchone()
+            if not row or row[0] is None or row[0] > now:
+                return False
+            self.db.remove_ip_ban(key, reason="IP Ban Expired")
+            return True
+
+        row = self.db.execute(
+            "SELECT name, is_banned, banned_time, is_muted, mute_time FROM mod_logs WHERE xuid = ?",
+            (key,), readonly=True
+        ).fetchone()
+        if not row:
+            return False
+        name, is_banned, banned_time, is_muted, mute_time = row
+
+        if kind == "ban" and is_banned and 0 < banned_time <= now:
+            self.db.remove_ban(name, reason="Ban Expired")
+            return True
+        if kind == "mute" and is_muted and 0 < mute_time <= now:
+            self.db.remove_mute(name)
+            return True
+        return False
+
+    def _expire_alts(self, now: int) -> int:
+        # alt_logs rows expire strictly before the cutoff, so include this second
+        expired = self.db.alt_clusters.expire(now + 1)
+        self.stats["alt"] += expired
+        self._next_alt = None
+        self._schedule_next_alt()
+        return expired
+
+    def _schedule_next_alt(self):
+        next_alt = self.db.execute("SELECT MIN(expiry) FROM alt_logs", readonly=True).fetchone()
+        if next_alt and next_alt[0]:
+            self.schedule(next_alt[0], "alt")
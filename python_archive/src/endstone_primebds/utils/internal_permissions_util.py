@@ -1,6 +1,5 @@
-import time
-
 from endstone import Player
+from endstone_primebds.utils.cache_util import TTLCache
 from endstone_primebds.utils.config_util import load_permissions, load_config
 
 from typing import TYPE_CHECKING
@@ -333,9 +332,12 @@ def get_rank_permissions(rank: str) -> dict[str, bool]:
     gather_permissions(base_rank)
     return result
 
-perm_cache = {}
+_db_config = load_config().get("modules", {}).get("database", {})
+perm_cache = TTLCache(
+    "permissions", _db_config.get("cache_max_entries", 1024), _db_config.get("cache_ttl_seconds", 60)
+)
+
 def check_perms(self: "PrimeBDS", player_or_user, perm: str, check_rank=False) -> bool:
-    now = time.time()
     xuid = getattr(player_or_user, "xuid", None)
 
     if hasattr(player_or_user, "has_permission") and not check_rank:
@@ -345,9 +347,8 @@ def check_perms(self: "PrimeBDS", player_or_user, perm: str, check_rank=False) -
     if xuid is None:
         return False
 
-    cached = perm_cache.get(xuid)
-    if cached:
-        perms, ts = cached
+    perms = perm_cache.get(xuid)
+    if perms is not None:
         result = perms.get(perm, False)
         return result
 
@@ -363,15 +364,17 @@ def check_perms(self: "PrimeBDS", player_or_user, perm: str, check_rank=False) -
     for perm_name, allowed in user_permissions.items():
         final_perms[perm_name.lower()] = bool(allowed)
 
-    perm_cache[xuid] = (final_perms, now)
+    perm_cache.set(xuid, final_perms)
     result = final_perms.get(perm.lower(), False)
     return result
 
 def invalidate_perm_cache(xuid: str):
-    perm_cache.pop(xuid, None)
+    perm_cache.pop(xuid)
 
 _prefix_cache = {}
 _suffix_cache = {}
+# Bumped whenever the prefix/suffix caches are cleared, so copies held elsewhere can tell they are out of date
+_prefix_generation = 0
 def get_prefix(rank: str, permissions=None) -> str:
     """
     Returns the prefix for a given rank, using cache if available.
@@ -406,9 +409,13 @@ def clear_prefix_suffix_cache():
     """
     Clears the prefix/suffix caches (useful if permissions are reloaded).
     """
-    global _prefix_cache, _suffix_cache
+    global _prefix_cache, _suffix_cache, _prefix_generation
     _prefix_cache.clear()
     _suffix_cache.clear()
+    _prefix_generation += 1
+
+def prefix_generation() -> int:
+    return _prefix_generation
             
 def check_internal_rank(user1_rank: str, user2_rank: str) -> bool:
     if user1_rank not in RANKS or user2_rank not in RANKS:
@@ -0,0 +1,74 @@
+import json
+import struct
+from typing import Optional, Tuple
+
+from endstone.level import Location
+
+# Packed location: dimension id, x, y, z as doubles, pitch and yaw as floats (33 bytes).
+# Dimensions outside DIMENSIONS use CUSTOM_DIMENSION and append their UTF-8 name.
+_PACKED = struct.Struct("<Bdddff")
+
+DIMENSIONS = ("Overworld", "Nether", "TheEnd")
+CUSTOM_DIMENSION = 0xFF
+_DIMENSION_IDS = {name: index for index, name in enumerate(DIMENSIONS)}
+
+def pack_location(x: float, y: float, z: float, dimension: str, pitch: float = 0.0, yaw: float = 0.0) -> bytes:
+    dimension_id = _DIMENSION_IDS.get(dimension, CUSTOM_DIMENSION)
+    packed = _PACKED.pack(dimension_id, x, y, z, pitch, yaw)
+    if dimension_id == CUSTOM_DIMENSION:
+        packed += dimension.encode("utf-8")
+    return packed
+
+def encode_location(loc: Location) -> bytes:
+    return pack_location(loc.x, loc.y, loc.z, loc.dimension.name, loc.pitch, loc.yaw)
+
+def unpack_location(data) -> Optional[Tuple[float, float, float, str, float, float]]:
+    """
+    Returns (x, y, z, dimension name, pitch, yaw), or None if data holds no position.
+    Text from before packed locations (JSON, or "x,y,z[,dimension]") is still understood.
+    """
+    if not data:
+        return None
+
+    if isinstance(data, (bytes, memoryview)):
+        data = bytes(data)
+        if len(data) < _PACKED.size:
+            return None
+        dimension_id, x, y, z, pitch, yaw = _PACKED.unpack_from(data)
+        if dimension_id == CUSTOM_DIMENSION:
+            dimension = data[_PACKED.size:].decode("utf-8")
+        elif dimension_id < len(DIMENSIONS):
+            dimension = DIMENSIONS[dimension_id]
+        else:
+            return None
+        return x, y, z, dimension, pitch, yaw
+
+    return _parse_legacy(data)
+
+def _parse_legacy(text: str) -> Optional[Tuple[float, float, float, str, float, float]]:
+    try:
+        if text.lstrip().startswith("{"):
+            data = json.loads(text)
+            return (
+                float(data['x']), float(data['y']), float(data['z']), data.get('dimension') or "Overworld",
+                float(data.get('pitch') or 0), float(data.get('yaw') or 0)
+            )
+        parts = text.split(",")
+        dimension = parts[3].strip() if len(parts) > 3 else "Overworld"
+        return float(parts[0]), float(parts[1]), float(parts[2]), dimension, 0.0, 0.0
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return None
+
+def decode_location(data, server) -> Optional[Location]:
+    unpacked = unpack_location(data)
+    if unpacked is None:
+        return None
+    x, y, z, dimension, pitch, yaw = unpacked
+    return Location(
+        x=x,
+        y=y,
+        z=z,
+        dimension=server.level.get_dimension(dimension),
+        pitch=pitch,
+        yaw=yaw
+    )
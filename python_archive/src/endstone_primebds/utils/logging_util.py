@@ -1,6 +1,6 @@
-import time
+import queue
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 import requests
 import re
 
@@ -11,37 +11,20 @@ if TYPE_CHECKING:
 
 import threading
 
-TOGGLE_PERMISSIONS = {
-    "enabled_ms": "primebds.command.modspy",
-    "enabled_as": "primebds.command.altspy",
-}
-
 def log(self: "PrimeBDS", message, type, toggles=None):
     if toggles is None:
         toggles = ["enabled_ms"]
 
     # Discord relay
-    threading.Thread(target=discordRelay, args=(message, type)).start()
-
-    players_to_notify = []
-    
-    for player in self.server.online_players:
-        user = self.db.get_online_user(player.xuid)
+    discordRelay(message, type)
 
-        for toggle in toggles:
-            perm = TOGGLE_PERMISSIONS.get(toggle)
-            if perm and player.has_permission(perm):
-                if getattr(user, toggle, 0): 
-                    players_to_notify.append(player)
-                    break 
-
-    for player in players_to_notify:
+    for player in self.subscriptions.members(*toggles):
         player.send_message(message)
 
     return False
 
 def discordRelay(message, type):
-    """Send message to Discord asynchronously without blocking."""
+    """Queue a message for its Discord webhook; never blocks the caller."""
     message = re.sub(r'§.', '', message)  # Clean up formatting
 
     config = load_config()
@@ -51,28 +34,14 @@ def discordRelay(message, type):
     if not webhook_url:
         return False  # No valid webhook found or enabled
 
-    # Prepare the payload for Discord
+    embed = None
     if discord_logging["embed_for_log"]["enabled"]:
-        payload = {
-            "embeds": [
-                {
-                    "title": discord_logging["embed_for_log"]["title"],
-                    "description": message,
-                    "color": discord_logging["embed_for_log"]["color"],
-                    "footer": {
-                        "text": f"Logged at {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}"
-                    }
-                }
-            ]
-        }
-    else:
-        payload = {
-            "content": f"{message}"
-        }
+        embed = (discord_logging["embed_for_log"]["title"], discord_logging["embed_for_log"]["color"])
 
-    # Send Discord message asynchronously
-    threading.Thread(target=send_discord_message, args=(webhook_url, payload)).start()
-    return True
+    dispatcher = get_dispatcher(webhook_url, discord_logging.get("queue_size", 500))
+    if dispatcher is None:
+        return False  # Shutting down
+    return dispatcher.submit(message, embed)
 
 def get_webhook_url(type, discord_logging):
     """Helper function to get the appropriate webhook URL based on the message type."""
@@ -87,27 +56,204 @@ def get_webhook_url(type, discord_logging):
     return None
 
 MAX_RETRIES = 15  # Max retries in case of rate limits
-INITIAL_BACKOFF = 1  # Start with 1 second
-def send_discord_message(webhook_url, payload):
-    """Send HTTP request to Discord webhook with exponential backoff."""
-    retries = 0
-    backoff = INITIAL_BACKOFF 
-
-    while retries < MAX_RETRIES:
-        response = None
+INITIAL_BACKOFF = 1  # Start with 1 second, used when Discord gives no Retry-After
+MAX_BACKOFF = 60
+MAX_CONTENT_LENGTH = 2000  # Discord limit for message content
+MAX_DESCRIPTION_LENGTH = 4096  # Discord limit for an embed description
+
+class WebhookDispatcher:
+    """
+    Sends messages to one Discord webhook from a single worker thread.
+
+    Messages wait in a bounded queue; when it is full new ones are dropped and counted
+    rather than blocking the server. Whatever queued up while the previous request was
+    in flight is coalesced into one multi-line post (or embed) within Discord's size
+    limits. Requests share a keep-alive session, and rate limits are waited out for as
+    long as Discord's Retry-After asks.
+    """
+
+    def __init__(self, webhook_url: str, queue_size: int = 500):
+        self.webhook_url = webhook_url
+        self._queue: "queue.Queue[tuple[str, Optional[tuple]]]" = queue.Queue(max(1, int(queue_size)))
+        self._carry: Optional[tuple[str, Optional[tuple]]] = None
+        self._session = requests.Session()
+        self._stopping = threading.Event()
+        self.stats = {
+            "queued": 0, "dropped": 0, "posts": 0, "sent": 0, "coalesced": 0,
+            "rate_limited": 0, "failed": 0, "peak_queue": 0
+        }
+        self._thread = threading.Thread(target=self._run, name="PrimeBDSWebhook", daemon=True)
+        self._thread.start()
+
+    def submit(self, message: str, embed: Optional[tuple] = None) -> bool:
+        if self._stopping.is_set():
+            return False
         try:
-            response = requests.post(webhook_url, json=payload, timeout=10)
-            response.raise_for_status()
-            return True
-        except requests.exceptions.RequestException as e:
-            if response is not None and response.status_code == 429:
-                retries += 1
-                wait_time = backoff * (2 ** retries)
-                print(f"[primebds - Discord Log] Rate limit exceeded. Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-            else:
+            self._queue.put_nowait((message, embed))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["queued"] += 1
+        self.stats["peak_queue"] = max(self.stats["peak_queue"], self._queue.qsize())
+        return True
+
+    def pending(self) -> int:
+        return self._queue.qsize() + (1 if self._carry else 0)
+
+    def close(self, timeout: float = 2.0):
+        """
+        Stop taking messages and wait up to timeout seconds for the queue to be sent.
+        The worker closes the session itself once it is done, so an in-flight post is never cut off.
+        """
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                batch, embed = self._next_batch()
+                if batch is None:
+                    if self._stopping.is_set():
+                        return
+                    continue
+                self._send(batch, embed)
+        finally:
+            self._session.close()
+
+    def _next_batch(self) -> tuple[Optional[list[str]], Optional[tuple]]:
+        """Take the next message plus every queued one that can share its post."""
+        first = self._carry
+        self._carry = None
+        if first is None:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                return None, None
+
+        message, embed = first
+        limit = MAX_DESCRIPTION_LENGTH if embed else MAX_CONTENT_LENGTH
+        batch = [message[:limit]]
+        length = len(batch[0])
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[1] != embed or length + 1 + len(item[0]) > limit:
+                self._carry = item
+                break
+            batch.append(item[0])
+            length += 1 + len(item[0])
+        return batch, embed
+
+    def _payload(self, batch: list[str], embed: Optional[tuple]) -> dict:
+        text = "\n".join(batch)
+        if embed is None:
+            return {"content": text}
+
+        title, color = embed
+        return {
+            "embeds": [
+                {
+                    "title": title,
+                    "description": text,
+                    "color": color,
+                    "footer": {
+                        "text": f"Logged at {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}"
+                    }
+                }
+            ]
+        }
+
+    def _send(self, batch: list[str], embed: Optional[tuple]) -> bool:
+        payload = self._payload(batch, embed)
+        retries = 0
+        while retries < MAX_RETRIES:
+            try:
+                response = self._session.post(self.webhook_url, json=payload, timeout=10)
+            except requests.exceptions.RequestException as e:
                 print(f"Failed to send Discord message: {e}")
-                return False
+                break
 
-    print("Max retries reached. Failed to send message.")
-    return False
+            if response.status_code == 429:
+                retries += 1
+                self.stats["rate_limited"] += 1
+                wait_time = _retry_after(response, INITIAL_BACKOFF * (2 ** retries))
+                print(f"[primebds - Discord Log] Rate limit exceeded. Retrying in {wait_time:.2f}s...")
+                if self._stopping.wait(wait_time):
+                    break
+                continue
+
+            if response.status_code >= 400:
+                print(f"Failed to send Discord message: HTTP {response.status_code}")
+                break
+
+            self.stats["posts"] += 1
+            self.stats["sent"] += len(batch)
+            self.stats["coalesced"] += len(batch) - 1
+
+            # Out of requests for this bucket: wait for it to reset instead of earning a 429
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                self._stopping.wait(_float_header(response, "X-RateLimit-Reset-After"))
+            return True
+        else:
+            print("Max retries reached. Failed to send message.")
+
+        self.stats["failed"] += len(batch)
+        return False
+
+def _float_header(response, name: str, default: float = 0.0) -> float:
+    try:
+        return max(0.0, float(response.headers.get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+def _retry_after(response, fallback: float) -> float:
+    """Seconds to wait after a 429, from the JSON body or the Retry-After header."""
+    try:
+        return max(0.0, float(response.json()["retry_after"]))
+    except (ValueError, KeyError, TypeError):
+        pass
+    return _float_header(response, "Retry-After", min(fallback, MAX_BACKOFF))
+
+_dispatchers: dict[str, WebhookDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+# Cleared by shutdown_webhooks() so nothing logged during shutdown starts a worker that is never closed
+_dispatchers_open = True
+
+def get_dispatcher(webhook_url: str, queue_size: int = 500) -> Optional[WebhookDispatcher]:
+    """The webhook's dispatcher, started on first use; None once shutdown_webhooks() has run."""
+    dispatcher = _dispatchers.get(webhook_url)
+    if dispatcher is None:
+        with _dispatchers_lock:
+            if not _dispatchers_open:
+                return None
+            dispatcher = _dispatchers.get(webhook_url)
+            if dispatcher is None:
+                dispatcher = _dispatchers[webhook_url] = WebhookDispatcher(webhook_url, queue_size)
+    return dispatcher
+
+def open_webhooks():
+    """Allow dispatchers to be started again, for a plugin enabled after shutdown_webhooks()."""
+    global _dispatchers_open
+    with _dispatchers_lock:
+        _dispatchers_open = True
+
+def webhook_stats() -> dict:
+    """Totals over every webhook dispatcher, plus how many messages are still queued."""
+    totals = {"webhooks": len(_dispatchers), "pending": 0}
+    for dispatcher in list(_dispatchers.values()):
+        totals["pending"] += dispatcher.pending()
+        for key, value in dispatcher.stats.items():
+            totals[key] = max(totals.get(key, 0), value) if key == "peak_queue" else totals.get(key, 0) + value
+    return totals
+
+def shutdown_webhooks(timeout: float = 2.0):
+    """Send what is queued (within timeout per webhook) and stop every dispatcher."""
+    global _dispatchers_open
+    with _dispatchers_lock:
+        _dispatchers_open = False
+        dispatchers = list(_dispatchers.values())
+        _dispatchers.clear()
+    for dispatcher in dispatchers:
+        dispatcher.close(timeout)
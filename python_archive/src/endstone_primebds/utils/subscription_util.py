@@ -0,0 +1,93 @@
+from typing import TYPE_CHECKING, Optional
+
+from endstone import Player
+
+if TYPE_CHECKING:
+    from endstone_primebds.utils.db_util import UserDB
+
+# Channel (user toggle column) -> (permission needed to receive it, whether the toggle must be on).
+# Staff chat reaches every holder of its permission; enabled_sc only redirects a player's own chat.
+CHANNELS = {
+    "enabled_ss": ("primebds.command.socialspy", True),
+    "enabled_ms": ("primebds.command.modspy", True),
+    "enabled_as": ("primebds.command.altspy", True),
+    "enabled_sc": ("primebds.command.staffchat", False)
+}
+
+class Subscriptions:
+    """
+    Online players subscribed to each of CHANNELS, so spy and staff chat fan-out only
+    visits the subscribers instead of every online player.
+
+    Players are added on join and removed on quit. The database marks a player dirty
+    whenever their user row changes (toggle commands, change feed), as does a permission
+    reload; dirty players are re-checked on the next fan-out. Permissions can also change
+    without either (op, deop, other plugins), so each subscriber's channel permission is
+    checked again as a message goes out.
+    """
+
+    def __init__(self, db: "UserDB"):
+        self.db = db
+        self._players: dict[str, Player] = {}
+        self._members: dict[str, set[str]] = {channel: set() for channel in CHANNELS}
+        self._dirty: set[str] = set()
+        db.subscriptions = self
+
+    def add(self, player: Player):
+        self._players[player.xuid] = player
+        self._dirty.add(player.xuid)
+
+    def remove(self, xuid: str):
+        self._players.pop(xuid, None)
+        self._dirty.discard(xuid)
+        for members in self._members.values():
+            members.discard(xuid)
+
+    def invalidate(self, xuid: Optional[str] = None):
+        """Re-check one player's subscriptions, or everyone's if xuid is None."""
+        if xuid is None:
+            self._dirty.update(self._players)
+        elif xuid in self._players:
+            self._dirty.add(xuid)
+
+    def members(self, *channels: str) -> list[Player]:
+        """Online players subscribed to any of the given channels, each listed once; unknown channels have none."""
+        if self._dirty:
+            self._refresh_dirty()
+
+        recipients: dict[str, Player] = {}
+        for channel in channels:
+            if channel not in CHANNELS:
+                continue
+            permission = CHANNELS[channel][0]
+            for xuid in self._members[channel]:
+                player = self._players.get(xuid)
+                if player is not None and xuid not in recipients and player.has_permission(permission):
+                    recipients[xuid] = player
+        return list(recipients.values())
+
+    def send(self, channel: str, message: str) -> int:
+        recipients = self.members(channel)
+        for player in recipients:
+            player.send_message(message)
+        return len(recipients)
+
+    def _refresh_dirty(self):
+        dirty, self._dirty = self._dirty, set()
+        for xuid in dirty:
+            player = self._players.get(xuid)
+            if player is None:
+                continue
+
+            user = self.db.get_online_user(xuid)
+            for channel, (permission, needs_toggle) in CHANNELS.items():
+                subscribed = player.has_permission(permission) and (
+                    not needs_toggle or bool(user and getattr(user, channel, 0))
+                )
+                if subscribed:
+                    self._members[channel].add(xuid)
+                else:
+                    self._members[channel].discard(xuid)
+
+    def counts(self) -> dict[str, int]:
+        return {channel: len(members) for channel, members in self._members.items()}
@@ -0,0 +1,139 @@
+"""
+Chat handler throughput against a stub server: PLAYERS online players (half of them Operators,
+one muted) sending MESSAGES allowed chat messages through handle_chat_event.
+
+    python tests/bench_chat_handler.py [--index] [--src PATH]
+
+--index loads the in-memory moderation index first. --src runs another checkout's src/, e.g.
+to compare with the handler before per-player chat states:
+
+    git worktree add /tmp/primebds-before <revision>
+    python tests/bench_chat_handler.py --src /tmp/primebds-before/python_archive/src
+
+Only the Discord relay and the chat handler's config are replaced; the databases, caches and
+chat states are the plugin's own. Revisions without chat states, subscriptions or compiled
+formats are run without them.
+"""
+import argparse
+import time
+import types
+
+from stub_server import SRC, stage_server
+
+PLAYERS = 200
+MESSAGES = 50_000
+WARMUP = 2_000
+MUTED = 5
+
+CONFIG = {
+    "modules": {
+        "server_messages": {
+            "rank_meta_nametags": False,
+            "enhanced_chat": True,
+            "chat_cooldown": 0,
+            "chat_prefix": ": ",
+            "staff_chat_prefix": "[SC] "
+        }
+    }
+}
+
+class StubPlayer:
+    def __init__(self, i: int):
+        self.xuid = str(i)
+        self.name = self.name_tag = f"player{i}"
+        self.id = i
+        self.address = f"10.0.0.{i}:19132"
+        self.received = []
+
+    def send_message(self, message):
+        self.received.append(message)
+
+    def has_permission(self, permission: str) -> bool:
+        return False
+
+class StubChatEvent:
+    def __init__(self, player: StubPlayer):
+        self.player = player
+        self.message = "hello {world}"
+        self.format = ""
+        self.is_cancelled = False
+
+def populate(db):
+    now = int(time.time())
+    for i in range(PLAYERS):
+        db.execute(
+            "INSERT INTO users (xuid, name, internal_rank, enabled_sc) VALUES (?, ?, ?, 0)",
+            (str(i), f"player{i}", "Operator" if i % 2 else "Default")
+        )
+        db.execute(
+            "INSERT INTO mod_logs (xuid, name, ip_address, ip_host, is_muted, mute_time, mute_reason) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(i), f"player{i}", f"10.0.0.{i}:19132", f"10.0.0.{i}",
+             int(i == MUTED), now + 3600 if i == MUTED else 0, "spam" if i == MUTED else "None")
+        )
+
+def build_plugin(db, players: list[StubPlayer]):
+    """The PrimeBDS attributes handle_chat_event reads, with whichever helpers this revision has."""
+    console = types.SimpleNamespace(send_message=lambda message: None)
+    plugin = types.SimpleNamespace(
+        db=db, globalmute=0, silentmutes=set(), chat_cooldown={},
+        server=types.SimpleNamespace(broadcast=lambda *args: None, command_sender=console)
+    )
+
+    try:
+        from endstone_primebds.utils.chat_util import ChatFormats
+        plugin.chat_formats = ChatFormats()
+    except ImportError:
+        pass
+    try:
+        from endstone_primebds.utils.subscription_util import Subscriptions
+        plugin.subscriptions = Subscriptions(db)
+        for player in players:
+            plugin.subscriptions.add(player)
+    except ImportError:
+        pass
+    try:
+        from endstone_primebds.utils.chat_util import ChatStates
+        plugin.chat_states = ChatStates(db)
+        for player in players:
+            plugin.chat_states.build(player)
+    except ImportError:
+        pass
+    return plugin
+
+def run(chat, plugin, players: list[StubPlayer], count: int) -> tuple[float, int]:
+    """(messages per second, messages allowed) over count messages, round-robin over players."""
+    allowed = 0
+    start = time.perf_counter()
+    for k in range(count):
+        allowed += bool(chat.handle_chat_event(plugin, StubChatEvent(players[k % PLAYERS])))
+    return count / (time.perf_counter() - start), allowed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--index", action="store_true", help="load the moderation index first")
+    parser.add_argument("--src", default=SRC, help="src/ directory of the checkout to run")
+    args = parser.parse_args()
+
+    stage_server(args.src)
+    from endstone_primebds.handlers import chat
+    from endstone_primebds.utils import db_util
+
+    db = db_util.UserDB("users.db")
+    populate(db)
+    if args.index:
+        db_util.ModerationIndex(db, db_util.ServerDB("server.db")).load()
+
+    chat.discordRelay = lambda *args: None
+    chat.load_config = lambda: CONFIG
+
+    players = [StubPlayer(i) for i in range(PLAYERS)]
+    plugin = build_plugin(db, players)
+    run(chat, plugin, players, WARMUP)
+    rate, allowed = run(chat, plugin, players, MESSAGES)
+
+    print(f"{MESSAGES:,} messages from {PLAYERS} players ({allowed:,} allowed): {rate:,.0f} msgs/s")
+    db.close_connection()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from stub_server import stage_server
+
+stage_server()
@@ -0,0 +1,35 @@
+"""
+A throwaway server directory for the tests and benchmarks.
+
+The plugin finds plugins/primebds_data by walking up from its own source files to the first
+directory holding both plugins/ and worlds/, so the package is linked into a fresh server tree
+and imported from there. Call stage_server() before anything imports endstone_primebds.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+def stage_server(src: str = SRC) -> str:
+    """
+    Create the server tree, make it the working directory and put the linked package on sys.path.
+    src may point at another checkout's src/ to run a benchmark against an older revision.
+    """
+    if "endstone_primebds" in sys.modules:
+        raise RuntimeError("stage_server() must run before endstone_primebds is imported")
+
+    root = tempfile.mkdtemp(prefix="primebds-")
+    atexit.register(shutil.rmtree, root, True)
+    for folder in ("plugins", "worlds"):
+        os.makedirs(os.path.join(root, folder))
+    with open(os.path.join(root, "server.properties"), "w") as f:
+        f.write("level-name=Bedrock level\n")
+
+    package_root = os.path.join(root, "plugins", "src")
+    os.symlink(os.path.abspath(src), package_root, target_is_directory=True)
+    sys.path.insert(0, package_root)
+    os.chdir(root)
+    return root
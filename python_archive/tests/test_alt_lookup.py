@@ -0,0 +1,124 @@
+"""
+get_alts() answers from the ip_subnet and device_id indexes. These tests check it returns
+exactly what the full users x mod_logs scan it replaced returned, on a 50k player database.
+
+Run directly (python tests/test_alt_lookup.py) to print the timings of both.
+"""
+import random
+import time
+
+import pytest
+
+PLAYERS = 50_000
+LOOKUPS = 40
+
+def scan_alts(db, ip: str, device_id: str, exclude_xuid: str) -> list[dict]:
+    """The pre-index get_alts(): every player joined with their mod log and compared in Python."""
+    from endstone_primebds.utils.address_util import same_subnet
+
+    rows = db.execute(
+        """
+        SELECT u.name, u.xuid, COALESCE(m.ip_address, '') AS ip_address, u.device_id
+        FROM users u
+        LEFT JOIN mod_logs m ON u.xuid = m.xuid
+        WHERE u.xuid != ?
+        """,
+        (exclude_xuid,), readonly=True
+    ).fetchall()
+    columns = ["name", "xuid", "ip_address", "device_id"]
+
+    results = []
+    for row in rows:
+        alt = dict(zip(columns, row))
+        if (
+            (alt["ip_address"] and ip and same_subnet(ip, alt["ip_address"])) or
+            (device_id and alt["device_id"] and alt["device_id"] == device_id)
+        ):
+            results.append(alt)
+    return results
+
+def populate(db, seed: int = 1) -> tuple[list, list]:
+    """PLAYERS users over a few hundred /24s, with shared devices, hostnames and missing mod logs mixed in."""
+    from endstone_primebds.utils.address_util import subnet_key
+    from endstone_primebds.utils.db_util import get_ip_host
+
+    rng = random.Random(seed)
+    users, mods = [], []
+    for i in range(PLAYERS):
+        if i % 50:
+            ip = f"10.{rng.randint(0, 3)}.{rng.randint(0, 40)}.{rng.randint(0, 255)}:{rng.randint(1, 65000)}"
+        else:
+            ip = f"host{i}.example:19132"
+        device_id = f"device{rng.randint(0, 30000)}" if i % 7 else ""
+        users.append((str(i), f"player{i}", device_id))
+        if i % 13:
+            mods.append((str(i), f"player{i}", ip, get_ip_host(ip), subnet_key(ip)))
+
+    db.cursor.executemany("INSERT INTO users (xuid, name, device_id) VALUES (?, ?, ?)", users)
+    db.cursor.executemany(
+        "INSERT INTO mod_logs (xuid, name, ip_address, ip_host, ip_subnet) VALUES (?, ?, ?, ?, ?)", mods
+    )
+    db.conn.commit()
+    return users, mods
+
+def lookups(users: list, mods: list, seed: int = 2):
+    """(ip, device_id, xuid) probes: mostly known addresses, some from a subnet nobody uses."""
+    rng = random.Random(seed)
+    for k in range(LOOKUPS):
+        i = rng.randrange(PLAYERS)
+        ip = mods[i % len(mods)][2] if k % 5 else "1.1.1.1:19132"
+        yield ip, users[i][2], users[i][0]
+
+@pytest.fixture(scope="module")
+def alt_db():
+    from endstone_primebds.utils.db_util import UserDB
+
+    db = UserDB("alt_lookup.db")
+    users, mods = populate(db)
+    yield db, users, mods
+    db.close_connection()
+
+def test_get_alts_matches_scan(alt_db):
+    db, users, mods = alt_db
+    for ip, device_id, xuid in lookups(users, mods):
+        assert db.get_alts(ip, device_id, xuid) == scan_alts(db, ip, device_id, xuid)
+
+def test_ip_change_moves_player_between_subnets(alt_db):
+    db, users, mods = alt_db
+    xuid, name, _ = users[1]
+    old_ip = next(ip for mod_xuid, _, ip, _, _ in mods if mod_xuid == xuid)
+    new_ip = "192.168.77.5:19132"
+
+    # Load the subnet index before the address changes
+    assert any(alt["xuid"] == xuid for alt in db.get_alts(old_ip, "", "probe"))
+
+    db.update_mod_data(name, "ip_address", new_ip)
+
+    moved = db.get_alts("192.168.77.9:19132", "", "probe")
+    assert [alt["xuid"] for alt in moved] == [xuid]
+    assert moved == scan_alts(db, "192.168.77.9:19132", "", "probe")
+    assert all(alt["xuid"] != xuid for alt in db.get_alts(old_ip, "", "probe"))
+    assert db.get_alts(old_ip, "", "probe") == scan_alts(db, old_ip, "", "probe")
+
+if __name__ == "__main__":
+    from stub_server import stage_server
+
+    stage_server()
+    from endstone_primebds.utils.db_util import UserDB
+
+    db = UserDB("alt_lookup.db")
+    users, mods = populate(db)
+    scan_seconds = index_seconds = 0.0
+    for ip, device_id, xuid in lookups(users, mods):
+        start = time.perf_counter()
+        expected = scan_alts(db, ip, device_id, xuid)
+        scan_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = db.get_alts(ip, device_id, xuid)
+        index_seconds += time.perf_counter() - start
+        assert found == expected
+
+    print(f"{LOOKUPS} lookups over {PLAYERS} players: scan {scan_seconds * 1000:.0f} ms, "
+          f"indexed {index_seconds * 1000:.1f} ms")
+    db.close_connection()
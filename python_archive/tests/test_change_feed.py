@@ -0,0 +1,53 @@
+"""
+The cache_changes feed is only written and read when the database file is shared with other
+server processes (multiworld), and old rows are pruned whether or not anyone else wrote.
+"""
+import time
+
+import pytest
+
+def change_rows(db) -> int:
+    return db.execute("SELECT COUNT(*) FROM cache_changes", readonly=True).fetchone()[0]
+
+@pytest.fixture
+def pair():
+    """Two UserDBs on one file, standing in for two servers."""
+    from endstone_primebds.utils.db_util import UserDB
+
+    name = f"feed_{time.perf_counter_ns()}.db"
+    first, second = UserDB(name), UserDB(name)
+    first.execute("INSERT INTO users (xuid, name, xp) VALUES ('1', 'player1', 0)")
+    yield first, second
+    first.close_connection()
+    second.close_connection()
+
+def test_unshared_file_publishes_nothing(pair):
+    first, second = pair
+    assert not first.shared
+    first.queue_user_update("1", {"xp": 10})
+    first.flush()
+    assert change_rows(first) == 0
+    assert second.poll_changes() == 0
+
+def test_shared_file_invalidates_the_other_server(pair):
+    first, second = pair
+    first.shared = second.shared = True
+    second.poll_changes()
+    assert second.get_online_user("1").xp == 0
+
+    first.queue_user_update("1", {"xp": 10})
+    first.flush()
+    assert second.poll_changes() == 1
+    assert second.get_online_user("1").xp == 10
+
+def test_prune_runs_without_foreign_writes(pair):
+    first, _ = pair
+    first.shared = True
+    first.publish_changes("user", ["1", "2"])
+    first.execute(
+        "UPDATE cache_changes SET changed_at = ?", (int(time.time()) - first.CHANGE_RETENTION_SECONDS - 1,)
+    )
+    first.publish_changes("user", ["3"])
+
+    assert first.prune_changes() == 2
+    assert change_rows(first) == 1
@@ -0,0 +1,119 @@
+"""
+Work handed to the database executor must leave server-thread state alone: alt clusters and the
+expiry schedule are updated from the callback, and a flush in progress never lets a reader cache
+or fall back to the pre-flush row.
+"""
+import threading
+import time
+import types
+
+import pytest
+
+class StubScheduler:
+    """Collects tasks the way the server's scheduler would, to be run on the test ("server") thread."""
+
+    def __init__(self):
+        self.tasks = []
+
+    def run_task(self, plugin, task, delay=0, period=0):
+        self.tasks.append(task)
+        return types.SimpleNamespace(task_id=len(self.tasks))
+
+    def run_pending(self):
+        tasks, self.tasks = self.tasks, []
+        for task in tasks:
+            task()
+
+@pytest.fixture
+def user_db():
+    from endstone_primebds.utils.db_util import UserDB
+
+    db = UserDB(f"executor_{time.perf_counter_ns()}.db")
+    yield db
+    db.close_connection()
+
+def test_check_alts_async_links_on_server_thread(user_db):
+    from endstone_primebds.utils.address_util import subnet_key
+    from endstone_primebds.utils.db_util import DatabaseExecutor
+    from endstone_primebds.utils.expiry_util import ExpiryScheduler
+
+    for xuid in ("1", "2"):
+        user_db.execute("INSERT INTO users (xuid, name, device_id) VALUES (?, ?, ?)", (xuid, f"player{xuid}", "shared"))
+        user_db.execute(
+            "INSERT INTO mod_logs (xuid, name, ip_address, ip_subnet) VALUES (?, ?, ?, ?)",
+            (xuid, f"player{xuid}", "10.0.0.1:19132", subnet_key("10.0.0.1"))
+        )
+
+    scheduler = StubScheduler()
+    plugin = types.SimpleNamespace(server=types.SimpleNamespace(scheduler=scheduler))
+    user_db.expiry = ExpiryScheduler(user_db)
+    user_db.executor = DatabaseExecutor(plugin)
+
+    threads = []
+    link, schedule = user_db.alt_clusters.link, user_db.expiry.schedule
+    user_db.alt_clusters.link = lambda *args: (threads.append(threading.current_thread()), link(*args))
+    user_db.expiry.schedule = lambda *args: (threads.append(threading.current_thread()), schedule(*args))
+
+    found = []
+    user_db.check_alts_async("1", "player1", "10.0.0.7:19132", "shared", callback=found.extend)
+    user_db.executor.shutdown()
+    assert threads == [] and found == []
+
+    scheduler.run_pending()
+    assert [alt["xuid"] for alt in found] == ["2"]
+    assert threads and all(thread is threading.main_thread() for thread in threads)
+    assert {alt["xuid"] for alt in user_db.get_linked_alts("1")} == {"2"}
+
+def test_reads_during_flush_see_queued_values(user_db):
+    user_db.execute("INSERT INTO users (xuid, name, xp) VALUES ('1', 'player1', 0)")
+    user_db.get_online_user("1")  # Load the users mapper, which needs the writer
+    user_db.invalidate_user_cache("1")
+    user_db.queue_user_update("1", {"xp": 50})
+
+    # Hold the writer so the flush stops after taking the queued batch but before committing it
+    with user_db._lock:
+        flusher = threading.Thread(target=user_db.flush)
+        flusher.start()
+        while user_db._pending_updates:
+            time.sleep(0.001)
+        assert user_db.get_online_user("1").xp == 50
+        assert user_db.get_offline_user("player1").xp == 50
+    flusher.join()
+
+    user_db.invalidate_user_cache("1")
+    assert user_db.get_online_user("1").xp == 50
+
+def test_quit_flush_keeps_back_location_until_committed():
+    from endstone_primebds.utils.db_util import ServerDB
+
+    db = ServerDB(f"last_warp_{time.perf_counter_ns()}.db")
+    db.encode_location = lambda location: location
+    db.decode_location = lambda pos, server: pos
+    db.execute(
+        "INSERT INTO last_warp (xuid, username, name, pos) VALUES ('1', 'player1', 'lastwarp', ?)", (b"old",)
+    )
+    db.queue_last_warp(b"new", "1", "player1")
+
+    # Hold the writer so the quit flush stops after taking the queued location but before committing it
+    with db._lock:
+        flusher = threading.Thread(target=db.flush_last_warps, args=(["1"], True))
+        flusher.start()
+        while db._pending_last_locations:
+            time.sleep(0.001)
+        assert db.get_last_warp(None, "1")["pos"] == b"new"
+    flusher.join()
+
+    assert "1" not in db._last_locations
+    assert db.get_last_warp(None, "1")["pos"] == b"new"
+
+    # A location queued after rejoining is not dropped by the earlier quit's flush
+    db.queue_last_warp(b"rejoined", "1", "player1")
+    with db._lock:
+        flusher = threading.Thread(target=db.flush_last_warps, args=(["1"], True))
+        flusher.start()
+        while db._pending_last_locations:
+            time.sleep(0.001)
+        db.queue_last_warp(b"newer", "1", "player1")
+    flusher.join()
+    assert db.get_last_warp(None, "1")["pos"] == b"newer"
+    db.close_connection()
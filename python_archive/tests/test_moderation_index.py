@@ -0,0 +1,151 @@
+"""
+Login checks (XUID ban, IP ban, name ban) answered by ModerationIndex must match the SQL path
+they replaced, and cost the same however many moderation rows there are.
+
+Run directly (python tests/test_moderation_index.py) to time both at 20k, 100k and 200k rows.
+"""
+import random
+import time
+
+import pytest
+
+SIZES = (20_000, 100_000, 200_000)
+SAMPLES = 2_000
+
+def populate(user_db, server_db, start: int, stop: int, seed: int = 4):
+    """
+    Players start..stop-1: a tenth banned (a fifth of those already expired), one in fifteen
+    muted, one in a hundred IP banned, and a name ban for every tenth name (some expired).
+    """
+    from endstone_primebds.utils.db_util import get_ip_host
+
+    rng = random.Random(seed + start)
+    now = int(time.time())
+    mod_logs, name_bans = [], []
+    for i in range(start, stop):
+        ip = f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}:{rng.randint(1, 65000)}"
+        banned, muted, ip_banned = i % 10 == 0, i % 15 == 0, i % 100 == 0
+        banned_time = (now - 60 if i % 50 == 0 else now + 86400) if banned or ip_banned else 0
+        mod_logs.append((
+            str(i), f"player{i}", int(muted), now + 3600 if muted else 0, "spam" if muted else "None",
+            int(banned), banned_time, "griefing" if banned or ip_banned else "None",
+            ip, int(ip_banned), get_ip_host(ip)
+        ))
+        if i % 10 == 3:
+            name_bans.append((f"player{i}", now - 60 if i % 70 == 3 else now + 86400, "name"))
+
+    user_db.cursor.executemany(
+        "INSERT INTO mod_logs (xuid, name, is_muted, mute_time, mute_reason, is_banned, banned_time, ban_reason, "
+        "ip_address, is_ip_banned, ip_host) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        mod_logs
+    )
+    user_db.conn.commit()
+    server_db.cursor.executemany(
+        "INSERT INTO name_bans (name, banned_time, ban_reason) VALUES (?, ?, ?)", name_bans
+    )
+    server_db.conn.commit()
+
+def logins(size: int, seed: int = 5) -> list[tuple[str, str, str]]:
+    """(xuid, ip, name) of SAMPLES logins: known players on their own address, and a tenth of new ones."""
+    rng = random.Random(seed)
+    samples = []
+    for k in range(SAMPLES):
+        if k % 10:
+            i = rng.randrange(size)
+            samples.append((str(i), None, f"player{i}"))
+        else:
+            samples.append((f"new{k}", f"172.16.{rng.randint(0, 255)}.{rng.randint(0, 255)}:19132", f"newplayer{k}"))
+    return samples
+
+def with_addresses(user_db, samples: list) -> list[tuple[str, str, str]]:
+    addresses = dict(user_db.execute("SELECT xuid, ip_address FROM mod_logs", readonly=True).fetchall())
+    return [(xuid, ip or addresses[xuid], name) for xuid, ip, name in samples]
+
+def sql_checks(user_db, server_db, xuid: str, ip: str, name: str) -> tuple:
+    """The login checks before the index: mod log row, IP ban query and name ban query, all uncached."""
+    user_db._mod_log_cache.clear()
+    user_db._ip_ban_cache.clear()
+    mod_log = user_db.get_mod_log(xuid)
+    ban = (mod_log.banned_time, mod_log.ban_reason) if mod_log and mod_log.is_banned else None
+    name_ban = server_db.get_ban_info(name) if server_db.check_nameban(name) else None
+    return ban, user_db.check_ip_ban(ip), name_ban
+
+def index_checks(index, server_db, xuid: str, ip: str, name: str) -> tuple:
+    entry = index.get_ban(xuid)
+    ban = (entry.banned_time, entry.ban_reason) if entry else None
+    name_ban = server_db.get_ban_info(name) if server_db.check_nameban(name) else None
+    return ban, index.get_ip_ban(ip) is not None, name_ban
+
+def open_databases(tag: str):
+    """An indexed (UserDB, ServerDB) pair and an unindexed pair on the same two files."""
+    from endstone_primebds.utils.db_util import ServerDB, UserDB
+
+    users, server = f"{tag}_users.db", f"{tag}_server.db"
+    return (UserDB(users), ServerDB(server)), (UserDB(users), ServerDB(server))
+
+@pytest.fixture(scope="module")
+def moderation_dbs():
+    from endstone_primebds.utils.db_util import ModerationIndex
+
+    indexed, plain = open_databases(f"moderation_{time.perf_counter_ns()}")
+    populate(*indexed, 0, SIZES[0])
+    index = ModerationIndex(*indexed)
+    index.load()
+    yield index, indexed, plain
+    for db in indexed + plain:
+        db.close_connection()
+
+def test_index_matches_sql(moderation_dbs):
+    index, (user_db, server_db), (plain_users, plain_server) = moderation_dbs
+    assert plain_users.moderation is None and plain_server.moderation is None
+
+    samples = with_addresses(user_db, logins(SIZES[0]))
+    results = [index_checks(index, server_db, *login) for login in samples]
+    assert results == [sql_checks(plain_users, plain_server, *login) for login in samples]
+
+    # The sample has to reach every kind of ban for the comparison to mean anything
+    bans, ip_bans, name_bans = zip(*results)
+    assert any(bans) and any(ip_bans) and any(name_bans)
+
+def test_index_tracks_name_bans(moderation_dbs):
+    index, (_, server_db), (_, plain_server) = moderation_dbs
+    server_db.add_name("griefer", "alt of a banned player", 3600)
+    assert server_db.check_nameban("griefer") and plain_server.check_nameban("griefer")
+    assert index.get_name_ban("griefer").ban_reason == "alt of a banned player"
+
+    server_db.remove_name("griefer")
+    assert not server_db.check_nameban("griefer") and not plain_server.check_nameban("griefer")
+
+if __name__ == "__main__":
+    from stub_server import stage_server
+
+    stage_server()
+    from endstone_primebds.utils.db_util import ModerationIndex
+
+    indexed, plain = open_databases("moderation_bench")
+    loaded = 0
+    for size in SIZES:
+        populate(*indexed, loaded, size)
+        loaded = size
+
+        start = time.perf_counter()
+        index = ModerationIndex(*indexed)
+        index.load()
+        load_seconds = time.perf_counter() - start
+
+        samples = with_addresses(indexed[0], logins(size))
+        start = time.perf_counter()
+        expected = [sql_checks(*plain, *login) for login in samples]
+        sql_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = [index_checks(index, indexed[1], *login) for login in samples]
+        index_seconds = time.perf_counter() - start
+        assert found == expected
+
+        print(f"{size:>7,} mod_logs rows ({index.size()['entries']:,} indexed, {index.size()['name_bans']:,} name bans): "
+              f"load {load_seconds:.2f}s, per login sql {sql_seconds / SAMPLES * 1e6:.1f}us, "
+              f"index {index_seconds / SAMPLES * 1e6:.2f}us")
+
+    for db in indexed + plain:
+        db.close_connection()
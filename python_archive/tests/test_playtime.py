@@ -0,0 +1,49 @@
+"""
+The playtime leaderboard ranks players on the total it shows, closed sessions plus the running
+part of an open one, so an online player sits where their displayed playtime puts them.
+"""
+import random
+import time
+
+import pytest
+
+PLAYERS = 2_000
+
+@pytest.fixture(scope="module")
+def sessions():
+    from endstone_primebds.utils.db_util import sessionDB
+
+    db = sessionDB("playtime.db")
+    now = int(time.time())
+    rng = random.Random(3)
+    rows = []
+    for i in range(PLAYERS):
+        # Every 20th player is online, some of them for longer than most have ever played
+        open_since = now - rng.randint(0, 200_000) if i % 20 == 0 else None
+        rows.append((str(i), f"player{i}", rng.randint(0, 100_000), now - rng.randint(0, 10**6), open_since))
+    db.cursor.executemany(
+        "INSERT INTO playtime_totals (xuid, name, total_playtime, last_session_start, open_since) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    db.conn.commit()
+    yield db
+    db.close_connection()
+
+def live_totals(db) -> dict[str, int]:
+    return {entry["xuid"]: entry["total_playtime"] for entry in db.get_all_playtimes()}
+
+@pytest.mark.parametrize("order", ["highest", "lowest"])
+def test_pages_follow_displayed_total(sessions, order):
+    totals = live_totals(sessions)
+    expected = sorted(totals.values(), reverse=order == "highest")
+
+    shown = []
+    for offset in range(0, PLAYERS, 250):
+        shown += [entry["total_playtime"] for entry in sessions.get_playtime_page(order, limit=250, offset=offset)]
+    assert shown == expected
+
+def test_rank_counts_players_with_more_displayed_playtime(sessions):
+    totals = live_totals(sessions)
+    for xuid in ("0", "20", "1", "777", str(PLAYERS - 1)):
+        ahead = sum(1 for total in totals.values() if total > totals[xuid])
+        assert sessions.get_playtime_rank(xuid) == ahead + 1
@@ -0,0 +1,42 @@
+"""
+Spy and staff chat go to the cached subscriber sets, but a subscriber whose channel permission
+was taken away stops receiving them at once, even though nothing marked them dirty.
+"""
+import time
+
+class StubPlayer:
+    def __init__(self, xuid: str, permissions: set[str]):
+        self.xuid = xuid
+        self.permissions = permissions
+        self.received = []
+
+    def send_message(self, message):
+        self.received.append(message)
+
+    def has_permission(self, permission: str) -> bool:
+        return permission in self.permissions
+
+def test_revoked_permission_stops_delivery():
+    from endstone_primebds.utils.db_util import UserDB
+    from endstone_primebds.utils.subscription_util import Subscriptions
+
+    db = UserDB(f"subscriptions_{time.perf_counter_ns()}.db")
+    for xuid in ("1", "2"):
+        db.execute("INSERT INTO users (xuid, name, enabled_ms) VALUES (?, ?, 1)", (xuid, f"player{xuid}"))
+    staff = {"primebds.command.staffchat", "primebds.command.modspy"}
+    first, second = StubPlayer("1", set(staff)), StubPlayer("2", set(staff))
+
+    subscriptions = Subscriptions(db)
+    subscriptions.add(first)
+    subscriptions.add(second)
+    assert subscriptions.send("enabled_sc", "before") == 2
+
+    first.permissions.clear()
+    assert subscriptions.send("enabled_sc", "after") == 1
+    assert [player.xuid for player in subscriptions.members("enabled_sc", "enabled_ms")] == ["2"]
+    assert first.received == ["before"] and second.received == ["before", "after"]
+
+    # Granted back: still subscribed, so delivery resumes without a refresh
+    first.permissions.update(staff)
+    assert subscriptions.send("enabled_sc", "again") == 2
+    db.close_connection()
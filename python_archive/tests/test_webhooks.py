@@ -0,0 +1,191 @@
+"""
+Webhook dispatchers against a local HTTP stub standing in for Discord: rate limits are waited
+out for as long as Discord asks, bursts are coalesced within its size limits, and a full queue
+drops messages instead of blocking. Dispatchers also stop cleanly: nothing logged after shutdown
+starts a new worker, and a post still in flight when close() gives up waiting keeps its session
+until it returns.
+"""
+import collections
+import json
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+class StubWebhook(ThreadingHTTPServer):
+    """
+    Answers each POST with the next scripted (status, headers, body) response, 204 once the
+    script runs out, and records when each payload arrived. While hold is clear, requests wait.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubWebhookHandler)
+        self.script = collections.deque()
+        self.posts: list[tuple[float, dict]] = []
+        self.received = threading.Event()
+        self.hold = threading.Event()
+        self.hold.set()
+        self.url = f"http://127.0.0.1:{self.server_port}/webhook"
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server: StubWebhook = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.posts.append((time.monotonic(), payload))
+        server.received.set()
+        server.hold.wait(5)
+
+        status, headers, body = server.script.popleft() if server.script else (204, {}, b"")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def webhook():
+    server = StubWebhook()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.hold.set()
+    server.shutdown()
+    server.server_close()
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+class SlowSession:
+    """Stands in for requests.Session; each post waits until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.posting = threading.Event()
+        self.closed = False
+
+    def post(self, url, json=None, timeout=None):
+        self.posting.set()
+        self.release.wait(5)
+        assert not self.closed, "session closed while a post was in flight"
+        return types.SimpleNamespace(status_code=204, headers={})
+
+    def close(self):
+        self.closed = True
+
+def test_no_dispatchers_after_shutdown():
+    from endstone_primebds.utils import logging_util
+
+    logging_util.shutdown_webhooks()
+    try:
+        assert logging_util.get_dispatcher("https://discord.invalid/webhook") is None
+        assert logging_util._dispatchers == {}
+    finally:
+        logging_util.open_webhooks()
+
+    dispatcher = logging_util.get_dispatcher("https://discord.invalid/webhook")
+    assert dispatcher is not None
+    logging_util.shutdown_webhooks(0)
+
+def test_close_leaves_in_flight_post_its_session():
+    from endstone_primebds.utils.logging_util import WebhookDispatcher
+
+    dispatcher = WebhookDispatcher("https://discord.invalid/webhook")
+    session = dispatcher._session = SlowSession()
+    assert dispatcher.submit("hello")
+    assert session.posting.wait(5)
+
+    dispatcher.close(timeout=0.05)
+    assert not session.closed
+
+    session.release.set()
+    dispatcher._thread.join(5)
+    assert session.closed
+    assert dispatcher.stats["sent"] == 1
+
+def test_rate_limits_are_waited_out(webhook):
+    from endstone_primebds.utils.logging_util import WebhookDispatcher
+
+    webhook.script.extend([
+        (429, {"Content-Type": "application/json"}, json.dumps({"retry_after": 0.3}).encode()),
+        (429, {"Retry-After": "0.4"}, b"{}")
+    ])
+    dispatcher = WebhookDispatcher(webhook.url)
+    dispatcher.submit("hello")
+    assert wait_for(lambda: dispatcher.stats["posts"] == 1)
+
+    (first, payload), (second, retried), (third, delivered) = webhook.posts
+    assert payload == retried == delivered == {"content": "hello"}
+    assert 0.3 <= second - first < 1.0  # retry_after from the JSON body
+    assert 0.4 <= third - second < 1.1  # Retry-After header when the body has none
+    assert dispatcher.stats["rate_limited"] == 2 and dispatcher.stats["sent"] == 1
+    dispatcher.close()
+
+def test_exhausted_bucket_waits_for_reset(webhook):
+    from endstone_primebds.utils.logging_util import WebhookDispatcher
+
+    webhook.script.append((204, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.3"}, b""))
+    dispatcher = WebhookDispatcher(webhook.url)
+    dispatcher.submit("first")
+    assert webhook.received.wait(5)
+    dispatcher.submit("second")
+    assert wait_for(lambda: dispatcher.stats["sent"] == 2)
+
+    (first, _), (second, _) = webhook.posts
+    assert second - first >= 0.3
+    assert dispatcher.stats["rate_limited"] == 0
+    dispatcher.close()
+
+def test_burst_is_coalesced_within_size_limits(webhook):
+    from endstone_primebds.utils.logging_util import MAX_CONTENT_LENGTH, MAX_DESCRIPTION_LENGTH, WebhookDispatcher
+
+    dispatcher = WebhookDispatcher(webhook.url, queue_size=2000)
+    messages = [f"message {i:04d} " + "x" * 40 for i in range(1000)]
+    for message in messages:
+        assert dispatcher.submit(message)
+    assert wait_for(lambda: dispatcher.stats["sent"] == dispatcher.stats["queued"] == len(messages))
+
+    contents = [payload["content"] for _, payload in webhook.posts]
+    assert all(len(content) <= MAX_CONTENT_LENGTH for content in contents)
+    assert "\n".join(contents).split("\n") == messages
+    assert len(contents) < len(messages) // 10
+    assert dispatcher.stats["coalesced"] == len(messages) - dispatcher.stats["posts"]
+
+    # Oversized single messages are cut to the limit of their kind
+    dispatcher.submit("y" * 5000)
+    dispatcher.submit("z" * 5000, ("Log", 0xFF0000))
+    assert wait_for(lambda: dispatcher.stats["sent"] == len(messages) + 2)
+    assert len(webhook.posts[-2][1]["content"]) == MAX_CONTENT_LENGTH
+    assert len(webhook.posts[-1][1]["embeds"][0]["description"]) == MAX_DESCRIPTION_LENGTH
+    dispatcher.close()
+
+def test_full_queue_drops_without_blocking(webhook):
+    from endstone_primebds.utils.logging_util import WebhookDispatcher
+
+    webhook.hold.clear()
+    dispatcher = WebhookDispatcher(webhook.url, queue_size=1)
+    dispatcher.submit("in flight")
+    assert webhook.received.wait(5)
+
+    # The worker is stuck on the held post: one message fits the queue, the rest are dropped
+    start = time.perf_counter()
+    accepted = [dispatcher.submit(f"burst {i}") for i in range(10)]
+    assert time.perf_counter() - start < 0.1
+    assert accepted == [True] + [False] * 9
+    assert dispatcher.stats["dropped"] == 9 and dispatcher.stats["queued"] == 2
+
+    webhook.hold.set()
+    assert wait_for(lambda: dispatcher.stats["sent"] == 2)
+    assert [payload["content"] for _, payload in webhook.posts] == ["in flight", "burst 0"]
+    dispatcher.close()